@@ -0,0 +1,117 @@
+"""
+Load test for the JSON API. Starts a local server unless --url is given and reports
+requests per second for plain, gzip and conditional (If-None-Match) requests.
+
+    python api_loadtest.py --requests 5000 --concurrency 16
+"""
+import argparse
+import http.client
+import statistics
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+
+PATHS = [
+    "/api/companies?limit=50",
+    "/api/parties",
+    "/api/categories",
+    "/api/flows?limit=100",
+    "/api/companies/MEGHA%20ENGINEERING%20AND%20INFRASTRUCTURES%20LIMITED",
+    "/api/parties/BHARATIYA%20JANATA%20PARTY",
+    "/api/timeseries?entity=party&name=BHARATIYA%20JANATA%20PARTY&freq=month",
+    "/api/bonds/OC775",
+]
+
+
+def run_scenario(host, port, requests, concurrency, headers):
+    """
+    Sends `requests` GET requests spread over `concurrency` keep-alive connections.
+
+    Returns:
+    - Dictionary with throughput, latency percentiles and status counts.
+    """
+    per_worker = requests // concurrency
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def worker(worker_id):
+        connection = http.client.HTTPConnection(host, port, timeout=30)
+        local_latencies = []
+        local_statuses = {}
+        for i in range(per_worker):
+            path = PATHS[(worker_id + i) % len(PATHS)]
+            start = time.perf_counter()
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            local_latencies.append(time.perf_counter() - start)
+            local_statuses[response.status] = local_statuses.get(response.status, 0) + 1
+        connection.close()
+        with lock:
+            latencies.extend(local_latencies)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "statuses": statuses,
+    }
+
+
+def fetch_etag(host, port):
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    connection.request("GET", "/api/version", headers={"Accept-Encoding": "gzip"})
+    response = connection.getresponse()
+    response.read()
+    connection.close()
+    return response.getheader("ETag")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the electoral bond JSON API.")
+    parser.add_argument("--url", help="Base URL of a running server, e.g. http://127.0.0.1:8502")
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=16, help="Server threads when started locally")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        url = urllib.parse.urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        from api_server import create_server
+
+        server = create_server(port=0, workers=args.workers)
+        host, port = server.server_address
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    etag = fetch_etag(host, port)
+    scenarios = {
+        "identity": {},
+        "gzip": {"Accept-Encoding": "gzip"},
+        "if-none-match": {"Accept-Encoding": "gzip", "If-None-Match": etag},
+    }
+    print(f"{'scenario':<15}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}  statuses")
+    for name, headers in scenarios.items():
+        result = run_scenario(host, port, args.requests, args.concurrency, headers)
+        print(
+            f"{name:<15}{result['requests']:>10}{result['rps']:>10.0f}"
+            f"{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}  {result['statuses']}"
+        )
+
+    if server is not None:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,357 @@
+"""
+Read-only JSON API over the precomputed electoral bond aggregates.
+
+Run locally with:
+    python api_server.py --port 8502
+
+Endpoints:
+- /api/version
+- /api/metrics (data cache fill metrics, never cached)
+- /api/validation (data validation reports, never cached)
+- /api/companies, /api/companies/<name>
+- /api/parties, /api/parties/<name>
+  (names are percent-encoded, with "/" as %2F, e.g. /api/companies/M%2FSKJS%20AHLUWALIA)
+- /api/categories
+- /api/flows?company=<name>&party=<name>&limit=<n>
+- /api/timeseries?entity=company|party&name=<name>&freq=year|month
+- /api/bonds/<prefix><number>
+"""
+import argparse
+import gzip
+import json
+import threading
+import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from data_model import cache_metrics, load_data_model
+from data_validation import validation_reports
+from purchase_orders import load_purchase_orders, lookup_bond, parse_bond_key
+
+
+MAX_CACHED_RESPONSES = 2048
+# Seconds an idle keep-alive connection may hold a handler thread before it is closed.
+KEEP_ALIVE_TIMEOUT_SECONDS = 5
+
+
+def _records(df, columns):
+    """
+    Converts the given columns of a frame to a list of JSON-serializable dictionaries.
+    """
+    return json.loads(df[columns].to_json(orient="records"))
+
+
+def build_api_aggregates(model):
+    """
+    Precomputes every aggregate served by the API for one data version.
+
+    Parameters:
+    - model: DataModel returned by `load_data_model`.
+
+    Returns:
+    - Dictionary of precomputed, JSON-serializable aggregates and lookup tables.
+    """
+    merged_df = model.merged_df
+    companies = model.companies
+    parties = model.parties
+
+    company_list = _records(
+        model.sorted_company,
+        ["Company", "Category", "Parent Company", "is_ED_raid", "Date of Raid", "Amount", "Bond_count"],
+    )
+    party_list = _records(model.sorted_party, ["party", "Amount", "Bond_count"])
+    category_list = _records(model.category_group, ["Category", "Amount", "Bond_count"])
+
+    flows = (
+        merged_df.groupby(["Company", "party"])["Amount_y"]
+        .agg(["sum", "count"])
+        .reset_index()
+        .rename(columns={"sum": "Amount", "count": "Bond_count"})
+        .sort_values("Amount", ascending=False)
+    )
+    flow_records = _records(flows, ["Company", "party", "Amount", "Bond_count"])
+
+    def series(df, entity_column, date_column):
+        months = df[date_column].dt.strftime("%Y-%m")
+        grouped = (
+            df.assign(Period=months)
+            .groupby([entity_column, "Period"])["Amount"]
+            .agg(["sum", "count"])
+            .reset_index()
+        )
+        result = {}
+        for name, group in grouped.groupby(entity_column):
+            result[name] = [
+                {"period": period, "Amount": int(amount), "Bond_count": int(count)}
+                for period, amount, count in zip(group["Period"], group["sum"], group["count"])
+            ]
+        return result
+
+    return {
+        "companies": company_list,
+        "company_index": {record["Company"]: record for record in company_list},
+        "parties": party_list,
+        "party_index": {record["party"]: record for record in party_list},
+        "categories": category_list,
+        "flows": flow_records,
+        "company_flows": _group_records(flow_records, "Company"),
+        "party_flows": _group_records(flow_records, "party"),
+        "company_series": series(companies, "Company", "Date_format"),
+        "party_series": series(parties, "party", "Date_format"),
+        "purchase_orders": load_purchase_orders(model),
+    }
+
+
+def _group_records(records, key):
+    grouped = {}
+    for record in records:
+        grouped.setdefault(record[key], []).append(record)
+    return grouped
+
+
+def _rollup_series(points, freq):
+    if freq == "month":
+        return points
+    years = OrderedDict()
+    for point in points:
+        period = point["period"][:4]
+        year = years.setdefault(period, {"period": period, "Amount": 0, "Bond_count": 0})
+        year["Amount"] += point["Amount"]
+        year["Bond_count"] += point["Bond_count"]
+    return list(years.values())
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def resolve(aggregates, path, query):
+    """
+    Resolves an API path to its response body.
+
+    Parameters:
+    - aggregates: Dictionary returned by `build_api_aggregates`.
+    - path: Request path, still percent-encoded; segments are decoded after splitting so
+      that names containing "/" resolve.
+    - query: Dictionary of query parameters.
+
+    Returns:
+    - JSON-serializable response body.
+    """
+    limit = int(query.get("limit", 0)) or None
+    offset = int(query.get("offset", 0))
+    if (limit or 0) < 0 or offset < 0:
+        raise ApiError(400, "limit and offset must not be negative")
+    parts = [urllib.parse.unquote(part) for part in path.strip("/").split("/") if part]
+    if not parts or parts[0] != "api":
+        raise ApiError(404, "Not found")
+    parts = parts[1:]
+
+    if parts == ["companies"]:
+        return aggregates["companies"][offset : offset + limit if limit else None]
+    if len(parts) == 2 and parts[0] == "companies":
+        company = aggregates["company_index"].get(parts[1])
+        if company is None:
+            raise ApiError(404, f"Unknown company: {parts[1]}")
+        return {**company, "parties": aggregates["company_flows"].get(parts[1], [])}
+    if parts == ["parties"]:
+        return aggregates["parties"][offset : offset + limit if limit else None]
+    if len(parts) == 2 and parts[0] == "parties":
+        party = aggregates["party_index"].get(parts[1])
+        if party is None:
+            raise ApiError(404, f"Unknown party: {parts[1]}")
+        return {**party, "companies": aggregates["party_flows"].get(parts[1], [])}
+    if parts == ["categories"]:
+        return aggregates["categories"]
+    if parts == ["flows"]:
+        if "company" in query:
+            flows = aggregates["company_flows"].get(query["company"], [])
+        elif "party" in query:
+            flows = aggregates["party_flows"].get(query["party"], [])
+        else:
+            flows = aggregates["flows"]
+        return flows[offset : offset + limit if limit else None]
+    if parts == ["timeseries"]:
+        entity = query.get("entity", "company")
+        if entity not in ("company", "party"):
+            raise ApiError(400, "entity must be 'company' or 'party'")
+        points = aggregates[f"{entity}_series"].get(query.get("name", ""))
+        if points is None:
+            raise ApiError(404, f"Unknown {entity}: {query.get('name', '')}")
+        return _rollup_series(points, query.get("freq", "year"))
+    if len(parts) == 2 and parts[0] == "bonds":
+        key = parse_bond_key(parts[1])
+        bond = lookup_bond(aggregates["purchase_orders"], *key) if key else None
+        if not bond:
+            raise ApiError(404, f"Unknown bond: {parts[1]}")
+        return bond
+    raise ApiError(404, "Not found")
+
+
+class DataService:
+    """
+    Holds the aggregates of the current data version and a bounded cache of encoded responses.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.build_lock = threading.Lock()
+        self.version = None
+        self.aggregates = None
+        self.responses = OrderedDict()
+
+    def current(self):
+        model = load_data_model()
+        with self.lock:
+            if model.version == self.version:
+                return self.version, self.aggregates
+            stale = (self.version, self.aggregates)
+        # Build outside `self.lock` so requests keep being served meanwhile; while another
+        # thread builds the new version, keep answering from the previous one if there is one.
+        if not self.build_lock.acquire(blocking=stale[1] is None):
+            return stale
+        try:
+            with self.lock:
+                if model.version == self.version:
+                    return self.version, self.aggregates
+            aggregates = build_api_aggregates(model)
+            with self.lock:
+                self.version, self.aggregates = model.version, aggregates
+                self.responses.clear()
+                return self.version, self.aggregates
+        finally:
+            self.build_lock.release()
+
+    def response(self, raw_path):
+        """
+        Returns the version and the JSON and gzip encodings of the response for a request path.
+        """
+        version, aggregates = self.current()
+        cache_key = (version, raw_path)
+        with self.lock:
+            cached = self.responses.get(cache_key)
+            if cached is not None:
+                self.responses.move_to_end(cache_key)
+                return cached
+        url = urllib.parse.urlsplit(raw_path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        if url.path.rstrip("/") == "/api/version":
+            body = {"version": version}
+        else:
+            body = resolve(aggregates, url.path, query)
+        encoded = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        cached = (version, encoded, gzip.compress(encoded, compresslevel=6))
+        with self.lock:
+            self.responses[cache_key] = cached
+            if len(self.responses) > MAX_CACHED_RESPONSES:
+                self.responses.popitem(last=False)
+        return cached
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, so avoid Nagle/delayed-ACK stalls.
+    disable_nagle_algorithm = True
+    # Connections are kept alive, so bound how long an idle one can hold a pool thread.
+    timeout = KEEP_ALIVE_TIMEOUT_SECONDS
+    service = None
+
+    def do_GET(self):
+        path = urllib.parse.urlsplit(self.path).path.rstrip("/")
+        if path == "/api/metrics":
+            return self._send(200, json.dumps(cache_metrics()).encode("utf-8"))
+        if path == "/api/validation":
+            return self._send(200, json.dumps(validation_reports()).encode("utf-8"))
+        try:
+            version, body, gzipped = self.service.response(self.path)
+        except ApiError as error:
+            return self._send(error.status, json.dumps({"error": str(error)}).encode("utf-8"))
+        except ValueError as error:
+            return self._send(400, json.dumps({"error": str(error)}).encode("utf-8"))
+
+        # The gzip and identity bodies differ, so each encoding gets its own ETag.
+        encoding = "gzip" if "gzip" in self.headers.get("Accept-Encoding", "") else None
+        etag = f'"{version}-gzip"' if encoding else f'"{version}"'
+        if etag in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+            return self._send(304, b"", etag=etag)
+        return self._send(200, gzipped if encoding else body, etag=etag, encoding=encoding)
+
+    def _send(self, status, body, etag=None, encoding=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Vary", "Accept-Encoding")
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadPoolHTTPServer(HTTPServer):
+    """
+    HTTP server that handles connections on a fixed-size thread pool.
+    """
+
+    def __init__(self, server_address, handler_class, workers=16):
+        super().__init__(server_address, handler_class)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False)
+
+
+def create_server(host="127.0.0.1", port=8502, workers=16):
+    """
+    Creates the API server with the data model loaded and the aggregates precomputed.
+
+    Parameters:
+    - host: Interface to listen on.
+    - port: Port to listen on.
+    - workers: Number of request handler threads.
+
+    Returns:
+    - ThreadPoolHTTPServer ready to `serve_forever`.
+    """
+    service = DataService()
+    service.current()
+    handler = type("BoundApiRequestHandler", (ApiRequestHandler,), {"service": service})
+    return ThreadPoolHTTPServer((host, port), handler, workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the electoral bond aggregates as JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.workers)
+    print(f"Serving on http://{args.host}:{args.port}/api/companies")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
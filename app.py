@@ -1,5 +1,9 @@
+import pandas as pd
 import streamlit as st
-from data_loader import load_and_prepare_data, load_and_prepare_party_data
+from cross_filter import display_cross_filter
+from data_model import data_paths, load_data_model
+from data_validation import validation_reports
+from date_scope import scoped_summaries, select_date_range
 from news_handler import display_news
 from party_handler import display_individual_party_data, display_overall_party_data
 from company_handler import (
@@ -7,41 +11,76 @@ from company_handler import (
     display_overall_company_data,
 )
 from company_visualization_hadler import display_overall_company_visualization
-from data_preprocessing import summarize_data, summarize_party_data
-from utils import merge_parties_companies
+from export_handler import display_export
+from network_graph import display_network
 
 
-def main():
-    # Load and prepare company data from CSV.
-    companies = load_and_prepare_data('data/Electoral Bonds - Donors-list-category.csv')
-
-    # Load and prepare party data from CSV.
-    parties = load_and_prepare_party_data('data/Electoral Bonds - Party-list.csv')
+# The model is shared, read-only, by every session in the process. With copy-on-write,
+# frames the handlers derive from it (filters, `assign`, `head`, ...) copy data only when
+# they are modified.
+pd.set_option("mode.copy_on_write", True)
 
-    merged_df = merge_parties_companies(parties, companies)
 
-    # Summarize company data to get sorted lists and grouped data for display.
-    sorted_company, year_company_group, parent_company_group, category_group = (
-        summarize_data(companies)
+def main():
+    # Load the prepared company, party and merged data together with their summaries.
+    # The model is built once per version of the data files and shared, read-only,
+    # by every session, so handlers must derive view-local frames instead of mutating it.
+    model = load_data_model()
+    data_version = model.version
+    companies, merged_df = model.companies, model.merged_df
+    sorted_company, sorted_party = model.sorted_company, model.sorted_party
+    parent_company_group, category_group = model.parent_company_group, model.category_group
+
+    # Rows failing validation are quarantined while loading; say so instead of hiding it.
+    paths = data_paths()
+    quarantined = sum(
+        report["quarantined_rows"] for report in validation_reports() if report["dataset"] in paths
     )
-
-    # Summarize party data to get sorted lists and yearly grouped data for display.
-    sorted_party, party_year_group = summarize_party_data(parties)
+    if quarantined:
+        st.warning(
+            f"{quarantined} rows of the source data failed validation and are excluded from this analysis."
+        )
+
+    # The overviews cover the selected date range; their totals come from prefix sums
+    # per entity, so re-scoping does not re-aggregate the bonds.
+    start, end, full_range = select_date_range(st.sidebar, model)
+    overview_version = data_version
+    overview_window = None
+    overview_party = sorted_party
+    overview_company, overview_parent, overview_category = (
+        sorted_company, parent_company_group, category_group
+    )
+    if not full_range:
+        scoped = scoped_summaries(model, start, end)
+        overview_version = f"{data_version}:{start}:{end}"
+        overview_window = (start, end)
+        overview_company, overview_parent = scoped.sorted_company, scoped.parent_company_group
+        overview_category, overview_party = scoped.category_group, scoped.sorted_party
 
     # Display overview and detailed data for companies using the processed data.
     display_overall_company_data(
-        sorted_company, parent_company_group, category_group, company_ov_data
-    )
-    display_overall_company_visualization(
-        sorted_company, parent_company_group, category_group, companies, company_ov_vi
-    )
-    display_individual_company_data(
-        year_company_group, sorted_company, companies, merged_df, company_i
+        overview_company,
+        overview_parent,
+        overview_category,
+        company_ov_data,
+        overview_version,
+        overview_window,
     )
+    # Offer the full merged bond ledger for download.
+    company_ov_data.subheader("Download the Merged Bond Ledger")
+    display_export(company_ov_data, merged_df, "ledger_export", "ledger", data_version)
+    display_overall_company_visualization(category_group, companies, company_ov_vi)
+    display_individual_company_data(sorted_company, merged_df, company_i, data_version)
 
     # Display overview and detailed data for parties using the processed data.
-    display_overall_party_data(sorted_party, party_ov)
-    display_individual_party_data(party_year_group, sorted_party, parties, merged_df, party_i)
+    display_overall_party_data(overview_party, party_ov)
+    display_individual_party_data(sorted_party, merged_df, party_i, data_version)
+
+    # Display the donor-party network.
+    display_network(network_i)
+
+    # Cross-filter the matched bonds in the browser, without rerunning the app.
+    display_cross_filter(explore_i)
 
     # Display the latest news or relevant information.
     display_news(news_i)
@@ -70,12 +109,14 @@ if __name__ == "__main__":
     st.title("Decoding Indian Electoral Bonds: An In-depth Analysis")
 
     # Create tabs for organizing the display of company and party data, and news.
-    company_ov, company_i, party_ov, party_i, news_i = st.tabs(
+    company_ov, company_i, party_ov, party_i, network_i, explore_i, news_i = st.tabs(
         [
             "Company - OverAll",
             "Company - Individual",
             "Party - OverAll",
             "Party - Individual",
+            "Network",
+            "Explore",
             "News",
         ]
     )
@@ -0,0 +1,336 @@
+"""
+Load test for the Streamlit app. Drives `app.py` headlessly with AppTest over many
+simulated sessions, each replaying an interaction script, and reports rerun latency
+percentiles, throughput and peak memory per scenario.
+
+    python app_loadtest.py --processes 4 --threads 2 --output before.json
+    python app_loadtest.py --processes 4 --threads 2 --compare before.json
+
+Sessions are spread over worker processes, each running `--threads` sessions. AppTest
+swaps a process-global Runtime on every run, so the threads of one worker take turns to
+rerun; their waiting is reported as queueing. Use processes to measure parallel
+throughput and threads to measure how many sessions one process holds.
+
+Tabs are switched in the browser without a rerun, so they are not part of the scripts.
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import threading
+import time
+
+
+APP_SCRIPT = "app.py"
+TIMEOUT = 300
+
+
+def _widget(app, kind, name):
+    # Widgets with a key are found by key, the others by label.
+    widgets = getattr(app, kind)
+    for widget in widgets:
+        if widget.key == name:
+            return widget
+    return next(widget for widget in widgets if widget.key is None and widget.label == name)
+
+
+def _pick(app, kind, name, rng):
+    widget = _widget(app, kind, name)
+    return widget.set_value(rng.choice(widget.options))
+
+
+def _date_bounds(slider):
+    # AppTest reports the bounds of a date slider in microseconds since the epoch.
+    epoch = datetime.date(1970, 1, 1)
+    return tuple(epoch + datetime.timedelta(microseconds=bound) for bound in (slider.min, slider.max))
+
+
+def _set_date_range(app, rng):
+    slider = _widget(app, "slider", "date_range")
+    first, last = _date_bounds(slider)
+    days = (last - first).days
+    start = first + datetime.timedelta(days=rng.randrange(days // 2))
+    end = start + datetime.timedelta(days=rng.randrange(30, days // 2))
+    return slider.set_range(start, end)
+
+
+def _full_date_range(app, rng):
+    slider = _widget(app, "slider", "date_range")
+    return slider.set_range(*_date_bounds(slider))
+
+
+def _search_company(app, rng):
+    company = rng.choice(_widget(app, "selectbox", "Select a Company").options)
+    return _widget(app, "text_input", "company_overview_search").input(company.split()[0])
+
+
+def _expand_order(app, key, rng):
+    widget = _widget(app, "selectbox", key)
+    return widget.set_value(rng.choice(widget.options[1:] or widget.options))
+
+
+def _filter(app, name, rng, count=2):
+    widget = _widget(app, "multiselect", name)
+    return widget.set_value(rng.sample(widget.options, min(count, len(widget.options))))
+
+
+def _top_n(app, name, rng):
+    return _widget(app, "number_input", name).set_value(rng.randint(3, 30))
+
+
+# Each scenario is a list of (step, action); an action sets a widget of the app for the
+# next rerun.
+SCENARIOS = {
+    "overview": [
+        ("sort", lambda app, rng: _pick(app, "selectbox", "company_overview_sort", rng)),
+        ("page", lambda app, rng: _widget(app, "number_input", "company_overview_page").set_value(2)),
+        ("search", _search_company),
+        ("date range", _set_date_range),
+        ("full range", _full_date_range),
+    ],
+    "companies": [
+        ("company", lambda app, rng: _pick(app, "selectbox", "Select a Company", rng)),
+        ("sort", lambda app, rng: _pick(app, "selectbox", "company_transactions_sort", rng)),
+        ("order", lambda app, rng: _expand_order(app, "company_transactions_expand", rng)),
+        ("company", lambda app, rng: _pick(app, "selectbox", "Select a Company", rng)),
+        ("top parties", lambda app, rng: _top_n(app, "Select Number of parties", rng)),
+        ("company", lambda app, rng: _pick(app, "selectbox", "Select a Company", rng)),
+    ],
+    "parties": [
+        ("party", lambda app, rng: _pick(app, "selectbox", "Select a Party", rng)),
+        ("top companies", lambda app, rng: _top_n(app, "Select Number of companies", rng)),
+        ("order", lambda app, rng: _expand_order(app, "party_transactions_expand", rng)),
+        ("party", lambda app, rng: _pick(app, "selectbox", "Select a Party", rng)),
+        ("party", lambda app, rng: _pick(app, "selectbox", "Select a Party", rng)),
+    ],
+    "top_n": [
+        ("top entries", lambda app, rng: _top_n(app, "Select Number of Entries to Display", rng)),
+        ("category", lambda app, rng: _pick(app, "selectbox", "Select a Category", rng)),
+        ("parent company", lambda app, rng: _pick(app, "selectbox", "Select a Parent Company", rng)),
+        ("window", lambda app, rng: _pick(app, "selectbox", "Window (days before and after each event)", rng)),
+        ("network view", lambda app, rng: _pick(app, "radio", "View", rng)),
+        ("network nodes", lambda app, rng: _widget(app, "slider", "Maximum number of nodes").set_value(rng.randrange(10, 151, 10))),
+    ],
+    "filters": [
+        ("company", lambda app, rng: _pick(app, "selectbox", "Select a Company", rng)),
+        ("party filter", lambda app, rng: _filter(app, "Filter by party", rng)),
+        ("date filter", lambda app, rng: _filter(app, "Filter by date", rng)),
+        ("party", lambda app, rng: _pick(app, "selectbox", "Select a Party", rng)),
+        ("company filter", lambda app, rng: _filter(app, "Filter by Company", rng)),
+        ("transaction date filter", lambda app, rng: _filter(app, "Filter by transaction date", rng)),
+    ],
+}
+
+
+def run_session(scenario, iterations, seed, lock, results):
+    """
+    Runs one simulated session: a first render, then the steps of the scenario
+    `iterations` times, each followed by a rerun.
+
+    Parameters:
+    - scenario: Name of the scenario in SCENARIOS.
+    - iterations: Number of times the steps are replayed.
+    - seed: Seed of the random choices of the session.
+    - lock: Lock serializing the AppTest runs of the process.
+    - results: Dictionary of lists the timings and errors are appended to.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    app = AppTest.from_file(APP_SCRIPT, default_timeout=TIMEOUT)
+
+    def rerun(step, action):
+        waited = time.perf_counter()
+        with lock:
+            started = time.perf_counter()
+            try:
+                if action is None:
+                    app.run()
+                else:
+                    action(app, rng).run()
+                error = str(app.exception) if app.exception else None
+            except Exception as exc:
+                error = f"{type(exc).__name__}: {exc}"
+            seconds = time.perf_counter() - started
+        results["queued"].append(started - waited)
+        if error:
+            results["errors"].append(f"{step}: {error[:200]}")
+        return seconds
+
+    results["first_render"].append(rerun("first render", None))
+    for _ in range(iterations):
+        for step, action in SCENARIOS[scenario]:
+            results["reruns"].append(rerun(step, action))
+
+
+def run_worker(scenario, threads, iterations, seed, warm):
+    """
+    Runs `threads` sessions of a scenario in the current process.
+
+    Returns:
+    - Dictionary with the first render and rerun latencies, queueing, errors, wall time
+      of the sessions and peak resident memory of the process.
+    """
+    import contextlib
+    import io
+    import warnings
+
+    warnings.filterwarnings("ignore")
+    if warm:
+        from warmup import warm as warm_process
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            warm_process()
+
+    results = {"first_render": [], "reruns": [], "queued": [], "errors": []}
+    lock = threading.Lock()
+    sessions = [
+        threading.Thread(target=run_session, args=(scenario, iterations, seed + i, lock, results))
+        for i in range(threads)
+    ]
+    started = time.perf_counter()
+    # The app prints while rendering.
+    with contextlib.redirect_stdout(io.StringIO()):
+        for session in sessions:
+            session.start()
+        for session in sessions:
+            session.join()
+    results["seconds"] = time.perf_counter() - started
+    results["peak_rss_kib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return results
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def run_scenario(scenario, processes, threads, iterations, seed, warm):
+    """
+    Runs a scenario in fresh worker processes and aggregates their results.
+
+    Returns:
+    - Dictionary with the number of sessions and reruns, errors, latency percentiles in
+      milliseconds, reruns per second and peak memory in MiB.
+    """
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes) as pool:
+        workers = pool.starmap(
+            run_worker,
+            [(scenario, threads, iterations, seed + 1000 * i, warm) for i in range(processes)],
+        )
+    reruns = [seconds for worker in workers for seconds in worker["reruns"]]
+    first_render = [seconds for worker in workers for seconds in worker["first_render"]]
+    queued = [seconds for worker in workers for seconds in worker["queued"]]
+    errors = [error for worker in workers for error in worker["errors"]]
+    return {
+        "sessions": processes * threads,
+        "reruns": len(reruns),
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "first_render_p50_ms": statistics.median(first_render) * 1000,
+        "p50_ms": _percentile(reruns, 0.50) * 1000,
+        "p90_ms": _percentile(reruns, 0.90) * 1000,
+        "p99_ms": _percentile(reruns, 0.99) * 1000,
+        "max_ms": max(reruns, default=0.0) * 1000,
+        "queued_p50_ms": _percentile(queued, 0.50) * 1000,
+        "reruns_per_second": len(reruns) / max(worker["seconds"] for worker in workers),
+        "peak_rss_mib": max(worker["peak_rss_kib"] for worker in workers) / 1024,
+        "total_peak_rss_mib": sum(worker["peak_rss_kib"] for worker in workers) / 1024,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+COLUMNS = [
+    ("sessions", "sessions", "{:>10}"),
+    ("reruns", "reruns", "{:>8}"),
+    ("errors", "errors", "{:>8}"),
+    ("first_render_p50_ms", "first ms", "{:>10.0f}"),
+    ("p50_ms", "p50 ms", "{:>9.0f}"),
+    ("p90_ms", "p90 ms", "{:>9.0f}"),
+    ("p99_ms", "p99 ms", "{:>9.0f}"),
+    ("queued_p50_ms", "queued ms", "{:>11.0f}"),
+    ("reruns_per_second", "reruns/s", "{:>10.2f}"),
+    ("peak_rss_mib", "peak MiB", "{:>10.0f}"),
+]
+
+
+def print_report(report, baseline=None):
+    """
+    Prints the scenarios of a report, with the ratio to a baseline report when given.
+    """
+    header = "".join(f"{title:>{len(fmt.format(0))}}" for _, title, fmt in COLUMNS)
+    print(f"{'scenario':<12}{header}")
+    for scenario, result in report["scenarios"].items():
+        print(f"{scenario:<12}" + "".join(fmt.format(result[key]) for key, _, fmt in COLUMNS))
+        previous = (baseline or {}).get("scenarios", {}).get(scenario)
+        if previous:
+            ratios = "".join(
+                f"{'':>{len(fmt.format(0))}}"
+                if key in ("sessions", "reruns", "errors") or not previous[key]
+                else f"{result[key] / previous[key]:>{len(fmt.format(0)) - 1}.2f}x"
+                for key, _, fmt in COLUMNS
+            )
+            print(f"{'  vs base':<12}{ratios}")
+        for error in result["error_samples"]:
+            print(f"  error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Streamlit app with AppTest.")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=2, help="sessions per process")
+    parser.add_argument("--iterations", type=int, default=2, help="replays of each script")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cold", action="store_true", help="skip warming the workers")
+    parser.add_argument("--output", help="write the report to this JSON file")
+    parser.add_argument("--compare", help="JSON report of a previous run to compare with")
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    report = {
+        "commit": _git_commit(),
+        "started": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "settings": {
+            "processes": args.processes,
+            "threads": args.threads,
+            "iterations": args.iterations,
+            "seed": args.seed,
+            "warm": not args.cold,
+        },
+        "scenarios": {},
+    }
+    for scenario in args.scenarios:
+        report["scenarios"][scenario] = run_scenario(
+            scenario, args.processes, args.threads, args.iterations, args.seed, not args.cold
+        )
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
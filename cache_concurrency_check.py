@@ -0,0 +1,84 @@
+"""
+Checks that a burst of concurrent sessions triggers a single build per data stage, both on
+a cold start and after a data file changes, and prints the cache fill metrics.
+
+    python cache_concurrency_check.py --sessions 64
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from data_model import COMPANY_CSV, PARTY_CSV, cache_metrics, load_data_model
+
+
+def burst(sessions, company_csv, party_csv):
+    """
+    Starts `sessions` threads that request the data model at the same moment.
+
+    Returns:
+    - Set of distinct data versions the sessions received.
+    """
+    barrier = threading.Barrier(sessions)
+    versions = []
+    lock = threading.Lock()
+
+    def session():
+        barrier.wait()
+        model = load_data_model(company_csv, party_csv)
+        with lock:
+            versions.append(model.version)
+
+    threads = [threading.Thread(target=session) for _ in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return set(versions)
+
+
+def stage_metrics(prefix):
+    return {m["stage"].split(":")[0]: m for m in cache_metrics() if prefix in m["stage"]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Single-flight data cache check.")
+    parser.add_argument("--sessions", type=int, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        company_csv = shutil.copy(COMPANY_CSV, directory)
+        party_csv = shutil.copy(PARTY_CSV, directory)
+
+        cold_versions = burst(args.sessions, company_csv, party_csv)
+        cold = stage_metrics(directory)
+
+        # Simulate a refreshed party file and burst again.
+        stat = os.stat(party_csv)
+        os.utime(party_csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        refresh_versions = burst(args.sessions, company_csv, party_csv)
+        refresh = stage_metrics(directory)
+
+    print(f"{'stage':<12}{'fills':>7}{'waiters':>9}{'stale':>7}{'hits':>7}{'last fill s':>13}")
+    for stage, metrics in refresh.items():
+        print(
+            f"{stage:<12}{metrics['fills']:>7}{metrics['waiters']:>9}"
+            f"{metrics['stale_serves']:>7}{metrics['hits']:>7}{metrics['last_fill_seconds']:>13.3f}"
+        )
+
+    failures = []
+    if any(metrics["fills"] != 1 for metrics in cold.values()):
+        failures.append("cold start built a stage more than once")
+    if len(cold_versions) != 1:
+        failures.append("cold start sessions received different versions")
+    if refresh["model"]["fills"] != 2 or refresh["parties"]["fills"] != 2:
+        failures.append("refresh did not rebuild the model and party stages exactly once")
+    if refresh["companies"]["fills"] != 1:
+        failures.append("refresh rebuilt the unchanged donor stage")
+    if len(refresh_versions) > 2:
+        failures.append("refresh sessions received unexpected versions")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print("OK" if not failures else "FAILED")
+    sys.exit(1 if failures else 0)
@@ -1,8 +1,21 @@
 import urllib.parse
-import matplotlib.pyplot as plt
 import pandas as pd
 import streamlit as st
-from streamlit_echarts import st_echarts
+from concentration import (
+    CONCENTRATION_COLUMN_CONFIG,
+    CONCENTRATION_COLUMNS,
+    with_concentration,
+)
+from data_access import load_data_access
+from denominations import display_denomination_histogram
+from export_handler import display_export
+from lifecycle_analytics import display_lag_profile
+from news_handler import display_related_news
+from olap_cube import drill_down
+from purchase_orders import display_order_lines, load_purchase_orders
+from rankings import load_rankings, top_n, top_n_chart_data
+from similarity import display_similar_companies
+from table_handler import display_paged_table
 from utils import calculate_percentage, format_amount
 
 
@@ -32,42 +45,56 @@ def add_open_corporate_url(url):
     return url
 
 
-def display_overview(company_ov, sorted_company):
+def add_company_links(page):
+    """
+    Adds the display-only columns of the overview table to a single page of companies.
+
+    Parameters:
+    - page: DataFrame holding the visible rows of the overview.
+
+    Returns:
+    - A new DataFrame with `company_details` links and a readable `is_ED_raid` column.
+    """
+    return page.assign(
+        company_details=page["company_id"].apply(add_open_corporate_url),
+        is_ED_raid=page["is_ED_raid"].map({1: "Yes", 0: "No"}),
+    )
+
+
+def display_overview(company_ov, sorted_company, data_version):
     """
     Displays a comprehensive overview of electoral bond contributions.
 
     Parameters:
     - company_ov: Streamlit container for displaying data.
     - sorted_company: DataFrame containing sorted company data.
+    - data_version: Fingerprint of the data used to cache the table pages.
     """
     company_ov.subheader("Comprehensive Overview of Electoral Bond Contributions")
-
-    sorted_company["company_details"] = sorted_company["company_id"].apply(
-        add_open_corporate_url
-    )
-    # sorted_company = sorted_company.drop([" "], axis=1)
-    sorted_company = sorted_company.reset_index(drop=True)
-    sorted_company["is_ED_raid"] = sorted_company["is_ED_raid"].map({1: "Yes", 0: "No"})
     company_ov.markdown("---")
-    company_ov.dataframe(
-        sorted_company[
-            [
-                "Company",
-                "Category",
-                "Bond_count",
-                "Amount",
-                "Amount (₹ Cr)",
-                "percentage",
-                "is_ED_raid",
-                "Date of Raid",
-                "company_details",
-            ]
+    display_paged_table(
+        company_ov,
+        with_concentration(sorted_company, "company", "Company"),
+        "company_overview",
+        [
+            "Company",
+            "Category",
+            "Bond_count",
+            "Amount",
+            "Amount (₹ Cr)",
+            "percentage",
+            "is_ED_raid",
+            "Date of Raid",
+            "company_details",
+            *CONCENTRATION_COLUMNS,
         ],
-        use_container_width=True,
+        data_version,
         column_config={
             "company_details": st.column_config.LinkColumn("company_details"),
             "is_ED_raid": "ED Raid",
+            **CONCENTRATION_COLUMN_CONFIG,
         },
+        transform=add_company_links,
     )
 
 
@@ -85,6 +112,8 @@ def display_pie_chart(company_ov, sorted_company):
     )
     combined_df = pd.concat([top_5_df, others])
 
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots()
     ax.pie(
         combined_df["Amount"],
@@ -96,21 +125,24 @@ def display_pie_chart(company_ov, sorted_company):
     company_ov.pyplot(fig)
 
 
-def display_category_data(company_ov, category_group, sorted_company):
+def display_category_data(company_ov, category_group, window=None):
     """
     Displays data and allows interaction based on categories.
 
     Parameters:
     - company_ov: Streamlit container for displaying data.
     - category_group: DataFrame of aggregated category data.
-    - sorted_company: DataFrame containing sorted company data.
+    - window: Optional (start, end) date range the drill-downs are restricted to.
     """
     col1, col2 = company_ov.columns([3, 3])
     category_group = category_group.reset_index(drop=True)
     with col1:
         col1.subheader("Top Donor Categories by Electoral Bond Contributions")
         col1.dataframe(
-            category_group[["Category", "Bond_count", "Amount (₹ Cr)", "percentage"]],
+            with_concentration(category_group, "category", "Category")[
+                ["Category", "Bond_count", "Amount (₹ Cr)", "percentage", *CONCENTRATION_COLUMNS]
+            ],
+            column_config=CONCENTRATION_COLUMN_CONFIG,
             use_container_width=True,
         )
 
@@ -119,40 +151,34 @@ def display_category_data(company_ov, category_group, sorted_company):
         selected_category = col2.selectbox(
             "Select a Category", category_group["Category"]
         )
-        category_companies = sorted_company[
-            sorted_company["Category"] == selected_category
-        ].reset_index(drop=True)
-        category_companies["percentage"] = (
-            category_companies["Amount"] / category_companies["Amount"].sum() * 100
-        ).map("{:.2f}%".format)
+        if selected_category is None:
+            col2.write("No bonds were purchased in the selected date range.")
+            return
+        category_companies = drill_down("category_company", selected_category, window=window)
+        columns = ["Company", "Bond_count", "Amount (₹ Cr)", "percentage"]
         if selected_category == "Individuals":
-            col2.dataframe(
-                category_companies[
-                    [
-                        "Company",
-                        "Parent Company",
-                        "Bond_count",
-                        "Amount (₹ Cr)",
-                        "percentage",
-                    ]
-                ]
-            )
-        else:
-            col2.dataframe(
-                category_companies[
-                    ["Company", "Bond_count", "Amount (₹ Cr)", "percentage"]
-                ]
-            )
+            columns.insert(1, "Parent Company")
+        col2.dataframe(category_companies[columns].reset_index(drop=True))
 
+    category_years = drill_down("category_year", selected_category, window=window)
+    company_ov.subheader(f"{selected_category}: Contributions by Year")
+    company_ov.dataframe(
+        category_years[["Year", "Bond_count", "Amount (₹ Cr)", "percentage"]].reset_index(
+            drop=True
+        ),
+        use_container_width=True,
+    )
+    display_denomination_histogram(company_ov, "category", selected_category)
 
-def display_parent_company_data(company_ov, parent_company_group, sorted_company):
+
+def display_parent_company_data(company_ov, parent_company_group, window=None):
     """
-    Displays data and allows interaction based on categories.
+    Displays data and allows interaction based on parent companies.
 
     Parameters:
     - company_ov: Streamlit container for displaying data.
-    - category_group: DataFrame of aggregated category data.
-    - sorted_company: DataFrame containing sorted company data.
+    - parent_company_group: DataFrame of aggregated parent company data.
+    - window: Optional (start, end) date range the drill-downs are restricted to.
     """
     col1, col2 = company_ov.columns([3, 3])
     with col1:
@@ -163,17 +189,38 @@ def display_parent_company_data(company_ov, parent_company_group, sorted_company
         selected_parent_company = col2.selectbox(
             "Select a Parent Company", parent_company_group["Parent Company"]
         )
-        category_companies = sorted_company[
-            sorted_company["Parent Company"] == selected_parent_company
-        ].reset_index(drop=True)
-        category_companies["percentage"] = (
-            category_companies["Amount"] / category_companies["Amount"].sum() * 100
-        ).map("{:.2f}%".format)
-
+        if selected_parent_company is None:
+            col2.write("No bonds were purchased in the selected date range.")
+            return
+        parent_companies = drill_down("parent_company", selected_parent_company, window=window)
         col2.dataframe(
-            category_companies[["Company", "Bond_count", "Amount (₹ Cr)", "percentage"]]
+            parent_companies[["Company", "Bond_count", "Amount (₹ Cr)", "percentage"]].reset_index(
+                drop=True
+            )
         )
 
+    company_ov.subheader(f"Parties Receiving Bonds from {selected_parent_company}")
+    parent_parties = drill_down("parent_party", selected_parent_company, window=window)
+    if parent_parties is None:
+        company_ov.write("None of the bonds of this parent company were matched to a party.")
+        return
+    party_col, year_col = company_ov.columns([3, 3])
+    party_col.dataframe(
+        parent_parties[["party", "Bond_count", "Amount (₹ Cr)", "percentage"]].reset_index(
+            drop=True
+        ),
+        use_container_width=True,
+    )
+    selected_party = year_col.selectbox(
+        "Select a Party", parent_parties["party"], key="parent_party"
+    )
+    year_col.dataframe(
+        drill_down("parent_party", selected_parent_company, selected_party, window=window)[
+            ["Year", "Bond_count", "Amount (₹ Cr)", "percentage"]
+        ].reset_index(drop=True),
+        use_container_width=True,
+    )
+
 
 def display_major_contributors(company_ov, parent_company_group):
     """
@@ -207,7 +254,7 @@ def display_top_and_bottom_donors(company_ov, sorted_company):
 
 
 def display_overall_company_data(
-    sorted_company, parent_company_group, category_group, company_ov
+    sorted_company, parent_company_group, category_group, company_ov, data_version, window=None
 ):
     """
     Modular function to display overall company data.
@@ -217,12 +264,15 @@ def display_overall_company_data(
     - parent_company_group: DataFrame of aggregated parent company data.
     - category_group: DataFrame of aggregated category data.
     - company_ov: Streamlit container or page to display the data on.
+    - data_version: Fingerprint of the data used to cache the table pages.
+    - window: Optional (start, end) date range the summaries cover, which the drill-downs
+      follow.
     """
     display_metrics(company_ov, sorted_company)
-    display_overview(company_ov, sorted_company)
+    display_overview(company_ov, sorted_company, data_version)
     # display_pie_chart(company_ov, sorted_company) # Uncomment if pie chart display is desired
-    display_category_data(company_ov, category_group, sorted_company)
-    display_parent_company_data(company_ov, parent_company_group, sorted_company)
+    display_category_data(company_ov, category_group, window)
+    display_parent_company_data(company_ov, parent_company_group, window)
     display_top_and_bottom_donors(company_ov, sorted_company)
 
 
@@ -240,34 +290,34 @@ def select_company(company_i, sorted_company):
     return company_i.selectbox("Select a Company", sorted_company["Company"])
 
 
-def display_company_transactions(company_i, merged_df, selected_company):
+def display_company_transactions(company_i, merged_df, selected_company, data_version):
     """
-    Displays transactions of the selected company with a link to related news.
+    Displays the purchase orders of the selected company with a link to related news.
 
     Parameters:
     - company_i: Streamlit container for displaying data.
-    - companies: DataFrame containing company transaction data.
+    - merged_df: DataFrame of bonds joined with their redemptions, used for the export.
     - selected_company: The name of the selected company.
+    - data_version: Fingerprint of the data used to cache the table pages.
     """
-    company_transaction_details = merged_df[
-        merged_df["Company"] == selected_company
-    ].reset_index(drop=True)
+    order_lines = load_purchase_orders().order_lines
+    company_order_lines = order_lines[order_lines["Company"] == selected_company]
     company_i.subheader("Detailed Donor Contributions by Date")
     company_i.markdown("---")
     filter_left, filter_right = company_i.columns([3, 3])
     party_filter = filter_left.multiselect(
     'Filter by party',
-    sorted(company_transaction_details['party'].unique()))
+    sorted(company_order_lines['party'].unique()))
 
     date_filter = filter_right.multiselect(
     'Filter by date',
-    sorted(company_transaction_details['Date_x'].unique()))
+    sorted(company_order_lines['Date_x'].unique()))
 
     if party_filter:
-       company_transaction_details = company_transaction_details[company_transaction_details['party'].isin(party_filter)]
+       company_order_lines = company_order_lines[company_order_lines['party'].isin(party_filter)]
     
     if date_filter:
-        company_transaction_details = company_transaction_details[company_transaction_details['Date_x'].isin(date_filter)]
+        company_order_lines = company_order_lines[company_order_lines['Date_x'].isin(date_filter)]
 
     query = f"{selected_company.lower()} when:1y"
     encoded_query = urllib.parse.quote(query)
@@ -276,54 +326,59 @@ def display_company_transactions(company_i, merged_df, selected_company):
     company_i.markdown(
         f'<a href="{url}" target="_blank">{link_text}</a>', unsafe_allow_html=True
     )
-    company_i.dataframe(
-        company_transaction_details[
-            [
-                "Date_x",
-                "Reference No  (URN)",
-                "Journal Date",
-                "party",
-                "Amount_x",
-                "Prefix",
-                "Bond Number",
-            ]
+    # One row per purchase order and redeeming party; the bonds are listed on demand.
+    display_order_lines(
+        company_i,
+        company_order_lines.reset_index(drop=True),
+        "company_transactions",
+        [
+            "Date_x",
+            "Reference No  (URN)",
+            "Journal Date",
+            "party",
+            "Date_y",
+            "Bond_count",
+            "Amount",
+            "Bond ranges",
         ],
+        data_version,
+        view=f"company_transactions:{selected_company}:{party_filter}:{date_filter}",
         column_config={
             "Date_x": "Date",
-            "Amount_x": "Amount",
             "party": "party Redeemed",
+            "Date_y": "Date Redeemed",
+        },
+    )
+    display_export(
+        company_i,
+        merged_df,
+        "company_export",
+        f"company_{selected_company}_{party_filter}_{date_filter}",
+        data_version,
+        filters={
+            "Company": selected_company,
+            **({"party": party_filter} if party_filter else {}),
+            **({"Date_x": date_filter} if date_filter else {}),
         },
-        use_container_width=True,
     )
 
 
-def display_aggregate_transactions(company_i, sorted_company, selected_company):
+def display_aggregate_transactions(company_i, selected_company):
     """
     Displays aggregate transaction overview for the selected company.
 
     Parameters:
     - company_i: Streamlit container for displaying data.
-    - sorted_company: DataFrame containing sorted company data.
     - selected_company: The name of the selected company.
     """
-    overall_transaction_details = sorted_company[
-        sorted_company["Company"] == selected_company
-    ].reset_index(drop=True)
+    overall_transaction_details = load_data_access().entity_summary("company", selected_company)
     company_i.subheader("Aggregate Donor Transaction Overview")
     company_i.markdown("---")
     company_i.dataframe(overall_transaction_details)
 
 
-def display_parties_redeemed_bonds(
-    company_i, selected_company, merged_df, company_left
-):
-    companies_transactions = merged_df[
-        merged_df["Company"] == selected_company
-    ].reset_index(drop=True)
-    group_by_parties = companies_transactions.groupby("party").agg(
-        {"party": "first", "Amount_y": ["sum", "count"]}
-    )
-    group_by_parties.columns = ["party", "Amount", "bond_count"]
+def display_parties_redeemed_bonds(company_i, selected_company, company_left):
+    group_by_parties = load_data_access().counterparts("company", selected_company, "party")
     group_by_parties["Amount (₹ Cr)"] = group_by_parties["Amount"].apply(format_amount)
     group_by_parties["percentage"] = group_by_parties["Amount"].apply(
         lambda x: calculate_percentage(x, group_by_parties["Amount"].sum())
@@ -331,7 +386,6 @@ def display_parties_redeemed_bonds(
 
     company_left.subheader("Parties That Have Redeemed Bonds")
     company_left.markdown("---")
-    print(companies_transactions.columns)
     group_by_parties = group_by_parties.reset_index(drop=True)
     group_by_parties = group_by_parties.sort_values("Amount", ascending=False)
     company_left.dataframe(
@@ -349,41 +403,15 @@ def display_parties_redeemed_bonds(
     # })
 
 
-def top_contributors(company_i, merged_df, selected_company, company_right):
-    party_n = company_right.selectbox(
-        "Select Number of parties",
-        [5, 10, 15, 20],
+def top_contributors(selected_company, company_right):
+    party_n = company_right.number_input(
+        "Select Number of parties", min_value=1, max_value=100, value=5, step=1
     )
-    companies_transactions = merged_df[
-        merged_df["Company"] == selected_company
-    ].reset_index(drop=True)
-    group_by_parties = companies_transactions.groupby("party").agg(
-        {"party": "first", "Amount_y": ["sum", "count"]}
-    )
-    group_by_parties.columns = ["party", "Amount", "bond_count"]
-    group_by_parties["Amount (₹ Cr)"] = group_by_parties["Amount"].apply(format_amount)
-    group_by_parties["percentage"] = group_by_parties["Amount"].apply(
-        lambda x: calculate_percentage(x, group_by_parties["Amount"].sum())
-    )
-    group_by_parties = group_by_parties.sort_values("Amount", ascending=False)
-
-    top_df = group_by_parties.head(party_n)
-    others = pd.DataFrame(
-        data={
-            "party": ["Other"],
-            "Amount": [group_by_parties["Amount"][party_n:].sum()],
-        }
-    )
-    others["Amount (₹ Cr)"] = (others["Amount"] / 10**7).map("{:,.2f}".format)
-    combined_df = pd.concat([top_df, others])
-    combined_df["Amount (₹ Cr)"] = (
-        combined_df["Amount (₹ Cr)"].str.replace(",", "").astype(float)
-    )
-    data = (
-        combined_df[["party", "Amount (₹ Cr)"]]
-        .rename(columns={"party": "name", "Amount (₹ Cr)": "value"})
-        .to_dict("records")
+    # Parties are ranked once per data version; the top-N plus "Other" split is a slice.
+    top_parties = top_n(
+        load_rankings()["company_parties"], selected_company, party_n, "party"
     )
+    data = top_n_chart_data(top_parties, "party")
     options = {
         "tooltip": {"trigger": "item"},
         "legend": {"orient": "horizontal ", "bottom": "bottom"},
@@ -418,6 +446,8 @@ def top_contributors(company_i, merged_df, selected_company, company_right):
         ],
     }
     company_right.header(f"Electoral Contributors' for this party")
+    from streamlit_echarts import st_echarts
+
     with company_right:
         st_echarts(
             options=options,
@@ -425,23 +455,18 @@ def top_contributors(company_i, merged_df, selected_company, company_right):
         )
 
 
-def display_annual_contributions(company_i, year_company_group, selected_company):
+def display_annual_contributions(company_i, selected_company):
     """
     Displays annual contributions of the selected company.
 
     Parameters:
     - company_i: Streamlit container for displaying data.
-    - year_company_group: DataFrame containing annual company group data.
     - selected_company: The name of the selected company.
     """
-    selected_company_year_spendings = year_company_group[
-        year_company_group["Company"] == selected_company
-    ].reset_index(drop=True)
-    selected_company_year_spendings["Year"] = selected_company_year_spendings[
-        "Year"
-    ].astype(str)
-    selected_company_year_spendings["Amount (₹ Cr)"] = (
-        selected_company_year_spendings["Amount"] / 10**7
+    selected_company_year_spendings = load_data_access().entity_years("company", selected_company)
+    selected_company_year_spendings = selected_company_year_spendings.assign(
+        Year=selected_company_year_spendings["Year"].astype(str),
+        **{"Amount (₹ Cr)": selected_company_year_spendings["Amount"] / 10**7},
     )
 
     col1, col2 = company_i.columns([3, 3])
@@ -457,25 +482,25 @@ def display_annual_contributions(company_i, year_company_group, selected_company
         col2.line_chart(selected_company_year_spendings.set_index("Year")["Amount"])
 
 
-def display_individual_company_data(
-    year_company_group, sorted_company, companies, merged_df, company_i
-):
+def display_individual_company_data(sorted_company, merged_df, company_i, data_version):
     """
     Modular function to display data for an individual company, including transaction details,
     aggregate transactions, and annual contributions.
 
     Parameters:
-    - year_company_group: DataFrame containing annual company group data.
     - sorted_company: DataFrame containing sorted company data.
-    - companies: DataFrame containing company transaction data.
+    - merged_df: DataFrame of bonds joined with their redemptions.
     - company_i: Streamlit container or page to display the data on.
+    - data_version: Fingerprint of the data used to cache the table pages.
     """
     selected_company = select_company(company_i, sorted_company)
-    display_aggregate_transactions(company_i, sorted_company, selected_company)
+    display_aggregate_transactions(company_i, selected_company)
+    display_related_news(company_i, "company", selected_company)
     company_right, company_left = company_i.columns([3, 3])
-    display_parties_redeemed_bonds(
-        company_i, selected_company, merged_df, company_right
-    )
-    top_contributors(company_i, merged_df, selected_company, company_left)
-    display_annual_contributions(company_i, year_company_group, selected_company)
-    display_company_transactions(company_i, merged_df, selected_company)
+    display_parties_redeemed_bonds(company_i, selected_company, company_right)
+    top_contributors(selected_company, company_left)
+    display_annual_contributions(company_i, selected_company)
+    display_lag_profile(company_i, "company", selected_company)
+    display_denomination_histogram(company_i, "company", selected_company)
+    display_similar_companies(company_i, selected_company)
+    display_company_transactions(company_i, merged_df, selected_company, data_version)
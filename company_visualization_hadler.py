@@ -1,8 +1,5 @@
-import urllib.parse
-import matplotlib.pyplot as plt
-import pandas as pd
-from streamlit_echarts import st_echarts
-import streamlit as st
+from event_windows import display_event_windows
+from rankings import load_rankings, top_n, top_n_chart_data
 
 def bond_purchase_heatmap(company_ov_vi, companies):
     Years = companies['Year'].drop_duplicates().sort_values().tolist()
@@ -64,13 +61,17 @@ def bond_purchase_heatmap(company_ov_vi, companies):
             }
         ],
     }
+    from streamlit_echarts import st_echarts
+
     company_ov_vi.header("Annual Trends in Corporate Electoral Bond Investments")
     with company_ov_vi:
         st_echarts(option, height="500px")
 
 def top_category(company_ov_vi, category_group, n, left_Col):
     top_5_df = category_group.head(n)
-    top_5_df["Amount (₹ Cr)"] = top_5_df["Amount (₹ Cr)"].str.replace(",", "").astype(float)
+    top_5_df = top_5_df.assign(
+        **{"Amount (₹ Cr)": top_5_df["Amount (₹ Cr)"].str.replace(",", "").astype(float)}
+    )
     data = (
         top_5_df[["Category", "Amount (₹ Cr)"]]
         .rename(columns={"Category": "name", "Amount (₹ Cr)": "value"})
@@ -111,6 +112,8 @@ def top_category(company_ov_vi, category_group, n, left_Col):
             },
         ],
     }
+    from streamlit_echarts import st_echarts
+
     left_Col.header(f"Top {n} Contribution Categories: Distribution of Shares")
     with company_ov_vi:
         with left_Col:
@@ -120,22 +123,10 @@ def top_category(company_ov_vi, category_group, n, left_Col):
             )
 
 
-def top_contributors(company_ov_vi, sorted_company, n, right_col):
-    top_5_df = sorted_company.head(n)
-    others = pd.DataFrame(
-        data={"Company": ["Other"], "Amount": [sorted_company["Amount"][n:].sum()]}
-    )
-    others["Amount (₹ Cr)"] = (others["Amount"] / 10**7).map("{:,.2f}".format)
-    combined_df = pd.concat([top_5_df, others])
-    combined_df["Amount (₹ Cr)"] = (
-        combined_df["Amount (₹ Cr)"].str.replace(",", "").astype(float)
-    )
-    data = (
-        combined_df[["Company", "Amount (₹ Cr)"]]
-        .rename(columns={"Company": "name", "Amount (₹ Cr)": "value"})
-        .to_dict("records")
-    )
-   
+def top_contributors(company_ov_vi, n, right_col):
+    # Companies are ranked once per data version; the top-N plus "Other" split is a slice.
+    top_companies = top_n(load_rankings()["companies"], "", n, "Company")
+    data = top_n_chart_data(top_companies, "Company")
     options = {
        
         "tooltip": {"trigger": "item"},
@@ -170,6 +161,8 @@ def top_contributors(company_ov_vi, sorted_company, n, right_col):
             },
         ],
     }
+    from streamlit_echarts import st_echarts
+
     right_col.header(f"Top {n} Electoral Contributors' Share in Total Contributions")
     with company_ov_vi:
         with right_col:
@@ -179,15 +172,14 @@ def top_contributors(company_ov_vi, sorted_company, n, right_col):
             )
 
 
-def display_overall_company_visualization(
-    sorted_company, parent_company_group, category_group, companies, company_ov_vi
-):
-    n = company_ov_vi.selectbox(
-            "Select Number of Entries to Display", [5,10,15,20]
-        )
+def display_overall_company_visualization(category_group, companies, company_ov_vi):
+    n = company_ov_vi.number_input(
+        "Select Number of Entries to Display", min_value=1, max_value=100, value=5, step=1
+    )
     right_col, left_Col = company_ov_vi.columns([3,3])
     right_col.markdown(" <style>iframe{ height: 500px !important } ", unsafe_allow_html=True)
     left_Col.markdown(" <style>iframe{ height: 500px !important } ", unsafe_allow_html=True)
-    top_contributors(company_ov_vi, sorted_company, n, right_col)
+    top_contributors(company_ov_vi, n, right_col)
     top_category(company_ov_vi, category_group, n, left_Col)
     bond_purchase_heatmap(company_ov_vi, companies)
+    display_event_windows(company_ov_vi)
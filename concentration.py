@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from data_model import load_derived
+from rankings import build_ranking, build_rankings
+
+
+CONCENTRATION_COLUMNS = [
+    "HHI",
+    "Gini",
+    "Top-1 share",
+    "Top-5 share",
+    "Top-10 share",
+    "Effective N",
+]
+
+CONCENTRATION_COLUMN_CONFIG = {
+    "HHI": st.column_config.NumberColumn("HHI", format="%.0f"),
+    "Gini": st.column_config.NumberColumn("Gini", format="%.3f"),
+    "Top-1 share": st.column_config.NumberColumn("Top-1 share", format="%.3f"),
+    "Top-5 share": st.column_config.NumberColumn("Top-5 share", format="%.3f"),
+    "Top-10 share": st.column_config.NumberColumn("Top-10 share", format="%.3f"),
+    "Effective N": st.column_config.NumberColumn("Effective N", format="%.2f"),
+}
+
+
+def concentration_metrics(ranking):
+    """
+    Computes funding concentration metrics of every entity of a ranking in one pass over
+    its flat arrays, with one reduceat per sum.
+
+    Parameters:
+    - ranking: Ranking returned by `build_ranking`, with the counterparts of every entity
+      in descending order of amount.
+
+    Returns:
+    - DataFrame indexed by entity with:
+      - HHI: Herfindahl-Hirschman index of the counterpart shares, from 0 to 10,000.
+      - Gini: Gini coefficient of the counterpart amounts (0 when there is one).
+      - Top-1/5/10 share: Share of the amount from the largest 1, 5 and 10 counterparts.
+      - Effective N: Effective number of counterparts, 1 / sum of squared shares.
+    """
+    starts = ranking.offsets[:-1]
+    sizes = np.diff(ranking.offsets)
+    amounts = ranking.amounts.astype(float)
+    totals = np.add.reduceat(amounts, starts)
+    shares = amounts / np.repeat(totals, sizes)
+    rank = np.arange(len(amounts)) - np.repeat(starts, sizes)
+    sum_squares = np.add.reduceat(shares**2, starts)
+
+    # Gini over the amounts in ascending order: the counterpart ranked r of n is the
+    # (n - r)-th smallest.
+    ascending_position = np.repeat(sizes, sizes) - rank
+    weighted = np.add.reduceat(ascending_position * shares, starts)
+    gini = np.where(sizes > 1, (2 * weighted - (sizes + 1)) / sizes, 0.0)
+
+    metrics = {"HHI": sum_squares * 10_000, "Gini": gini}
+    for k in [1, 5, 10]:
+        metrics[f"Top-{k} share"] = np.add.reduceat(np.where(rank < k, shares, 0.0), starts)
+    metrics["Effective N"] = 1 / sum_squares
+    return pd.DataFrame(metrics, index=ranking.entity_index)
+
+
+def build_concentration(model):
+    """
+    Computes the concentration of every party over its donor companies, every company over
+    the parties it funded and every category over the parties its companies funded.
+
+    Parameters:
+    - model: DataModel returned by `load_data_model`.
+
+    Returns:
+    - Dictionary of "party", "company" and "category" to the metric DataFrames.
+    """
+    rankings = load_derived("rankings", build_rankings, model)
+    return {
+        "party": concentration_metrics(rankings["party_companies"]),
+        "company": concentration_metrics(rankings["company_parties"]),
+        "category": concentration_metrics(
+            build_ranking(model.merged_df, "Category", "party", "Amount_y")
+        ),
+    }
+
+
+def load_concentration():
+    """
+    Returns the concentration metrics of the current data version.
+    """
+    return load_derived("concentration", build_concentration)
+
+
+def with_concentration(summary, kind, name_column):
+    """
+    Adds the concentration metrics of the entities of a summary frame as columns.
+
+    Parameters:
+    - summary: Summary frame such as `sorted_company` or `sorted_party`.
+    - kind: "party", "company" or "category".
+    - name_column: Column of `summary` holding the entity names.
+
+    Returns:
+    - The summary with the CONCENTRATION_COLUMNS, missing for entities without matched bonds.
+    """
+    metrics = load_concentration()[kind].reindex(summary[name_column])
+    return summary.assign(
+        **{column: metrics[column].to_numpy() for column in CONCENTRATION_COLUMNS}
+    )
@@ -0,0 +1,367 @@
+"""
+Client-side cross-filtering of the matched bonds.
+
+The matched bonds are aggregated once per data version into a compact cube of company x
+month x category x party cells, with the amount and bond count of each cell. The cube is
+sent to the browser as zlib-compressed typed arrays with the dictionaries that decode the
+codes, and linked ECharts charts filter and re-aggregate it there, so interacting with
+the charts does not rerun the app. Months are those of redemption, as in the party views.
+
+Print the payload size of each grain against the budget with:
+
+    python cross_filter.py
+"""
+import argparse
+import base64
+import json
+import struct
+import zlib
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from data_model import load_derived
+
+
+DIMENSIONS = ["company", "month", "category", "party"]
+DIMENSION_COLUMNS = {"company": "Company", "category": "Category", "party": "party"}
+# Time grains from the finest down; the finest grain within the budget is sent.
+GRAINS = {"month": "M", "year": "Y"}
+PAYLOAD_BUDGET_BYTES = 256 * 1024
+ECHARTS_URL = "https://cdn.jsdelivr.net/npm/echarts@5/dist/echarts.min.js"
+FRAME_HEIGHT = 980
+
+CrossFilter = namedtuple(
+    "CrossFilter", ["grain", "cells", "raw_bytes", "compressed_bytes", "html"]
+)
+
+
+def _unsigned(size):
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if size <= np.iinfo(dtype).max + 1:
+            return dtype
+    return np.uint64
+
+
+def build_cells(merged_df, grain="month"):
+    """
+    Aggregates the matched bonds into the cells of the cube.
+
+    Parameters:
+    - merged_df: DataFrame of bonds joined with their redemptions.
+    - grain: Time grain of the cube, a key of GRAINS.
+
+    Returns:
+    - Tuple of a dictionary of column name to numpy array (the dimension codes, amount and
+      bond_count of every non-empty cell) and a dictionary of dimension name to the list of
+      names its codes decode to.
+    """
+    periods = merged_df["Date_format_y"].dt.to_period(GRAINS[grain]).astype(str)
+    keys = {"month": periods, **{d: merged_df[c] for d, c in DIMENSION_COLUMNS.items()}}
+    cells = (
+        merged_df.groupby([keys[d].rename(d) for d in DIMENSIONS], observed=True)["Amount_y"]
+        .agg(amount="sum", bond_count="count")
+        .reset_index()
+    )
+
+    columns, dictionaries = {}, {}
+    for dimension in DIMENSIONS:
+        codes, names = pd.factorize(cells[dimension], sort=True)
+        columns[dimension] = codes.astype(_unsigned(len(names)))
+        dictionaries[dimension] = names.tolist()
+    # Sums of whole rupees stay exact as float64 up to 2**53.
+    columns["amount"] = cells["amount"].to_numpy(np.float64)
+    columns["bond_count"] = cells["bond_count"].to_numpy(_unsigned(cells["bond_count"].max() + 1))
+    return columns, dictionaries
+
+
+def encode_cells(columns, dictionaries, grain):
+    """
+    Packs the cells into the payload decoded by the page: a little-endian uint32 header
+    length, the JSON header with the dictionaries and column layout, then, from the next
+    multiple of 8 bytes, every column as a typed array aligned to 8 bytes.
+
+    Returns:
+    - Tuple of the uncompressed and the zlib-compressed payload.
+    """
+    layout, blobs, offset = [], [], 0
+    for name, values in columns.items():
+        data = values.astype(values.dtype.newbyteorder("<")).tobytes()
+        layout.append(
+            {"name": name, "type": values.dtype.name, "offset": offset, "length": len(values)}
+        )
+        padding = -len(data) % 8
+        blobs.append(data + b"\0" * padding)
+        offset += len(data) + padding
+
+    header = {"grain": grain, "dictionaries": dictionaries, "columns": layout}
+    encoded = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode()
+    start = struct.pack("<I", len(encoded)) + encoded
+    raw = start + b"\0" * (-len(start) % 8) + b"".join(blobs)
+    return raw, zlib.compress(raw, 9)
+
+
+def build_cross_filter(model, budget=PAYLOAD_BUDGET_BYTES):
+    """
+    Builds the cube at the finest grain whose compressed payload fits the budget, and the
+    page that cross-filters it.
+
+    Parameters:
+    - model: DataModel returned by `load_data_model`.
+    - budget: Maximum size of the compressed payload, in bytes.
+
+    Returns:
+    - CrossFilter with the grain, number of cells, payload sizes and page HTML.
+
+    Raises:
+    - ValueError: If the payload exceeds the budget even at the coarsest grain.
+    """
+    sizes = []
+    for grain in GRAINS:
+        columns, dictionaries = build_cells(model.merged_df, grain)
+        raw, compressed = encode_cells(columns, dictionaries, grain)
+        sizes.append(f"{grain}: {len(compressed)} bytes")
+        if len(compressed) <= budget:
+            payload = base64.b64encode(compressed).decode()
+            return CrossFilter(
+                grain,
+                len(columns["amount"]),
+                len(raw),
+                len(compressed),
+                PAGE_TEMPLATE.replace("__ECHARTS_URL__", ECHARTS_URL).replace("__PAYLOAD__", payload),
+            )
+    raise ValueError(
+        f"The cross-filter payload exceeds the budget of {budget} bytes ({', '.join(sizes)})."
+    )
+
+
+def load_cross_filter():
+    """
+    Returns the cross-filter cube and page of the current data version.
+    """
+    return load_derived("cross_filter", build_cross_filter)
+
+
+def display_cross_filter(container):
+    """
+    Displays the cross-filtered overview. The page and its cube are only sent when the
+    toggle is on, and filtering in it happens in the browser.
+
+    Parameters:
+    - container: Streamlit container for displaying data.
+    """
+    container.subheader("Explore Donations Across Companies, Parties and Time")
+    if not container.toggle(
+        "Load the interactive overview",
+        key="cross_filter_enabled",
+        help="Sends a compressed summary of every matched bond to the browser once; "
+        "clicking and zooming the charts then filters it without reloading the page.",
+    ):
+        return
+    cross_filter = load_cross_filter()
+    container.caption(
+        f"{cross_filter.cells} {cross_filter.grain}ly cells, "
+        f"{cross_filter.compressed_bytes / 1024:.0f} KiB compressed from "
+        f"{cross_filter.raw_bytes / 1024:.0f} KiB. Click bars to filter; zoom the timeline "
+        "to restrict the period."
+    )
+    import streamlit.components.v1 as components
+
+    with container:
+        components.html(cross_filter.html, height=FRAME_HEIGHT, scrolling=True)
+
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<script src="__ECHARTS_URL__"></script>
+<style>
+body { font-family: "Source Sans Pro", sans-serif; margin: 0; color: #31333f; }
+#summary { margin: 0.5rem 0; }
+#summary button { margin-left: 1rem; }
+.grid { display: grid; grid-template-columns: 1fr 1fr; gap: 0.5rem; }
+.chart { height: 440px; }
+.wide { grid-column: 1 / 3; height: 300px; }
+</style>
+</head>
+<body>
+<div id="summary"></div>
+<div class="grid">
+<div class="chart wide" id="month"></div>
+<div class="chart" id="party"></div>
+<div class="chart" id="category"></div>
+<div class="chart wide" id="company"></div>
+</div>
+<script>
+const TYPES = {uint8: Uint8Array, uint16: Uint16Array, uint32: Uint32Array, float64: Float64Array};
+const CRORE = 1e7;
+const TOP_COMPANIES = 25;
+const SELECTED = "#d62728";
+
+async function decode(payload) {
+  const bytes = Uint8Array.from(atob(payload), (c) => c.charCodeAt(0));
+  const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("deflate"));
+  const buffer = await new Response(stream).arrayBuffer();
+  const length = new DataView(buffer).getUint32(0, true);
+  const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, length)));
+  const base = Math.ceil((4 + length) / 8) * 8;
+  const columns = {};
+  for (const column of header.columns) {
+    columns[column.name] = new TYPES[column.type](buffer, base + column.offset, column.length);
+  }
+  return {dictionaries: header.dictionaries, grain: header.grain, columns};
+}
+
+function main(cube) {
+  const {columns, dictionaries} = cube;
+  const cells = columns.amount.length;
+  const filters = {company: new Set(), category: new Set(), party: new Set(), month: null};
+  const charts = {};
+
+  // Sums the cells passing every filter except the one on `dimension`, by its code.
+  function aggregate(dimension) {
+    const amount = new Float64Array(dictionaries[dimension].length);
+    const count = new Float64Array(dictionaries[dimension].length);
+    const codes = columns[dimension];
+    for (let i = 0; i < cells; i++) {
+      if (!passes(i, dimension)) continue;
+      amount[codes[i]] += columns.amount[i];
+      count[codes[i]] += columns.bond_count[i];
+    }
+    return {amount, count};
+  }
+
+  function passes(i, skip) {
+    for (const dimension of ["company", "category", "party"]) {
+      if (dimension !== skip && filters[dimension].size && !filters[dimension].has(columns[dimension][i])) return false;
+    }
+    if (skip !== "month" && filters.month) {
+      const month = columns.month[i];
+      if (month < filters.month[0] || month > filters.month[1]) return false;
+    }
+    return true;
+  }
+
+  function ranked(dimension, limit) {
+    const {amount, count} = aggregate(dimension);
+    const order = Array.from(amount.keys()).filter((code) => amount[code] > 0 || filters[dimension].has(code));
+    order.sort((a, b) => amount[b] - amount[a]);
+    return order.slice(0, limit).map((code) => ({
+      name: dictionaries[dimension][code],
+      value: +(amount[code] / CRORE).toFixed(2),
+      code,
+      bonds: count[code],
+      itemStyle: filters[dimension].has(code) ? {color: SELECTED} : undefined,
+    }));
+  }
+
+  function barOption(title, data, horizontal) {
+    const names = {type: "category", data: data.map((d) => d.name), inverse: horizontal,
+                   axisLabel: {width: 160, overflow: "truncate", rotate: horizontal ? 0 : 30}};
+    const values = {type: "value", name: "Amount (₹ Cr)"};
+    return {
+      title: {text: title, textStyle: {fontSize: 14}},
+      tooltip: {formatter: (p) => `${p.name}<br>₹ ${p.value} Cr in ${p.data.bonds} bonds`},
+      grid: {left: horizontal ? 170 : 60, right: 20, bottom: horizontal ? 30 : 90, containLabel: false},
+      xAxis: horizontal ? values : names,
+      yAxis: horizontal ? names : values,
+      series: [{type: "bar", data}],
+    };
+  }
+
+  function render() {
+    const months = aggregate("month");
+    charts.month.setOption({
+      series: [{data: Array.from(months.amount, (amount) => +(amount / CRORE).toFixed(2))}],
+    });
+    charts.party.setOption(barOption("Parties", ranked("party"), true), {replaceMerge: ["series"]});
+    charts.category.setOption(barOption("Donor categories", ranked("category"), true), {replaceMerge: ["series"]});
+    charts.company.setOption(barOption(`Top ${TOP_COMPANIES} companies`, ranked("company", TOP_COMPANIES), false), {replaceMerge: ["series"]});
+
+    let amount = 0, bonds = 0;
+    for (let i = 0; i < cells; i++) {
+      if (passes(i, null)) { amount += columns.amount[i]; bonds += columns.bond_count[i]; }
+    }
+    const active = ["company", "category", "party"]
+      .filter((dimension) => filters[dimension].size)
+      .map((dimension) => `${dimension}: ${Array.from(filters[dimension], (code) => dictionaries[dimension][code]).join(", ")}`);
+    if (filters.month) {
+      active.push(`${cube.grain}: ${dictionaries.month[filters.month[0]]} to ${dictionaries.month[filters.month[1]]}`);
+    }
+    const summary = document.getElementById("summary");
+    summary.textContent = `₹ ${(amount / CRORE).toLocaleString("en-IN", {maximumFractionDigits: 2})} Cr in ${bonds.toLocaleString("en-IN")} bonds` +
+      (active.length ? ` | ${active.join(" | ")}` : "");
+    if (active.length) {
+      const clear = document.createElement("button");
+      clear.textContent = "Clear filters";
+      clear.onclick = () => {
+        for (const dimension of ["company", "category", "party"]) filters[dimension].clear();
+        filters.month = null;
+        charts.month.dispatchAction({type: "dataZoom", start: 0, end: 100});
+        render();
+      };
+      summary.appendChild(clear);
+    }
+  }
+
+  for (const dimension of DIMENSIONS) charts[dimension] = echarts.init(document.getElementById(dimension));
+  charts.month.setOption({
+    title: {text: "Redemptions by " + cube.grain, textStyle: {fontSize: 14}},
+    tooltip: {trigger: "axis"},
+    grid: {left: 60, right: 20, bottom: 60},
+    xAxis: {type: "category", data: dictionaries.month},
+    yAxis: {type: "value", name: "Amount (₹ Cr)"},
+    dataZoom: [{type: "slider"}, {type: "inside"}],
+    series: [{type: "bar", data: []}],
+  });
+  charts.month.on("datazoom", () => {
+    const zoom = charts.month.getOption().dataZoom[0];
+    const last = dictionaries.month.length - 1;
+    filters.month = zoom.startValue === 0 && zoom.endValue === last ? null : [zoom.startValue, zoom.endValue];
+    render();
+  });
+  for (const dimension of ["company", "category", "party"]) {
+    charts[dimension].on("click", (params) => {
+      const selected = filters[dimension];
+      selected.has(params.data.code) ? selected.delete(params.data.code) : selected.add(params.data.code);
+      render();
+    });
+  }
+  window.addEventListener("resize", () => Object.values(charts).forEach((chart) => chart.resize()));
+  render();
+}
+
+const DIMENSIONS = ["month", "party", "category", "company"];
+decode("__PAYLOAD__").then(main);
+</script>
+</body>
+</html>
+"""
+
+
+def main():
+    from data_model import build_data_model, data_paths
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget", type=int, default=PAYLOAD_BUDGET_BYTES)
+    args = parser.parse_args()
+
+    model = build_data_model(*data_paths())
+    print(f"{'grain':<8}{'cells':>8}{'raw KiB':>10}{'zlib KiB':>10}{'base64 KiB':>12}")
+    for grain in GRAINS:
+        columns, dictionaries = build_cells(model.merged_df, grain)
+        raw, compressed = encode_cells(columns, dictionaries, grain)
+        encoded = len(base64.b64encode(compressed))
+        print(
+            f"{grain:<8}{len(columns['amount']):>8}{len(raw) / 1024:>10.1f}"
+            f"{len(compressed) / 1024:>10.1f}{encoded / 1024:>12.1f}"
+        )
+    cross_filter = build_cross_filter(model, args.budget)
+    print(
+        f"Sending the {cross_filter.grain} cube: {cross_filter.compressed_bytes} of "
+        f"{args.budget} budgeted bytes, page {len(cross_filter.html) / 1024:.1f} KiB"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Data access for the per-entity views of the handlers.
+
+The pandas backend filters and groups the frames of the data model; the SQLite backend
+pushes the same filters and group-bys down into indexed queries on the database written
+by `sqlite_store`. Both return the same frames. When the database of the current data
+files exists, the SQLite backend opens it without building the data model. Compare the
+backends on every company and party with:
+
+    python data_access.py
+"""
+import argparse
+import threading
+import time
+import pandas as pd
+from data_loader import data_fingerprint
+from data_model import data_paths, load_data_model, load_derived
+from sqlite_store import (
+    connect,
+    database_version,
+    load_database,
+    quote,
+    read_frame,
+    read_meta,
+    storage_settings,
+)
+
+
+# Name column of the transactions and summary tables of each kind of entity.
+ENTITY_COLUMNS = {"company": "Company", "party": "party"}
+SUMMARY_TABLES = {"company": "sorted_company", "party": "sorted_party"}
+YEAR_TABLES = {"company": "year_company_group", "party": "party_year_group"}
+
+_sqlite_backends = {}
+_sqlite_backends_lock = threading.Lock()
+
+
+class PandasBackend:
+    """
+    Answers the per-entity queries from the frames of a data model.
+    """
+
+    def __init__(self, model):
+        self.model = model
+
+    def _rows(self, table, kind, name):
+        frame = getattr(self.model, table)
+        return frame[frame[ENTITY_COLUMNS[kind]] == name].reset_index(drop=True)
+
+    def entity_summary(self, kind, name):
+        """
+        Returns the summary row of a company or party.
+        """
+        return self._rows(SUMMARY_TABLES[kind], kind, name)
+
+    def entity_years(self, kind, name):
+        """
+        Returns the yearly summary rows of a company or party.
+        """
+        return self._rows(YEAR_TABLES[kind], kind, name)
+
+    def counterparts(self, kind, name, by, attributes=()):
+        """
+        Aggregates the matched bonds of a company or party by a column.
+
+        Parameters:
+        - kind: "company" or "party".
+        - name: Name of the company or party.
+        - by: Column to group by, such as "party", "Company" or "Category".
+        - attributes: Columns constant within a group to carry along.
+
+        Returns:
+        - DataFrame with the `by` column, the attributes, the redeemed Amount and the
+          bond_count, sorted by the `by` column.
+        """
+        bonds = self._rows("merged_df", kind, name)
+        grouped = bonds.groupby(by).agg(
+            **{column: (column, "first") for column in attributes},
+            Amount=("Amount_y", "sum"),
+            bond_count=("Amount_y", "count"),
+        )
+        return grouped.reset_index()
+
+
+class SQLiteBackend:
+    """
+    Answers the per-entity queries with indexed queries on the SQLite database.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # SQLite connections cannot be shared between threads; each session thread opens
+        # its own, read-only.
+        self._local = threading.local()
+        self.version, self.schemas = read_meta(self._connection())
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = connect(self.path)
+        return connection
+
+    def _rows(self, table, kind, name):
+        frame = read_frame(
+            self._connection(),
+            table,
+            self.schemas[table],
+            f"{quote(ENTITY_COLUMNS[kind])} = ?",
+            (name,),
+        )
+        return frame.reset_index(drop=True)
+
+    def entity_summary(self, kind, name):
+        return self._rows(SUMMARY_TABLES[kind], kind, name)
+
+    def entity_years(self, kind, name):
+        return self._rows(YEAR_TABLES[kind], kind, name)
+
+    def counterparts(self, kind, name, by, attributes=()):
+        entity, group = quote(ENTITY_COLUMNS[kind]), quote(by)
+        # pandas' "first" is the first non-missing value of the group in row order.
+        firsts = [
+            f"(SELECT bond.{quote(column)} FROM merged_df AS bond "
+            f"WHERE bond.{entity} = ? AND bond.{group} = matched.{group} "
+            f"AND bond.{quote(column)} IS NOT NULL ORDER BY bond.rowid LIMIT 1) AS {quote(column)}"
+            for column in attributes
+        ]
+        columns = ", ".join(
+            [f"matched.{group}", *firsts, 'SUM("Amount_y") AS "Amount"', 'COUNT("Amount_y") AS "bond_count"']
+        )
+        sql = (
+            f"SELECT {columns} FROM merged_df AS matched WHERE matched.{entity} = ? "
+            f"AND matched.{group} IS NOT NULL GROUP BY matched.{group} ORDER BY matched.{group}"
+        )
+        params = (name,) * (len(attributes) + 1)
+        grouped = pd.read_sql_query(sql, self._connection(), params=params)
+        column_types = {
+            column: spec["dtype"] for column, spec in self.schemas["merged_df"]["columns"].items()
+        }
+        return grouped.astype(
+            {
+                **{
+                    column: column_types[column]
+                    for column in [by, *attributes]
+                    if column_types[column] != "object"
+                },
+                "Amount": column_types["Amount_y"],
+                "bond_count": "int64",
+            }
+        )
+
+
+def _open_sqlite_backend(path, version):
+    """
+    Returns the process-wide SQLiteBackend of a database holding a data version, or None
+    if the database at the path holds another version or none.
+    """
+    with _sqlite_backends_lock:
+        backend = _sqlite_backends.get(path)
+        if backend is not None and backend.version == version:
+            return backend
+        if database_version(path) != version:
+            return None
+        backend = _sqlite_backends[path] = SQLiteBackend(path)
+        return backend
+
+
+def load_data_access(model=None):
+    """
+    Returns the data access backend configured in the `storage` secrets. The SQLite
+    backend opens a current database directly, and builds the data model only to ingest
+    a missing or stale one.
+
+    Parameters:
+    - model: Optional DataModel; defaults to the current one.
+
+    Returns:
+    - SQLiteBackend when the SQLite backend is configured, otherwise a PandasBackend.
+    """
+    backend, path = storage_settings()
+    if backend == "sqlite":
+        version = model.version if model else data_fingerprint(*data_paths())
+        sqlite_backend = _open_sqlite_backend(path, version)
+        if sqlite_backend is not None:
+            return sqlite_backend
+        return load_derived(
+            "data_access", lambda model: SQLiteBackend(load_database(model)), model
+        )
+    return PandasBackend(model or load_data_model())
+
+
+QUERIES = [
+    ("entity_summary", "company", ()),
+    ("entity_years", "company", ()),
+    ("counterparts", "company", ("party",)),
+    ("entity_summary", "party", ()),
+    ("entity_years", "party", ()),
+    ("counterparts", "party", ("Category",)),
+    (
+        "counterparts",
+        "party",
+        ("Company", ("is_ED_raid", "Date of Raid", "Parent Company", "Category")),
+    ),
+]
+
+
+def main():
+    from data_model import build_data_model, data_paths
+    from sqlite_store import DATABASE_PATH, write_database
+
+    parser = argparse.ArgumentParser(description="Check that both backends return the same results.")
+    parser.add_argument("--path", default=DATABASE_PATH)
+    args = parser.parse_args()
+
+    model = build_data_model(*data_paths())
+    write_database(model, args.path)
+    backends = {"pandas": PandasBackend(model), "sqlite": SQLiteBackend(args.path)}
+
+    print(f"{'query':<30}{'entities':>10}{'pandas ms':>12}{'sqlite ms':>12}")
+    for method, kind, arguments in QUERIES:
+        names = getattr(model, SUMMARY_TABLES[kind])[ENTITY_COLUMNS[kind]].unique()
+        results, seconds = {}, {}
+        for backend_name, backend in backends.items():
+            started = time.perf_counter()
+            results[backend_name] = [
+                getattr(backend, method)(kind, name, *arguments) for name in names
+            ]
+            seconds[backend_name] = (time.perf_counter() - started) / len(names) * 1000
+        for name, expected, actual in zip(names, results["pandas"], results["sqlite"]):
+            try:
+                pd.testing.assert_frame_equal(expected, actual)
+            except AssertionError as error:
+                raise AssertionError(f"{method}({kind}, {name}, {arguments}): {error}")
+        label = f"{method}({', '.join([kind, *arguments[:1]])})"
+        print(f"{label:<30}{len(names):>10}{seconds['pandas']:>12.2f}{seconds['sqlite']:>12.2f}")
+    print("Both backends returned the same frames.")
+
+
+if __name__ == "__main__":
+    main()
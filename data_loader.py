@@ -1,8 +1,111 @@
+import hashlib
+import os
+import numpy as np
 import pandas as pd
 import streamlit as st
+from remote_source import get_source
 # from streamlit_gsheets import GSheetsConnection
 
 
+# Electoral bonds were sold in these denominations only; the category code of an amount
+# is its position in this list, and -1 for anything else.
+DENOMINATIONS = [1_000, 10_000, 1_00_000, 10_00_000, 1_00_00_000]
+
+
+def google_sheet_url(secret_key, sheet_name):
+    """
+    Builds the CSV export URL of a Google Sheets tab configured in the Streamlit secrets.
+
+    Parameters:
+    - secret_key: Key of the sheet id in the `google_sheets` secrets section.
+    - sheet_name: Name of the tab to export.
+
+    Returns:
+    - The CSV export URL, or None if no secrets or no such sheet id are configured.
+    """
+    if not st.secrets.load_if_toml_exists():
+        return None
+    sheet_id = st.secrets.get("google_sheets", {}).get(secret_key)
+    if not sheet_id:
+        return None
+    return f"https://docs.google.com/spreadsheets/d/{sheet_id}/gviz/tq?tqx=out:csv&sheet={sheet_name}"
+
+
+def sheet_source_path(csv_file, secret_key, sheet_name):
+    """
+    Resolves the file to load for an input that may be backed by a Google Sheet. If the sheet
+    is configured, returns the last-good local copy of it (refreshed in the background) and
+    falls back to the bundled CSV until the first fetch succeeds.
+
+    Parameters:
+    - csv_file: Path to the bundled CSV file.
+    - secret_key: Key of the sheet id in the `google_sheets` secrets section.
+    - sheet_name: Name of the tab to export.
+
+    Returns:
+    - Path of the file to load.
+    """
+    url = google_sheet_url(secret_key, sheet_name)
+    if url is None:
+        return csv_file
+    return get_source(f"{sheet_name}.csv", url, fallback_path=csv_file).path() or csv_file
+
+
+def data_fingerprint(*paths):
+    """
+    Computes a cheap version identifier for a set of data files from their size and
+    modification time, so caches can be keyed on the data without hashing its contents.
+
+    Parameters:
+    - paths: Paths of the data files.
+
+    Returns:
+    - A short hexadecimal string that changes whenever any of the files changes.
+    """
+    digest = hashlib.sha1()
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:16]
+
+
+def parse_amounts(amounts):
+    """
+    Converts amount strings with Indian digit grouping ("1,00,000") to numbers. Amounts
+    repeat a handful of denominations, so only the distinct strings are parsed.
+
+    Parameters:
+    - amounts: Series of amount strings or numbers.
+
+    Returns:
+    - Float Series, with missing values for amounts that are not numbers.
+    """
+    codes, uniques = pd.factorize(amounts)
+    parsed = pd.to_numeric(
+        pd.Series(uniques).astype(str).str.replace(",", ""), errors="coerce"
+    ).to_numpy(dtype=float)
+    # Missing values have code -1, which picks the trailing NaN.
+    return pd.Series(np.append(parsed, np.nan)[codes], index=amounts.index)
+
+
+def denomination_codes(amounts):
+    """
+    Encodes amounts as an ordered categorical over the bond denominations, stored as one
+    byte per row with DENOMINATIONS as the lookup table. The donor and party frames keep
+    the int64 Amount as well, which their aggregates sum; the fact store keeps only the
+    codes, and the merged ledger one amount per bond.
+
+    Parameters:
+    - amounts: Series of amounts.
+
+    Returns:
+    - Categorical Series; non-standard or missing amounts have code -1.
+    """
+    return pd.Series(
+        pd.Categorical(amounts, categories=DENOMINATIONS, ordered=True), index=amounts.index
+    )
+
+
 def load_and_prepare_data(csv_file):
     """
     Loads company data from a CSV file, preprocesses it by renaming columns, standardizing company names,
@@ -14,9 +117,7 @@ def load_and_prepare_data(csv_file):
     Returns:
     - DataFrame with preprocessed company data.
     """
-    # sheet_id = st.secrets["google_sheets"]["sheet_id"]
-    # sheet_name = "Donors-list"
-    # url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/gviz/tq?tqx=out:csv&sheet={sheet_name}"
+    # Sheet-backed inputs are resolved to a local copy by `sheet_source_path` beforehand.
     companies = pd.read_csv(csv_file)
 
     # Rename columns for clarity and consistency
@@ -43,13 +144,15 @@ def load_and_prepare_data(csv_file):
             pattern, replacement, regex=True
         )
 
-    # Convert amount strings to integers
-    companies["Amount"] = (
-        companies["Amount"].str.replace(",", "").astype(float).astype("int64")
-    )
+    # Convert amount strings to numbers. Malformed amounts and dates become missing values,
+    # which `data_validation` quarantines before restoring the integer types.
+    companies["Amount"] = parse_amounts(companies["Amount"])
+    companies["Denomination"] = denomination_codes(companies["Amount"])
 
     # Parse dates and extract year
-    companies["Date_format"] = pd.to_datetime(companies["Date"], format="%d/%b/%Y")
+    companies["Date_format"] = pd.to_datetime(
+        companies["Date"], format="%d/%b/%Y", errors="coerce"
+    )
     companies["Year"] = companies["Date_format"].dt.year
     companies["Month"] = companies["Date_format"].dt.strftime("%b")
 
@@ -60,17 +163,23 @@ def load_and_prepare_data(csv_file):
     return companies
 
 def news_articles_loader():
-    sheet_id = st.secrets["google_sheets"]["news_sheet_id"]
-    sheet_name = "articles"
-    url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/gviz/tq?tqx=out:csv&sheet={sheet_name}"
-    articles = pd.read_csv(url)
+    """
+    Loads the news articles sheet from its last-good local copy. The copy is refreshed in the
+    background, so this never waits on the network.
+
+    Returns:
+    - DataFrame of articles, empty until the sheet has been fetched once.
+    """
+    url = google_sheet_url("news_sheet_id", "articles")
+    path = get_source("articles.csv", url, columns=["title", "url"]).path() if url else None
+    if path is None:
+        return pd.DataFrame(columns=["title", "url"])
+    articles = pd.read_csv(path)
     return articles
 
 
 def load_and_prepare_party_data(csv_file):
-    # sheet_id = st.secrets["google_sheets"]["sheet_id"]
-    # sheet_name = "Party-list"
-    # url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/gviz/tq?tqx=out:csv&sheet={sheet_name}"
+    # Sheet-backed inputs are resolved to a local copy by `sheet_source_path` beforehand.
     parties = pd.read_csv(csv_file)
 
     # Initial regex replacements are commented out, but this code can be
@@ -84,15 +193,17 @@ def load_and_prepare_party_data(csv_file):
     # for pattern, replacement in replacements.items():
     #     parties['Company'] = parties['Company'].str.replace(pattern, replacement, regex=True)
 
-    # Clean the 'Amount' column by removing commas, converting to float for any potential
-    # decimal amounts, and then converting to int64 to ensure a uniform numeric type.
-    parties["Amount"] = (
-        parties["Amount"].str.replace(",", "").astype(float).astype("int64")
-    )
+    # Clean the 'Amount' column by removing commas and converting to numbers. Malformed
+    # amounts become missing values, which `data_validation` quarantines before converting
+    # the column to int64.
+    parties["Amount"] = parse_amounts(parties["Amount"])
+    parties["Denomination"] = denomination_codes(parties["Amount"])
 
     # Convert the 'Date' column to a DateTime format for easier manipulation.
-    # This assumes dates are in the 'day/month/Year' format.
-    parties["Date_format"] = pd.to_datetime(parties["Date"], format="%d/%b/%Y")
+    # This assumes dates are in the 'day/month/Year' format; others become missing values.
+    parties["Date_format"] = pd.to_datetime(
+        parties["Date"], format="%d/%b/%Y", errors="coerce"
+    )
 
     # Extract the year from the newly formatted 'Date_format' column for
     # potential time-based analyses or aggregations.
@@ -0,0 +1,223 @@
+import threading
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from data_loader import (
+    data_fingerprint,
+    load_and_prepare_data,
+    load_and_prepare_party_data,
+    sheet_source_path,
+)
+from data_preprocessing import summarize_data, summarize_party_data
+from data_validation import COMPANY_RULES, PARTY_RULES, validate_and_record
+from single_flight import SingleFlightCache
+from utils import merge_parties_companies
+
+
+COMPANY_CSV = "data/Electoral Bonds - Donors-list-category.csv"
+PARTY_CSV = "data/Electoral Bonds - Party-list.csv"
+
+DataModel = namedtuple(
+    "DataModel",
+    [
+        "version",
+        "companies",
+        "parties",
+        "merged_df",
+        "sorted_company",
+        "year_company_group",
+        "parent_company_group",
+        "category_group",
+        "sorted_party",
+        "party_year_group",
+    ],
+)
+
+# One single-flight cache per build stage and input files.
+_stages = {}
+_stages_lock = threading.Lock()
+
+def freeze_frame(df):
+    """
+    Copies the numpy-backed columns of a DataFrame into read-only arrays owned by a new
+    frame, so an accidental in-place update of shared data raises instead of leaking into
+    other sessions. Extension columns, such as categoricals, are carried over as they are.
+
+    Parameters:
+    - df: DataFrame to freeze.
+
+    Returns:
+    - DataFrame with the same columns, index and dtypes.
+    """
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        if isinstance(values.dtype, np.dtype):
+            values = values.to_numpy(copy=True)
+            values.flags.writeable = False
+        else:
+            values = values.array
+        columns[column] = values
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+def _stage(name):
+    with _stages_lock:
+        stage = _stages.get(name)
+        if stage is None:
+            stage = _stages[name] = SingleFlightCache(name)
+        return stage
+
+
+def summarize_model(version, companies, parties):
+    """
+    Merges and summarizes prepared donor and party data into a read-only model.
+
+    Parameters:
+    - version: Fingerprint of the data files the frames were loaded from.
+    - companies: DataFrame returned by `load_and_prepare_data`.
+    - parties: DataFrame returned by `load_and_prepare_party_data`.
+
+    Returns:
+    - DataModel with the prepared frames and their summaries.
+    """
+    merged_df = merge_parties_companies(parties, companies)
+    sorted_company, year_company_group, parent_company_group, category_group = (
+        summarize_data(companies)
+    )
+    sorted_party, party_year_group = summarize_party_data(parties)
+    frames = [
+        companies,
+        parties,
+        merged_df,
+        sorted_company,
+        year_company_group,
+        parent_company_group,
+        category_group,
+        sorted_party,
+        party_year_group,
+    ]
+    return DataModel(version, *[freeze_frame(frame) for frame in frames])
+
+
+def build_data_model(company_csv=COMPANY_CSV, party_csv=PARTY_CSV):
+    """
+    Loads, merges and summarizes the donor and party data without any caching.
+
+    Parameters:
+    - company_csv: Path to the donor CSV file.
+    - party_csv: Path to the party CSV file.
+
+    Returns:
+    - DataModel with the prepared frames and the version of the data files.
+    """
+    return summarize_model(
+        data_fingerprint(company_csv, party_csv),
+        prepare_companies(company_csv),
+        prepare_parties(party_csv),
+    )
+
+
+def prepare_companies(company_csv):
+    """
+    Loads and validates the donor data, quarantining the rows that fail validation.
+    """
+    return validate_and_record(load_and_prepare_data(company_csv), COMPANY_RULES, company_csv)
+
+
+def prepare_parties(party_csv):
+    """
+    Loads and validates the party data, quarantining the rows that fail validation.
+    """
+    return validate_and_record(load_and_prepare_party_data(party_csv), PARTY_RULES, party_csv)
+
+
+def load_companies(company_csv=COMPANY_CSV):
+    """
+    Returns the prepared donor data, loaded by a single caller per version of the file.
+    """
+    return _stage(f"companies:{company_csv}").get(
+        data_fingerprint(company_csv),
+        lambda: freeze_frame(prepare_companies(company_csv)),
+    )
+
+
+def load_parties(party_csv=PARTY_CSV):
+    """
+    Returns the prepared party data, loaded by a single caller per version of the file.
+    """
+    return _stage(f"parties:{party_csv}").get(
+        data_fingerprint(party_csv),
+        lambda: freeze_frame(prepare_parties(party_csv)),
+    )
+
+
+def data_paths():
+    """
+    Resolves the donor and party files to load. When Google Sheets are configured in the
+    secrets, these are the local copies of the sheets, refreshed in the background.
+
+    Returns:
+    - Tuple of the donor and party file paths.
+    """
+    return (
+        sheet_source_path(COMPANY_CSV, "sheet_id", "Donors-list"),
+        sheet_source_path(PARTY_CSV, "sheet_id", "Party-list"),
+    )
+
+
+def load_data_model(company_csv=None, party_csv=None):
+    """
+    Returns the data model for the given files, rebuilding it only when the files change.
+    The model is shared, read-only, by every caller and session in the process.
+
+    Exactly one caller rebuilds each stage (donor data, party data, model) after a change;
+    concurrent callers get the previous model while it runs, or wait on a cold start.
+
+    Parameters:
+    - company_csv: Path to the donor CSV file. Defaults to the one from `data_paths`.
+    - party_csv: Path to the party CSV file. Defaults to the one from `data_paths`.
+
+    Returns:
+    - DataModel for the current version of the data files.
+    """
+    if company_csv is None or party_csv is None:
+        default_company_csv, default_party_csv = data_paths()
+        company_csv = company_csv or default_company_csv
+        party_csv = party_csv or default_party_csv
+    version = data_fingerprint(company_csv, party_csv)
+    return _stage(f"model:{company_csv}:{party_csv}").get(
+        version,
+        lambda: summarize_model(
+            version, load_companies(company_csv), load_parties(party_csv)
+        ),
+    )
+
+
+def cache_metrics():
+    """
+    Returns the fill duration, waiter and stale-serve metrics of every build stage.
+
+    Returns:
+    - List of dictionaries, one per stage.
+    """
+    with _stages_lock:
+        stages = list(_stages.values())
+    return [stage.metrics() for stage in stages]
+
+
+def load_derived(name, build, model=None):
+    """
+    Returns an analytics result derived from the data model, built by a single caller once
+    per data version and shared by every session in the process.
+
+    Parameters:
+    - name: Unique name of the derived result.
+    - build: Function taking the DataModel and returning the result.
+    - model: Optional DataModel; defaults to the current one.
+
+    Returns:
+    - The result of `build` for the current data version.
+    """
+    model = model or load_data_model()
+    return _stage(f"derived:{name}").get(model.version, lambda: build(model))
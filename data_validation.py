@@ -0,0 +1,226 @@
+"""
+Columnar validation of the prepared donor and party data.
+
+Every rule is a vectorized check returning a boolean mask of offending rows. Rows failing
+an "error" rule are quarantined (or the load fails, if quarantine is disabled); "warning"
+rules are only reported. Print the report of the bundled files, optionally on the data
+repeated `--scale` times to measure the cost at a larger size (the copies are reported as
+duplicate bonds), with:
+
+    python data_validation.py --scale 100
+"""
+import argparse
+import json
+import threading
+import time
+from collections import namedtuple
+import pandas as pd
+
+
+SAMPLE_SIZE = 5
+
+# Types restored once the rows the lenient parsers could not convert are quarantined.
+COLUMN_TYPES = {"Amount": "int64", "Year": "int32"}
+
+Rule = namedtuple("Rule", ["name", "severity", "description", "check"])
+
+_reports = {}
+_reports_lock = threading.Lock()
+
+
+class DataValidationError(ValueError):
+    """
+    Raised when rows fail an error rule and quarantine is disabled.
+    """
+
+    def __init__(self, report):
+        failed = [
+            rule["name"]
+            for rule in report["rules"]
+            if rule["severity"] == "error" and rule["count"]
+        ]
+        super().__init__(f"{report['dataset']} failed validation: {', '.join(failed)}")
+        self.report = report
+
+
+def _blank(series):
+    # Names repeat a lot, so check the distinct values and only match rows if any is blank.
+    values = pd.Series(series.unique())
+    blanks = values[values.isna() | (values.astype(str).str.strip() == "")]
+    if blanks.empty:
+        return pd.Series(False, index=series.index)
+    return series.isin(blanks)
+
+
+def _duplicate_bonds(df):
+    return df.duplicated(["Prefix", "Bond Number"], keep="first")
+
+
+def _purchase_after_expiry(df):
+    expiry = pd.to_datetime(df["Date of Expiry"], format="%d/%b/%Y", errors="coerce")
+    return df["Date_format"] > expiry
+
+
+COMMON_RULES = [
+    Rule("malformed_amount", "error", "Amount is missing or not a number",
+         lambda df: df["Amount"].isna()),
+    Rule("non_positive_amount", "error", "Amount is zero or negative",
+         lambda df: df["Amount"] <= 0),
+    Rule("malformed_date", "error", "Date is missing or not in dd/Mon/YYYY format",
+         lambda df: df["Date_format"].isna()),
+    Rule("duplicate_bond", "error", "Prefix and bond number repeat an earlier row",
+         _duplicate_bonds),
+    Rule("non_standard_denomination", "warning", "Amount is not a standard bond denomination",
+         lambda df: df["Amount"].notna() & (df["Denomination"].cat.codes < 0)),
+]
+
+COMPANY_RULES = COMMON_RULES + [
+    Rule("blank_company", "error", "Company name is blank",
+         lambda df: _blank(df["Company"])),
+    Rule("purchase_after_expiry", "error", "Date of purchase is after the date of expiry",
+         _purchase_after_expiry),
+    Rule("blank_category", "warning", "Category is blank",
+         lambda df: _blank(df["Category"])),
+]
+
+PARTY_RULES = COMMON_RULES + [
+    Rule("blank_party", "error", "Party name is blank",
+         lambda df: _blank(df["party"])),
+]
+
+
+def validate(df, rules, dataset, quarantine=True, sample_size=SAMPLE_SIZE):
+    """
+    Runs columnar validation rules over a prepared frame.
+
+    Parameters:
+    - df: DataFrame returned by `load_and_prepare_data` or `load_and_prepare_party_data`.
+    - rules: List of Rule to check.
+    - dataset: Name of the dataset in the report.
+    - quarantine: If True, drop rows failing an error rule; if False, raise instead.
+    - sample_size: Number of offending rows included in the report per rule.
+
+    Returns:
+    - Tuple of the clean DataFrame, the quarantined rows with the rules they failed, and
+      the report with per-rule counts, samples, severity and cost.
+
+    Raises:
+    - DataValidationError: If rows fail an error rule and quarantine is disabled.
+    """
+    started = time.perf_counter()
+    failed_rules = pd.Series("", index=df.index)
+    rejected = pd.Series(False, index=df.index)
+    results = []
+    for rule in rules:
+        rule_started = time.perf_counter()
+        mask = rule.check(df).fillna(False).astype(bool)
+        count = int(mask.sum())
+        samples = df[mask].head(sample_size).to_json(orient="records", date_format="iso")
+        results.append(
+            {
+                "name": rule.name,
+                "severity": rule.severity,
+                "description": rule.description,
+                "count": count,
+                "samples": json.loads(samples),
+                "seconds": time.perf_counter() - rule_started,
+            }
+        )
+        if count and rule.severity == "error":
+            rejected |= mask
+            failed_rules = failed_rules.where(~mask, failed_rules + rule.name + ";")
+
+    clean = df[~rejected]
+    quarantined = df[rejected].assign(failed_rules=failed_rules[rejected].str.rstrip(";"))
+    seconds = time.perf_counter() - started
+    report = {
+        "dataset": dataset,
+        "rows": len(df),
+        "quarantined_rows": len(quarantined),
+        "seconds": seconds,
+        "rows_per_second": len(df) / seconds if seconds else None,
+        "rules": results,
+    }
+    if len(quarantined) and not quarantine:
+        raise DataValidationError(report)
+    clean = clean.astype(
+        {column: dtype for column, dtype in COLUMN_TYPES.items() if column in clean}
+    )
+    return clean, quarantined, report
+
+
+def validate_and_record(df, rules, dataset, quarantine=True):
+    """
+    Validates a frame as part of the loading pipeline and keeps its report and quarantined
+    rows for `validation_reports` and `quarantined_rows`.
+
+    Parameters:
+    - df: Prepared DataFrame to validate.
+    - rules: List of Rule to check.
+    - dataset: Name of the dataset, usually its file path.
+    - quarantine: If True, drop rows failing an error rule; if False, raise instead.
+
+    Returns:
+    - The clean DataFrame.
+    """
+    clean, quarantined, report = validate(df, rules, dataset, quarantine)
+    with _reports_lock:
+        _reports[dataset] = (report, quarantined)
+    return clean
+
+
+def validation_reports():
+    """
+    Returns the report of the last validation of every dataset loaded in the process.
+
+    Returns:
+    - List of report dictionaries, as returned by `validate`.
+    """
+    with _reports_lock:
+        return [report for report, _ in _reports.values()]
+
+
+def quarantined_rows(dataset):
+    """
+    Returns the rows quarantined by the last validation of a dataset.
+
+    Parameters:
+    - dataset: Name of the dataset passed to `validate_and_record`.
+
+    Returns:
+    - DataFrame of the quarantined rows with a `failed_rules` column, or None if the
+      dataset was not validated.
+    """
+    with _reports_lock:
+        entry = _reports.get(dataset)
+    return entry[1] if entry else None
+
+
+def main():
+    from data_loader import load_and_prepare_data, load_and_prepare_party_data
+    from data_model import COMPANY_CSV, PARTY_CSV
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1, help="repeat the data N times")
+    args = parser.parse_args()
+
+    for frame, rules, dataset in [
+        (load_and_prepare_data(COMPANY_CSV), COMPANY_RULES, COMPANY_CSV),
+        (load_and_prepare_party_data(PARTY_CSV), PARTY_RULES, PARTY_CSV),
+    ]:
+        if args.scale > 1:
+            frame = pd.concat([frame] * args.scale, ignore_index=True)
+        _, _, report = validate(frame, rules, dataset)
+        print(
+            f"{dataset}: {report['rows']} rows, {report['quarantined_rows']} quarantined, "
+            f"{report['seconds'] * 1000:.1f} ms ({report['rows_per_second']:,.0f} rows/s)"
+        )
+        for rule in report["rules"]:
+            print(
+                f"  {rule['severity']:<7} {rule['name']:<26} {rule['count']:>9} "
+                f"{rule['seconds'] * 1000:8.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Streaming diff of two versions of a donor or party CSV.
+
+Rows are normalized and hashed chunk by chunk, and the (key hash, row hash, line) triples
+are spilled to per-bucket files, so memory holds one chunk or one bucket at a time. Bonds
+are keyed by Prefix + Bond Number; files without those columns (such as
+Donors-list.csv) are compared as multisets of rows, so changed rows show up as one
+removed and one added row. Bond keys that occur more than once in either file are reported
+as duplicates rather than compared. Per-company or per-party totals are accumulated in the same
+pass and reported as deltas.
+
+    python dataset_diff.py "data/Electoral Bonds - Donors-list.csv" \\
+        "data/Electoral Bonds - Donors-list-category.csv"
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+
+CHUNK_ROWS = 200_000
+BUCKETS = 64
+SAMPLE_SIZE = 5
+KEY_COLUMNS = ["Prefix", "Bond Number"]
+IGNORED_COLUMNS = ["Sr No."]
+ENTITY_COLUMNS = ["Company", "party"]
+
+RECORD = np.dtype([("key", "<u8"), ("row", "<u8"), ("line", "<i8")])
+
+
+def normalize_chunk(chunk, columns):
+    """
+    Normalizes the compared columns of a chunk: trims and collapses whitespace, upper-cases
+    text and drops the digit grouping and zero paise of amounts.
+
+    Parameters:
+    - chunk: DataFrame read from the CSV as strings.
+    - columns: Columns to normalize.
+
+    Returns:
+    - DataFrame of normalized strings.
+    """
+    normalized = chunk[columns].fillna("").astype(str)
+    normalized = normalized.apply(lambda column: column.str.strip().str.replace(r"\s+", " ", regex=True).str.upper())
+    if "Amount" in normalized:
+        normalized["Amount"] = (
+            normalized["Amount"].str.replace(",", "", regex=False).str.replace(r"\.0*$", "", regex=True)
+        )
+    return normalized
+
+
+def _hash(frame):
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def _columns(path):
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def scan(path, columns, keyed, bucket_dir, buckets, chunk_rows):
+    """
+    Streams a CSV once, spilling its row hashes to bucket files and accumulating the
+    per-entity totals.
+
+    Parameters:
+    - path: CSV file to read.
+    - columns: Compared columns.
+    - keyed: Whether rows are keyed by KEY_COLUMNS; otherwise the row hash is the key.
+    - bucket_dir: Directory of the bucket files of this side.
+    - buckets: Number of buckets.
+    - chunk_rows: Rows read per chunk.
+
+    Returns:
+    - Tuple of the number of rows and a DataFrame of amount and bond count per entity.
+    """
+    entity = next((column for column in ENTITY_COLUMNS if column in columns), None)
+    totals = None
+    rows = 0
+    files = [open(os.path.join(bucket_dir, f"{bucket}.bin"), "wb") for bucket in range(buckets)]
+    try:
+        for chunk in pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunk_rows):
+            normalized = normalize_chunk(chunk, columns)
+            records = np.empty(len(chunk), dtype=RECORD)
+            records["row"] = _hash(normalized)
+            records["key"] = _hash(normalized[KEY_COLUMNS]) if keyed else records["row"]
+            records["line"] = np.arange(rows, rows + len(chunk))
+            bucket_of = records["key"] % buckets
+            order = np.argsort(bucket_of, kind="stable")
+            bounds = np.searchsorted(bucket_of[order], np.arange(buckets + 1))
+            for bucket in range(buckets):
+                files[bucket].write(records[order[bounds[bucket] : bounds[bucket + 1]]].tobytes())
+            if entity:
+                amounts = pd.to_numeric(normalized["Amount"], errors="coerce").fillna(0)
+                chunk_totals = amounts.groupby(normalized[entity]).agg(["sum", "count"])
+                totals = chunk_totals if totals is None else totals.add(chunk_totals, fill_value=0)
+            rows += len(chunk)
+    finally:
+        for file in files:
+            file.close()
+    if totals is None:
+        totals = pd.DataFrame(columns=["sum", "count"])
+    return rows, totals.rename(columns={"sum": "Amount", "count": "Bond_count"})
+
+
+def _diff_bucket(old, new, keyed):
+    """
+    Compares the records of one bucket.
+
+    Returns:
+    - Tuple of the removed old lines, added new lines, (old line, new line) pairs of
+      modified rows and the old and new lines whose key is duplicated in either file.
+    """
+    if keyed:
+        # A duplicated key has no single counterpart to compare with; set its rows aside.
+        duplicated = np.union1d(_duplicates(old["key"]), _duplicates(new["key"]))
+        old_duplicate, new_duplicate = np.isin(old["key"], duplicated), np.isin(new["key"], duplicated)
+        duplicates = old["line"][old_duplicate], new["line"][new_duplicate]
+        old, new = old[~old_duplicate], new[~new_duplicate]
+        common, old_at, new_at = np.intersect1d(old["key"], new["key"], return_indices=True)
+        removed = np.setdiff1d(old["key"], common)
+        added = np.setdiff1d(new["key"], common)
+        changed = old["row"][old_at] != new["row"][new_at]
+        return (
+            old["line"][np.isin(old["key"], removed)],
+            new["line"][np.isin(new["key"], added)],
+            np.column_stack([old["line"][old_at][changed], new["line"][new_at][changed]]),
+            *duplicates,
+        )
+
+    # Multisets of rows: the surplus copies of a row on either side are removed or added.
+    def surplus(side, other):
+        order = np.argsort(side["key"], kind="stable")
+        keys = side["key"][order]
+        occurrence = np.arange(len(keys)) - np.searchsorted(keys, keys)
+        values, counts = np.unique(other["key"], return_counts=True)
+        position = np.searchsorted(values, keys)
+        found = (position < len(values)) & (values[np.minimum(position, len(values) - 1)] == keys)
+        available = np.where(found, counts[np.minimum(position, len(values) - 1)], 0)
+        return side["line"][order][occurrence >= available]
+
+    none = np.empty(0, dtype=np.int64)
+    return surplus(old, new), surplus(new, old), np.empty((0, 2), dtype=np.int64), none, none
+
+
+def _duplicates(keys):
+    values, counts = np.unique(keys, return_counts=True)
+    return values[counts > 1]
+
+
+def _rows_at(path, lines, chunk_rows):
+    """
+    Reads the rows at the given line positions with one streaming pass.
+
+    Returns:
+    - DataFrame of the rows, in the order of `lines`.
+    """
+    lines = np.asarray(lines, dtype=np.int64)
+    wanted = np.unique(lines)
+    found = []
+    start = 0
+    for chunk in pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunk_rows):
+        positions = wanted[(wanted >= start) & (wanted < start + len(chunk))] - start
+        if len(positions):
+            found.append(chunk.iloc[positions].set_axis(positions + start))
+        start += len(chunk)
+    if not found:
+        return pd.DataFrame()
+    return pd.concat(found).loc[lines]
+
+
+def diff_datasets(old_path, new_path, chunk_rows=CHUNK_ROWS, buckets=BUCKETS, sample_size=SAMPLE_SIZE):
+    """
+    Diffs two versions of a CSV in a streaming fashion.
+
+    Parameters:
+    - old_path, new_path: CSV files to compare.
+    - chunk_rows: Rows read per chunk.
+    - buckets: Number of hash buckets spilled to disk.
+    - sample_size: Number of sample rows reported per kind of change.
+
+    Returns:
+    - Dictionary report with the compared columns, whether rows were keyed by bond,
+      row counts, added/removed/modified counts with sample rows, the rows of duplicated
+      bond keys, the per-entity
+      aggregate deltas and the time taken.
+    """
+    started = time.perf_counter()
+    old_columns, new_columns = _columns(old_path), _columns(new_path)
+    columns = [c for c in old_columns if c in new_columns and c not in IGNORED_COLUMNS]
+    keyed = all(column in columns for column in KEY_COLUMNS)
+
+    removed, added, modified, old_duplicates, new_duplicates = [], [], [], [], []
+    with tempfile.TemporaryDirectory(prefix="dataset-diff-") as directory:
+        sides = {}
+        for side, path in [("old", old_path), ("new", new_path)]:
+            os.makedirs(os.path.join(directory, side))
+            sides[side] = scan(path, columns, keyed, os.path.join(directory, side), buckets, chunk_rows)
+        for bucket in range(buckets):
+            old, new = (
+                np.fromfile(os.path.join(directory, side, f"{bucket}.bin"), dtype=RECORD)
+                for side in ("old", "new")
+            )
+            bucket_removed, bucket_added, bucket_modified, bucket_old, bucket_new = _diff_bucket(
+                old, new, keyed
+            )
+            removed.append(bucket_removed)
+            added.append(bucket_added)
+            modified.append(bucket_modified)
+            old_duplicates.append(bucket_old)
+            new_duplicates.append(bucket_new)
+    removed, added = np.concatenate(removed), np.concatenate(added)
+    old_duplicates, new_duplicates = np.concatenate(old_duplicates), np.concatenate(new_duplicates)
+    # Sample whole pairs, so each old row is shown next to the new row of the same bond.
+    modified = np.concatenate(modified)
+    modified = modified[np.argsort(modified[:, 0], kind="stable")]
+
+    (old_rows, old_totals), (new_rows, new_totals) = sides["old"], sides["new"]
+    deltas = (
+        old_totals.add_prefix("old_")
+        .join(new_totals.add_prefix("new_"), how="outer")
+        .fillna(0)
+        .astype("int64")
+    )
+    deltas["Amount_delta"] = deltas["new_Amount"] - deltas["old_Amount"]
+    deltas["Bond_count_delta"] = deltas["new_Bond_count"] - deltas["old_Bond_count"]
+    deltas = deltas[(deltas["Amount_delta"] != 0) | (deltas["Bond_count_delta"] != 0)]
+    deltas = deltas.reindex(deltas["Amount_delta"].abs().sort_values(ascending=False).index)
+
+    def rows(path, lines):
+        return json.loads(_rows_at(path, lines, chunk_rows).to_json(orient="records"))
+
+    def samples(path, lines):
+        return rows(path, np.sort(lines)[:sample_size])
+
+    return {
+        "columns": columns,
+        "keyed_by_bond": keyed,
+        "old_rows": old_rows,
+        "new_rows": new_rows,
+        "removed": {"count": len(removed), "samples": samples(old_path, removed)},
+        "added": {"count": len(added), "samples": samples(new_path, added)},
+        "modified": {
+            "count": len(modified),
+            "samples": [
+                {"old": old, "new": new}
+                for old, new in zip(
+                    rows(old_path, modified[:sample_size, 0]), rows(new_path, modified[:sample_size, 1])
+                )
+            ],
+        },
+        "duplicate_keys": {
+            "old": {"count": len(old_duplicates), "samples": samples(old_path, old_duplicates)},
+            "new": {"count": len(new_duplicates), "samples": samples(new_path, new_duplicates)},
+        },
+        "deltas": deltas,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("old", help="Previous version of the CSV")
+    parser.add_argument("new", help="Corrected version of the CSV")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--buckets", type=int, default=BUCKETS)
+    parser.add_argument("--top", type=int, default=20, help="entity deltas to print")
+    args = parser.parse_args()
+
+    report = diff_datasets(args.old, args.new, args.chunk_rows, args.buckets)
+    key = "Prefix + Bond Number" if report["keyed_by_bond"] else "whole rows (no bond key)"
+    print(f"Compared {', '.join(report['columns'])} keyed by {key}")
+    print(
+        f"{report['old_rows']} -> {report['new_rows']} rows in {report['seconds']:.2f} s: "
+        f"{report['added']['count']} added, {report['removed']['count']} removed, "
+        f"{report['modified']['count']} modified"
+    )
+    for change in ["added", "removed", "modified"]:
+        for sample in report[change]["samples"]:
+            print(f"  {change}: {json.dumps(sample, ensure_ascii=False)}")
+    for side, duplicates in report["duplicate_keys"].items():
+        if duplicates["count"]:
+            print(f"{duplicates['count']} {side} rows share a bond key and were not compared:")
+            for sample in duplicates["samples"]:
+                print(f"  duplicate: {json.dumps(sample, ensure_ascii=False)}")
+    if len(report["deltas"]):
+        print(f"Largest aggregate deltas ({len(report['deltas'])} entities changed):")
+        print(report["deltas"].head(args.top).to_string())
+
+
+if __name__ == "__main__":
+    main()
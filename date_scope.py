@@ -0,0 +1,335 @@
+from collections import namedtuple
+import datetime
+import numpy as np
+from data_model import load_derived
+from fact_store import EPOCH, fact_amounts, open_fact_store, write_fact_store
+from utils import format_amount
+
+
+# Cumulative amounts and bond counts of every entity over the distinct dates of a fact
+# table: column j holds the totals of the dates before days[j], so the totals of any
+# window are the difference of two columns.
+DateScope = namedtuple(
+    "DateScope", ["days", "names", "cumulative_amounts", "cumulative_counts"]
+)
+
+# Date scope of the (parent, child) pairs of a drill-down, ordered by parent, with the
+# rows of every parent's children.
+DrillScope = namedtuple("DrillScope", ["scope", "parents"])
+
+ScopedSummaries = namedtuple(
+    "ScopedSummaries",
+    ["sorted_company", "parent_company_group", "category_group", "sorted_party"],
+)
+
+
+def build_date_scope(table, dimension, names):
+    """
+    Accumulates the amounts and counts of every entity over the dates of a fact table.
+
+    Parameters:
+    - table: Dictionary of fact store columns with "day" and the entity codes, and the
+      "amount" of every row from `fact_amounts`.
+    - dimension: Name of the entity code column.
+    - names: Names of the entity codes.
+
+    Returns:
+    - DateScope of the entities. Rows without a name (code -1) are left out.
+    """
+    days, day_index = np.unique(table["day"], return_inverse=True)
+    codes = table[dimension].astype(np.int64)
+    named = codes >= 0
+    cells = codes[named] * len(days) + day_index[named]
+    shape = (len(names), len(days))
+    amounts = np.bincount(
+        cells, weights=table["amount"][named], minlength=shape[0] * shape[1]
+    )
+    counts = np.bincount(cells, minlength=shape[0] * shape[1])
+    zeros = np.zeros((shape[0], 1), dtype=np.int64)
+    return DateScope(
+        days,
+        names,
+        np.hstack([zeros, np.cumsum(amounts.reshape(shape).astype(np.int64), axis=1)]),
+        np.hstack([zeros, np.cumsum(counts.reshape(shape), axis=1)]),
+    )
+
+
+def build_date_scopes(model):
+    """
+    Builds the date scopes of companies, categories and parent companies over purchase
+    dates and of parties over redemption dates, from the fact store.
+
+    Parameters:
+    - model: DataModel returned by `load_data_model`.
+
+    Returns:
+    - Dictionary of dimension name to DateScope.
+    """
+    write_fact_store(model)
+    store = open_fact_store(model.version)
+    purchases = {**store.purchases, "amount": fact_amounts(store, store.purchases)}
+    redemptions = {**store.redemptions, "amount": fact_amounts(store, store.redemptions)}
+    scopes = {
+        dimension: build_date_scope(purchases, dimension, store.dimensions[dimension])
+        for dimension in ["company", "category", "parent_company"]
+    }
+    scopes["party"] = build_date_scope(redemptions, "party", store.dimensions["party"])
+    return scopes
+
+
+def build_drill_scope(table, parent_dimension, child_dimension, parent_names, child_names):
+    """
+    Accumulates the amounts and counts of every (parent, child) pair, such as category and
+    company, over the dates of a fact table.
+
+    Parameters:
+    - table: Dictionary of fact store columns with "day" and the entity codes, and the
+      "amount" of every row from `fact_amounts`.
+    - parent_dimension, child_dimension: Names of the parent and child code columns.
+    - parent_names, child_names: Names of the parent and child codes.
+
+    Returns:
+    - DrillScope whose scope names are the child names of the pairs, with a dictionary of
+      parent name to the slice of its rows.
+    """
+    parents = table[parent_dimension].astype(np.int64)
+    children = table[child_dimension].astype(np.int64)
+    named = (parents >= 0) & (children >= 0)
+    pairs = np.where(named, parents * len(child_names) + children, -1)
+    keys, codes = np.unique(pairs, return_inverse=True)
+    if len(keys) and keys[0] == -1:
+        keys, codes = keys[1:], codes - 1
+    scope = build_date_scope(
+        {"day": table["day"], "amount": table["amount"], "pair": codes},
+        "pair",
+        child_names[keys % len(child_names)],
+    )
+    parent_codes, first = np.unique(keys // len(child_names), return_index=True)
+    bounds = np.append(first, len(keys))
+    return DrillScope(
+        scope,
+        {
+            parent_names[code]: slice(bounds[i], bounds[i + 1])
+            for i, code in enumerate(parent_codes)
+        },
+    )
+
+
+def build_drill_scopes(model):
+    """
+    Builds the drill scopes of the companies of every category and parent company over
+    purchase dates and of the parties of every parent company over redemption dates, from
+    the fact store.
+
+    Parameters:
+    - model: DataModel returned by `load_data_model`.
+
+    Returns:
+    - Dictionary of "category_company", "parent_company" and "parent_party" to DrillScope.
+    """
+    write_fact_store(model)
+    store = open_fact_store(model.version)
+    dimensions = store.dimensions
+    purchases = {**store.purchases, "amount": fact_amounts(store, store.purchases)}
+    redeemed, purchased = store.ledger["redemption"], store.ledger["purchase"]
+    matched = {
+        "day": store.redemptions["day"][redeemed],
+        "amount": fact_amounts(store, store.redemptions)[redeemed],
+        "party": store.redemptions["party"][redeemed],
+        "parent_company": purchases["parent_company"][purchased],
+    }
+    return {
+        "category_company": build_drill_scope(
+            purchases, "category", "company", dimensions["category"], dimensions["company"]
+        ),
+        "parent_company": build_drill_scope(
+            purchases,
+            "parent_company",
+            "company",
+            dimensions["parent_company"],
+            dimensions["company"],
+        ),
+        "parent_party": build_drill_scope(
+            matched, "parent_company", "party", dimensions["parent_company"], dimensions["party"]
+        ),
+    }
+
+
+def load_drill_scopes():
+    """
+    Returns the drill scopes of the current data version.
+    """
+    return load_derived("drill_scopes", build_drill_scopes)
+
+
+def load_date_scopes():
+    """
+    Returns the date scopes of the current data version.
+    """
+    return load_derived("date_scopes", build_date_scopes)
+
+
+def window_totals(scope, start_day, end_day, rows=slice(None)):
+    """
+    Totals of every entity between two days (inclusive), from two prefix lookups each.
+
+    Parameters:
+    - scope: DateScope returned by `build_date_scope`.
+    - start_day, end_day: Day ordinals (days since 1970-01-01).
+    - rows: Optional slice of the entities to total.
+
+    Returns:
+    - Tuple of the amount and bond count arrays, aligned with `scope.names[rows]`.
+    """
+    start = np.searchsorted(scope.days, start_day, side="left")
+    end = np.searchsorted(scope.days, end_day, side="right")
+    return (
+        scope.cumulative_amounts[rows, end] - scope.cumulative_amounts[rows, start],
+        scope.cumulative_counts[rows, end] - scope.cumulative_counts[rows, start],
+    )
+
+
+def window_years(scope, row, start_date, end_date):
+    """
+    Totals of one entity in every calendar year of a date range, from one prefix lookup
+    per year boundary.
+
+    Parameters:
+    - scope: DateScope returned by `build_date_scope`.
+    - row: Position of the entity in `scope.names`.
+    - start_date, end_date: datetime.date bounds of the range (inclusive).
+
+    Returns:
+    - Tuple of the year, amount and bond count arrays.
+    """
+    years = np.arange(start_date.year, end_date.year + 1)
+    edges = [day_ordinal(start_date)]
+    edges += [day_ordinal(datetime.date(year, 1, 1)) for year in years[1:]]
+    edges.append(day_ordinal(end_date) + 1)
+    positions = np.searchsorted(scope.days, edges, side="left")
+    return (
+        years,
+        np.diff(scope.cumulative_amounts[row, positions]),
+        np.diff(scope.cumulative_counts[row, positions]),
+    )
+
+
+def window_children(drill, parent, start_date, end_date):
+    """
+    Totals of the children of one parent of a drill scope in a date range.
+
+    Parameters:
+    - drill: DrillScope returned by `build_drill_scope`.
+    - parent: Name of the parent, such as a category.
+    - start_date, end_date: datetime.date bounds of the range (inclusive).
+
+    Returns:
+    - Tuple of the child name, amount and bond count arrays, or None if the parent has
+      no bonds.
+    """
+    rows = drill.parents.get(parent)
+    if rows is None:
+        return None
+    amounts, counts = window_totals(
+        drill.scope, day_ordinal(start_date), day_ordinal(end_date), rows
+    )
+    return drill.scope.names[rows], amounts, counts
+
+
+def scope_summary(summary, name_column, scope, start_day, end_day):
+    """
+    Replaces the totals of a summary frame with those of a date window, dropping the
+    entities without bonds in it and recomputing the display columns and shares.
+
+    Parameters:
+    - summary: Summary frame of the data model, such as `sorted_company`.
+    - name_column: Column of `summary` holding the entity names.
+    - scope: DateScope of the entities.
+    - start_day, end_day: Day ordinals of the window (inclusive).
+
+    Returns:
+    - Summary frame with the same columns, sorted by amount.
+    """
+    amounts, counts = window_totals(scope, start_day, end_day)
+    names = summary[name_column].to_numpy()
+    positions = np.minimum(np.searchsorted(scope.names, names), len(scope.names) - 1)
+    # Entities missing from the scope, such as blank names, have no bonds in any window.
+    found = scope.names[positions] == names
+    scoped = summary.assign(
+        Amount=np.where(found, amounts[positions], 0),
+        Bond_count=np.where(found, counts[positions], 0),
+    )
+    scoped = scoped[scoped["Bond_count"] > 0]
+    return scoped.assign(
+        **{
+            "Amount (₹ Cr)": scoped["Amount"].map(format_amount),
+            "percentage": (scoped["Amount"] / scoped["Amount"].sum() * 100).map(
+                "{:.2f}%".format
+            ),
+        }
+    ).sort_values("Amount", ascending=False)
+
+
+def scoped_summaries(model, start_date, end_date):
+    """
+    Returns the overview summaries of the data model restricted to a date range.
+
+    Parameters:
+    - model: DataModel returned by `load_data_model`.
+    - start_date, end_date: datetime.date bounds of the range (inclusive).
+
+    Returns:
+    - ScopedSummaries with the scoped sorted_company, parent_company_group, category_group
+      and sorted_party frames.
+    """
+    scopes = load_date_scopes()
+    start_day, end_day = day_ordinal(start_date), day_ordinal(end_date)
+    return ScopedSummaries(
+        scope_summary(model.sorted_company, "Company", scopes["company"], start_day, end_day),
+        scope_summary(
+            model.parent_company_group,
+            "Parent Company",
+            scopes["parent_company"],
+            start_day,
+            end_day,
+        ),
+        scope_summary(model.category_group, "Category", scopes["category"], start_day, end_day),
+        scope_summary(model.sorted_party, "party", scopes["party"], start_day, end_day),
+    )
+
+
+def day_ordinal(date):
+    """
+    Converts a date to days since 1970-01-01.
+    """
+    return int((np.datetime64(date, "D") - EPOCH).astype(np.int64))
+
+
+def select_date_range(container, model):
+    """
+    Displays the global date range control.
+
+    Parameters:
+    - container: Streamlit container for the control.
+    - model: DataModel returned by `load_data_model`.
+
+    Returns:
+    - Tuple of the selected start and end dates, and whether they cover all the data.
+    """
+    first = min(model.companies["Date_format"].min(), model.parties["Date_format"].min()).date()
+    last = max(model.companies["Date_format"].max(), model.parties["Date_format"].max()).date()
+    start, end = container.slider(
+        "Date range",
+        min_value=first,
+        max_value=last,
+        value=(first, last),
+        step=datetime.timedelta(days=1),
+        format="DD MMM YYYY",
+        key="date_range",
+    )
+    container.caption(
+        "Overview totals, metrics, shares and drill-downs follow this range; concentration "
+        "measures, denomination histograms, individual pages and visualizations cover the "
+        "full period."
+    )
+    return start, end, (start, end) == (first, last)
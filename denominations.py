@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+from data_loader import DENOMINATIONS
+from data_model import load_derived
+
+
+DENOMINATION_LABELS = ["₹1K", "₹10K", "₹1L", "₹10L", "₹1Cr", "Other"]
+
+
+def denomination_histogram(df, group_column):
+    """
+    Counts bonds per (group, denomination) with a single bincount over combined codes.
+
+    Parameters:
+    - df: DataFrame with a categorical `Denomination` column.
+    - group_column: Column to group by.
+
+    Returns:
+    - DataFrame indexed by group with one column of bond counts per DENOMINATION_LABELS.
+    """
+    bins = len(DENOMINATION_LABELS)
+    group_codes, groups = pd.factorize(df[group_column], sort=True)
+    codes = df["Denomination"].cat.codes.to_numpy().astype(np.int64)
+    codes[codes < 0] = bins - 1
+    counts = np.bincount(group_codes * bins + codes, minlength=len(groups) * bins)
+    return pd.DataFrame(
+        counts.reshape(len(groups), bins), index=groups, columns=DENOMINATION_LABELS
+    )
+
+
+def build_denomination_histograms(model):
+    """
+    Precomputes the denomination histograms of every company, party and category.
+
+    Parameters:
+    - model: DataModel returned by `load_data_model`.
+
+    Returns:
+    - Dictionary of "company", "party" and "category" to the histogram DataFrames.
+    """
+    return {
+        "company": denomination_histogram(model.companies, "Company"),
+        "party": denomination_histogram(model.parties, "party"),
+        "category": denomination_histogram(model.companies, "Category"),
+    }
+
+
+def load_denomination_histograms():
+    """
+    Returns the denomination histograms of the current data version.
+    """
+    return load_derived("denomination_histograms", build_denomination_histograms)
+
+
+def display_denomination_histogram(container, kind, name):
+    """
+    Displays the number of bonds and amount per denomination of a company, party or category.
+    Amounts of non-standard denominations are not known from the histogram and show as nan.
+
+    Parameters:
+    - container: Streamlit container for displaying data.
+    - kind: "company", "party" or "category".
+    - name: Name of the company, party or category.
+    """
+    histograms = load_denomination_histograms()[kind]
+    if name not in histograms.index:
+        return
+    counts = histograms.loc[name]
+    counts = counts[counts > 0]
+    container.subheader("Bonds by Denomination")
+    count_col, table_col = container.columns([3, 3])
+    count_col.bar_chart(counts.rename("Bonds"))
+    # Standard denominations are exact, so the amount per bucket follows from the count.
+    values = pd.Series(DENOMINATIONS, index=DENOMINATION_LABELS[:-1]).reindex(counts.index)
+    table_col.dataframe(
+        pd.DataFrame(
+            {
+                "Bond_count": counts,
+                "Amount (₹ Cr)": (counts * values / 10**7).map("{:,.2f}".format),
+                "percentage": (counts / counts.sum() * 100).map("{:.2f}%".format),
+            }
+        ).rename_axis("Denomination"),
+        use_container_width=True,
+    )
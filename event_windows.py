@@ -0,0 +1,231 @@
+import json
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from data_loader import data_fingerprint
+from data_model import load_derived
+
+
+ELECTION_CALENDAR_JSON = "data/election_calendar.json"
+WINDOW_OPTIONS = [30, 60, 90, 180, 365]
+
+# Purchases sorted by (company code, date) and by date alone, each with amount prefix sums,
+# shared by all window queries.
+PurchaseIndex = namedtuple(
+    "PurchaseIndex",
+    ["companies", "keys", "cumulative_amounts", "day_span", "days", "cumulative_day_amounts"],
+)
+
+
+def load_election_calendar(json_file_path=ELECTION_CALENDAR_JSON):
+    """
+    Loads the configurable calendar of global events.
+
+    Parameters:
+    - json_file_path: Path to a JSON file with an `events` list of {name, date} items.
+
+    Returns:
+    - DataFrame with `Event` and `Event Date` columns.
+    """
+    with open(json_file_path) as file:
+        events = json.load(file)["events"]
+    return pd.DataFrame(
+        {
+            "Event": [event["name"] for event in events],
+            "Event Date": pd.to_datetime([event["date"] for event in events]),
+        }
+    )
+
+
+def raid_events(companies):
+    """
+    Extracts one ED raid event per company. Raid dates are recorded by month, so the
+    event is placed on the first day of that month.
+
+    Parameters:
+    - companies: DataFrame of prepared company data.
+
+    Returns:
+    - DataFrame with `Company`, `Event` and `Event Date` columns.
+    """
+    raided = companies.loc[companies["is_ED_raid"] == 1, ["Company", "Date of Raid"]]
+    raided = raided.drop_duplicates("Company")
+    return pd.DataFrame(
+        {
+            "Company": raided["Company"].to_numpy(),
+            "Event": "ED raid (" + raided["Date of Raid"].astype(str).to_numpy() + ")",
+            "Event Date": pd.to_datetime(
+                raided["Date of Raid"], format="%B-%Y", errors="coerce"
+            ).to_numpy(),
+        }
+    ).dropna(subset=["Event Date"])
+
+
+def build_purchase_index(companies):
+    """
+    Sorts all purchases by (company, date) into a single key array with amount prefix sums,
+    so the purchases of any company in any date range are found by binary search.
+
+    Parameters:
+    - companies: DataFrame of prepared company data.
+
+    Returns:
+    - PurchaseIndex.
+    """
+    codes, names = pd.factorize(companies["Company"], sort=True)
+    days = companies["Date_format"].to_numpy().astype("datetime64[D]").astype(np.int64)
+    # Keys combine the company code and the day; the span leaves room for any window.
+    day_span = int(days.max()) + 100_000
+    keys = codes.astype(np.int64) * day_span + days
+    order = np.argsort(keys, kind="stable")
+    amounts = companies["Amount"].to_numpy()
+    day_order = np.argsort(days, kind="stable")
+    return PurchaseIndex(
+        pd.Index(names),
+        keys[order],
+        np.concatenate([[0], np.cumsum(amounts[order])]),
+        day_span,
+        days[day_order],
+        np.concatenate([[0], np.cumsum(amounts[day_order])]),
+    )
+
+
+def window_totals(index, company_codes, start_days, end_days):
+    """
+    Sums the purchases of many (company, date range) pairs in one batch. Company code -1
+    stands for all companies.
+
+    Parameters:
+    - index: PurchaseIndex returned by `build_purchase_index`.
+    - company_codes: Array of company codes.
+    - start_days, end_days: Arrays of inclusive start and exclusive end days since the epoch.
+
+    Returns:
+    - Tuple of arrays with the amount and the number of purchases of every range.
+    """
+    company_codes = np.asarray(company_codes, dtype=np.int64)
+    start_days = np.asarray(start_days, dtype=np.int64)
+    end_days = np.asarray(end_days, dtype=np.int64)
+    amounts = np.zeros(len(company_codes), dtype=np.int64)
+    counts = np.zeros(len(company_codes), dtype=np.int64)
+
+    per_company = company_codes >= 0
+    offsets = company_codes[per_company] * index.day_span
+    left = np.searchsorted(index.keys, offsets + start_days[per_company])
+    right = np.searchsorted(index.keys, offsets + end_days[per_company])
+    amounts[per_company] = index.cumulative_amounts[right] - index.cumulative_amounts[left]
+    counts[per_company] = right - left
+
+    left = np.searchsorted(index.days, start_days[~per_company])
+    right = np.searchsorted(index.days, end_days[~per_company])
+    amounts[~per_company] = (
+        index.cumulative_day_amounts[right] - index.cumulative_day_amounts[left]
+    )
+    counts[~per_company] = right - left
+    return amounts, counts
+
+
+def event_window_table(index, events, window, company_codes):
+    """
+    Computes donations in the `window` days before and after every event.
+
+    Parameters:
+    - index: PurchaseIndex returned by `build_purchase_index`.
+    - events: DataFrame with an `Event Date` column.
+    - window: Window length in days.
+    - company_codes: Company code of every event, or -1 for all companies.
+
+    Returns:
+    - Copy of `events` with amounts, counts and the after/before change.
+    """
+    event_days = events["Event Date"].to_numpy().astype("datetime64[D]").astype(np.int64)
+    before_amount, before_count = window_totals(
+        index, company_codes, event_days - window, event_days
+    )
+    after_amount, after_count = window_totals(
+        index, company_codes, event_days, event_days + window
+    )
+    return events.assign(
+        **{
+            "Amount before": before_amount,
+            "Bonds before": before_count,
+            "Amount after": after_amount,
+            "Bonds after": after_count,
+            "Change (₹ Cr)": (after_amount - before_amount) / 10**7,
+        }
+    )
+
+
+def build_event_windows(model, window, calendar):
+    """
+    Builds the raid-impact and election tables for one window length.
+
+    Parameters:
+    - model: DataModel returned by `load_data_model`.
+    - window: Window length in days.
+    - calendar: DataFrame returned by `load_election_calendar`.
+
+    Returns:
+    - Dictionary with the `raids` and `elections` tables.
+    """
+    index = build_purchase_index(model.companies)
+    raids = raid_events(model.companies)
+    raids = raids[raids["Company"].isin(index.companies)]
+    raid_table = event_window_table(
+        index, raids, window, index.companies.get_indexer(raids["Company"])
+    )
+    election_table = event_window_table(
+        index, calendar, window, np.full(len(calendar), -1)
+    )
+    return {
+        "raids": raid_table.sort_values("Change (₹ Cr)", ascending=False, ignore_index=True),
+        "elections": election_table,
+    }
+
+
+def load_event_windows(window, calendar_path=ELECTION_CALENDAR_JSON):
+    """
+    Returns the event-window tables for a window length, cached per data version,
+    window and version of the election calendar.
+    """
+    name = f"event_windows:{window}:{data_fingerprint(calendar_path)}"
+    return load_derived(
+        name,
+        lambda model: build_event_windows(model, window, load_election_calendar(calendar_path)),
+    )
+
+
+def display_event_windows(container):
+    """
+    Displays donations before and after ED raids and elections for a chosen window length.
+
+    Parameters:
+    - container: Streamlit container for displaying data.
+    """
+    container.header("Donations Around ED Raids and Elections")
+    window = container.selectbox(
+        "Window (days before and after each event)", WINDOW_OPTIONS, index=2
+    )
+    tables = load_event_windows(window)
+    raids = tables["raids"]
+
+    raid_left, raid_right = container.columns([3, 3])
+    raid_left.subheader("ED Raid Impact")
+    raid_left.markdown("---")
+    raid_left.dataframe(raids, use_container_width=True)
+    raid_right.subheader(f"Amount (₹ Cr) {window} Days Before and After a Raid")
+    raid_right.markdown("---")
+    raid_right.bar_chart(
+        raids.set_index("Company")[["Amount before", "Amount after"]] / 10**7
+    )
+
+    elections = tables["elections"]
+    election_left, election_right = container.columns([3, 3])
+    election_left.subheader("All Donations Around Elections")
+    election_left.markdown("---")
+    election_left.dataframe(elections, use_container_width=True)
+    election_right.subheader(f"Amount (₹ Cr) {window} Days Before and After Polling")
+    election_right.markdown("---")
+    election_right.bar_chart(
+        elections.set_index("Event")[["Amount before", "Amount after"]] / 10**7
+    )
@@ -0,0 +1,257 @@
+import argparse
+import hashlib
+import os
+import shutil
+import threading
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+
+EXPORT_DIR = os.path.join(".cache", "exports")
+CHUNK_ROWS = 10_000
+
+# File extension and MIME type of every supported export format.
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Arrow": ("arrows", "application/vnd.apache.arrow.stream"),
+}
+
+
+class _ChunkSink:
+    """
+    Minimal writable file object that hands written bytes back to the caller
+    instead of accumulating the whole export in memory.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def filter_positions(df, filters=None):
+    """
+    Resolves equality filters to row positions without copying the frame.
+
+    Parameters:
+    - df: DataFrame to filter.
+    - filters: Optional dictionary of column name to a value or list of accepted values.
+
+    Returns:
+    - Numpy array of matching row positions.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for column, value in (filters or {}).items():
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        mask &= df[column].isin(values).to_numpy()
+    return np.flatnonzero(mask)
+
+
+def _column_positions(df, columns):
+    # Chunks are taken with `iloc` on rows and columns together, so that only the rows of
+    # a chunk are copied; selecting `df[columns]` first copies the whole frame without
+    # copy-on-write.
+    return df.columns.get_indexer(list(columns or df.columns))
+
+
+def iter_record_batches(df, positions=None, columns=None, chunk_rows=CHUNK_ROWS, schema=None):
+    """
+    Converts the selected rows of a frame to Arrow one bounded chunk at a time.
+
+    Parameters:
+    - df: DataFrame to export.
+    - positions: Optional row positions to export, in order. Defaults to all rows.
+    - columns: Optional list of columns to export. Defaults to all columns.
+    - chunk_rows: Maximum number of rows per batch.
+    - schema: Optional Arrow schema of the columns, if the caller already has it.
+
+    Yields:
+    - pyarrow.RecordBatch objects sharing a single schema.
+    """
+    column_positions = _column_positions(df, columns)
+    if positions is None:
+        positions = np.arange(len(df))
+    if schema is None:
+        schema = pa.Schema.from_pandas(df.iloc[:, column_positions], preserve_index=False)
+    for start in range(0, len(positions), chunk_rows):
+        chunk = df.iloc[positions[start : start + chunk_rows], column_positions]
+        table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+        yield from table.to_batches()
+
+
+def iter_export_chunks(df, fmt, positions=None, columns=None, chunk_rows=CHUNK_ROWS):
+    """
+    Streams an export of the selected rows as encoded byte chunks.
+
+    Parameters:
+    - df: DataFrame to export.
+    - fmt: One of the keys of EXPORT_FORMATS.
+    - positions, columns, chunk_rows: See `iter_record_batches`.
+
+    Yields:
+    - Byte strings that concatenate to a complete CSV, Parquet or Arrow IPC stream file.
+    """
+    column_positions = _column_positions(df, columns)
+    if positions is None:
+        positions = np.arange(len(df))
+
+    if fmt == "CSV":
+        for start in range(0, max(len(positions), 1), chunk_rows):
+            chunk = df.iloc[positions[start : start + chunk_rows], column_positions]
+            yield chunk.to_csv(index=False, header=start == 0).encode("utf-8")
+        return
+
+    sink = _ChunkSink()
+    schema = pa.Schema.from_pandas(df.iloc[:, column_positions], preserve_index=False)
+    batches = iter_record_batches(df, positions, columns, chunk_rows, schema)
+    if fmt == "Parquet":
+        # Every chunk becomes its own row group, flushed as soon as it is written.
+        with pq.ParquetWriter(sink, schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch, row_group_size=chunk_rows)
+                yield sink.drain()
+    elif fmt == "Arrow":
+        with ipc.new_stream(sink, schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+                yield sink.drain()
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    yield sink.drain()
+
+
+def export_to_file(df, fmt, path, positions=None, columns=None, chunk_rows=CHUNK_ROWS):
+    """
+    Writes an export chunk by chunk, so memory use is bounded by the chunk size.
+
+    Parameters:
+    - df, fmt, positions, columns, chunk_rows: See `iter_export_chunks`.
+    - path: Destination file path.
+
+    Returns:
+    - The destination path.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Concurrent sessions exporting the same view each write their own partial file.
+    partial_path = f"{path}.{os.getpid()}.{threading.get_ident()}.partial"
+    with open(partial_path, "wb") as file:
+        for chunk in iter_export_chunks(df, fmt, positions, columns, chunk_rows):
+            file.write(chunk)
+    os.replace(partial_path, path)
+    return path
+
+
+def _evict_other_versions(data_version):
+    """
+    Deletes the exports of every data version other than the given one.
+    """
+    for name in os.listdir(EXPORT_DIR):
+        if name != data_version:
+            shutil.rmtree(os.path.join(EXPORT_DIR, name), ignore_errors=True)
+
+
+def cached_export_path(df, fmt, view, data_version, filters=None, columns=None):
+    """
+    Returns the path of an export of a filtered view, writing it only if this data
+    version has not been exported in this format before. The first export of a new data
+    version deletes the exports of the previous ones.
+
+    Parameters:
+    - df: DataFrame backing the view.
+    - fmt: One of the keys of EXPORT_FORMATS.
+    - view: Name of the view, used in the file name.
+    - data_version: Fingerprint of the data the frame was built from.
+    - filters: Optional equality filters, see `filter_positions`.
+    - columns: Optional list of columns to export.
+
+    Returns:
+    - Path of the export file.
+    """
+    extension = EXPORT_FORMATS[fmt][0]
+    safe_view = "".join(c if c.isalnum() else "_" for c in view)[:60]
+    view_hash = hashlib.sha1(f"{view}:{filters}:{columns}".encode()).hexdigest()[:10]
+    path = os.path.join(
+        EXPORT_DIR, data_version, f"{safe_view}_{view_hash}.{extension}"
+    )
+    if not os.path.exists(path):
+        first_of_version = not os.path.exists(os.path.dirname(path))
+        export_to_file(df, fmt, path, filter_positions(df, filters), columns)
+        if first_of_version:
+            _evict_other_versions(data_version)
+    return path
+
+
+def display_export(container, df, key, view, data_version, filters=None, columns=None):
+    """
+    Displays download controls for a filtered view. The export is only built when requested
+    and is written to disk in chunks, then reused for the same data version.
+
+    Parameters:
+    - container: Streamlit container for displaying the controls.
+    - df: DataFrame backing the view.
+    - key: Unique prefix for the widget keys.
+    - view: Name of the view, used in the file name.
+    - data_version: Fingerprint of the data the frame was built from.
+    - filters: Optional equality filters, see `filter_positions`.
+    - columns: Optional list of columns to export.
+    """
+    format_col, button_col = container.columns([2, 4])
+    fmt = format_col.selectbox("Export format", list(EXPORT_FORMATS), key=f"{key}_format")
+    if button_col.button("Prepare download", key=f"{key}_prepare"):
+        path = cached_export_path(df, fmt, view, data_version, filters, columns)
+        with open(path, "rb") as file:
+            button_col.download_button(
+                f"Download {fmt}",
+                file,
+                file_name=os.path.basename(path),
+                mime=EXPORT_FORMATS[fmt][1],
+                key=f"{key}_download",
+            )
+
+
+if __name__ == "__main__":
+    from data_model import COMPANY_CSV, PARTY_CSV, prepare_companies, prepare_parties
+    from utils import merge_parties_companies
+
+    parser = argparse.ArgumentParser(description="Export the merged bond ledger.")
+    parser.add_argument("output", help="Destination file")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="CSV")
+    parser.add_argument("--company", action="append", help="Only bonds bought by this company")
+    parser.add_argument("--party", action="append", help="Only bonds redeemed by this party")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    companies = prepare_companies(COMPANY_CSV)
+    parties = prepare_parties(PARTY_CSV)
+    merged_df = merge_parties_companies(parties, companies)
+
+    filters = {}
+    if args.company:
+        filters["Company"] = args.company
+    if args.party:
+        filters["party"] = args.party
+    positions = filter_positions(merged_df, filters)
+    export_to_file(merged_df, args.format, args.output, positions, chunk_rows=args.chunk_rows)
+    print(f"Exported {len(positions)} rows to {args.output}")
@@ -0,0 +1,343 @@
+"""
+Memory-mapped columnar store of the prepared bond facts.
+
+The numeric and coded columns of the purchase, redemption and ledger tables are written
+once per data version as .npy files under .cache/facts/<version>-v<format>/ and opened
+read-only with mmap_mode="r", so every worker process shares one physical copy in the OS
+page cache.
+Only the small string dimension tables (company, party, ... names) are read into each
+process. Amounts are stored as one-byte denomination codes, looked up in the
+"denomination" dimension by `fact_amounts`; the rare non-standard amounts are kept aside
+with the positions of their rows.
+
+The store serves the date-scoped summaries and drill-downs, and tools that only need the
+coded facts, such as the warm-up. It does not make an app worker lighter: the ledger,
+order and export views read the pandas model, which every worker still builds, so a
+worker holds the model plus a few shared pages of the store. Compare the model alone,
+an app worker and a store-only reader with:
+
+    python fact_store.py --workers 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from data_loader import DENOMINATIONS
+
+
+FACT_STORE_DIR = os.path.join(".cache", "facts")
+# Bumped whenever the columns change, so that stores in an older layout are not opened.
+FORMAT_VERSION = 2
+EPOCH = np.datetime64("1970-01-01", "D")
+
+FactStore = namedtuple(
+    "FactStore", ["version", "path", "purchases", "redemptions", "ledger", "dimensions"]
+)
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def day_ordinals(dates):
+    """
+    Converts a datetime Series to int32 days since 1970-01-01.
+    """
+    return (dates.to_numpy().astype("datetime64[D]") - EPOCH).astype(np.int32)
+
+
+def _names(values):
+    # Blank categories and parent companies are only validation warnings, so skip missing
+    # names; their rows get code -1.
+    return sorted(pd.Series(values).dropna().unique())
+
+
+def _codes(values, dimension):
+    codes = pd.Index(dimension).get_indexer(values)
+    dtype = np.int16 if len(dimension) < 2**15 else np.int32
+    return codes.astype(dtype)
+
+
+def _amount_columns(df):
+    # Non-standard amounts get the code after the last denomination and are stored aside.
+    codes = df["Denomination"].cat.codes.to_numpy()
+    other = np.flatnonzero(codes < 0)
+    return {
+        "denomination": np.where(codes < 0, len(DENOMINATIONS), codes).astype(np.uint8),
+        "other_position": other.astype(np.int32),
+        "other_amount": df["Amount"].to_numpy(np.int64)[other],
+    }
+
+
+def build_fact_tables(model):
+    """
+    Encodes the model's facts as numeric columns and string dimension tables. Purchases and
+    redemptions are sorted by date; the ledger holds the positions of the matched pairs.
+    Missing names are coded -1.
+
+    Parameters:
+    - model: DataModel returned by `load_data_model`.
+
+    Returns:
+    - Tuple of a dictionary of table name to {column: numpy array} and a dictionary of
+      dimension name to list of strings.
+    """
+    companies = model.companies.sort_values("Date_format", kind="stable", ignore_index=True)
+    parties = model.parties.sort_values("Date_format", kind="stable", ignore_index=True)
+    dimensions = {
+        "company": _names(companies["Company"]),
+        "category": _names(companies["Category"]),
+        "parent_company": _names(companies["Parent Company"]),
+        "party": _names(parties["party"]),
+        "prefix": _names(pd.concat([companies["Prefix"], parties["Prefix"]])),
+        "order": _names(companies["Reference No  (URN)"]),
+        "denomination": DENOMINATIONS,
+    }
+
+    def bond_keys(df):
+        prefix = _codes(df["Prefix"], dimensions["prefix"]).astype(np.int64)
+        return prefix << 32 | df["Bond Number"].to_numpy()
+
+    purchase_keys = bond_keys(companies)
+    redemption_keys = bond_keys(parties)
+    tables = {
+        "purchases": {
+            **_amount_columns(companies),
+            "day": day_ordinals(companies["Date_format"]),
+            "company": _codes(companies["Company"], dimensions["company"]),
+            "category": _codes(companies["Category"], dimensions["category"]),
+            "parent_company": _codes(companies["Parent Company"], dimensions["parent_company"]),
+            "order": _codes(companies["Reference No  (URN)"], dimensions["order"]),
+            "bond_key": purchase_keys,
+        },
+        "redemptions": {
+            **_amount_columns(parties),
+            "day": day_ordinals(parties["Date_format"]),
+            "party": _codes(parties["party"], dimensions["party"]),
+            "bond_key": redemption_keys,
+        },
+    }
+
+    # Match redemptions to purchases by bond key with a sorted search instead of a merge.
+    order = np.argsort(purchase_keys, kind="stable")
+    found = np.searchsorted(purchase_keys[order], redemption_keys)
+    found = np.minimum(found, len(order) - 1)
+    matched = purchase_keys[order][found] == redemption_keys
+    tables["ledger"] = {
+        "purchase": order[found[matched]].astype(np.int32),
+        "redemption": np.flatnonzero(matched).astype(np.int32),
+    }
+    return tables, dimensions
+
+
+def store_path(version, directory=FACT_STORE_DIR):
+    """
+    Returns the directory of the fact store of a data version in the current layout.
+    """
+    return os.path.join(directory, f"{version}-v{FORMAT_VERSION}")
+
+
+def write_fact_store(model, directory=FACT_STORE_DIR):
+    """
+    Writes the fact store of a data version unless it already exists. The files are
+    written to a temporary directory that is renamed into place, so concurrent writers
+    and readers never see a partial store.
+
+    Parameters:
+    - model: DataModel returned by `load_data_model`.
+    - directory: Root directory of the stores.
+
+    Returns:
+    - Path of the store directory.
+    """
+    path = store_path(model.version, directory)
+    if os.path.exists(path):
+        return path
+    os.makedirs(directory, exist_ok=True)
+    partial = tempfile.mkdtemp(prefix=f".{model.version}.", dir=directory)
+    try:
+        tables, dimensions = build_fact_tables(model)
+        manifest = {"version": model.version, "tables": {}}
+        for table, columns in tables.items():
+            manifest["tables"][table] = {}
+            for column, values in columns.items():
+                np.save(os.path.join(partial, f"{table}.{column}.npy"), values)
+                manifest["tables"][table][column] = {
+                    "dtype": str(values.dtype),
+                    "rows": len(values),
+                }
+        with open(os.path.join(partial, "dimensions.json"), "w") as file:
+            json.dump(dimensions, file)
+        with open(os.path.join(partial, "manifest.json"), "w") as file:
+            json.dump(manifest, file, indent=2)
+        os.rename(partial, path)
+    except OSError:
+        # Another process renamed its copy into place first.
+        if not os.path.exists(path):
+            raise
+    finally:
+        shutil.rmtree(partial, ignore_errors=True)
+    return path
+
+
+def open_fact_store(version, directory=FACT_STORE_DIR):
+    """
+    Opens a written fact store read-only. Columns are memory-mapped, so opening reads only
+    the manifest and the dimension tables; an opened store is reused by the process.
+
+    Parameters:
+    - version: Data version of the store.
+    - directory: Root directory of the stores.
+
+    Returns:
+    - FactStore, or None if the store of this version has not been written.
+    """
+    path = store_path(version, directory)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is not None:
+            return store
+        if not os.path.exists(path):
+            return None
+        with open(os.path.join(path, "manifest.json")) as file:
+            manifest = json.load(file)
+        with open(os.path.join(path, "dimensions.json")) as file:
+            dimensions = {
+                name: np.array(values, dtype=object) for name, values in json.load(file).items()
+            }
+        tables = {
+            table: {
+                column: np.load(os.path.join(path, f"{table}.{column}.npy"), mmap_mode="r")
+                for column in columns
+            }
+            for table, columns in manifest["tables"].items()
+        }
+        store = _stores[path] = FactStore(
+            version,
+            path,
+            tables["purchases"],
+            tables["redemptions"],
+            tables["ledger"],
+            dimensions,
+        )
+        return store
+
+
+def load_fact_store(version=None, directory=FACT_STORE_DIR):
+    """
+    Returns the fact store of the current data files. A warm store is opened without
+    loading the CSV files; a missing one is written from the data model first.
+
+    Parameters:
+    - version: Optional data version; defaults to the fingerprint of the current files.
+    - directory: Root directory of the stores.
+
+    Returns:
+    - FactStore of the data version.
+    """
+    from data_loader import data_fingerprint
+    from data_model import data_paths, load_data_model
+
+    version = version or data_fingerprint(*data_paths())
+    store = open_fact_store(version, directory)
+    if store is None:
+        model = load_data_model()
+        write_fact_store(model, directory)
+        store = open_fact_store(model.version, directory)
+    return store
+
+
+def fact_amounts(store, table):
+    """
+    Returns the amounts of the rows of a fact table from their denomination codes.
+
+    Parameters:
+    - store: FactStore returned by `open_fact_store`.
+    - table: Purchases or redemptions of the store.
+
+    Returns:
+    - Numpy int64 array of amounts, one per row. It is private to the caller, unlike the
+      memory-mapped codes.
+    """
+    lookup = np.append(np.asarray(store.dimensions["denomination"], dtype=np.int64), 0)
+    amounts = lookup[table["denomination"]]
+    amounts[table["other_position"]] = table["other_amount"]
+    return amounts
+
+
+def decode(store, dimension, codes):
+    """
+    Maps codes back to the names of a dimension table.
+
+    Parameters:
+    - store: FactStore returned by `open_fact_store`.
+    - dimension: Name of the dimension, such as "company" or "party".
+    - codes: Array of codes.
+
+    Returns:
+    - Numpy object array of names.
+    """
+    return store.dimensions[dimension][np.asarray(codes)]
+
+
+def _memory_kib():
+    # Pss splits shared pages between the processes mapping them; Private counts the rest.
+    fields = {}
+    with open("/proc/self/smaps_rollup") as file:
+        for line in file:
+            name, _, value = line.partition(":")
+            if value.strip().endswith("kB"):
+                fields[name] = int(value.split()[0])
+    return fields["Pss"], fields["Private_Clean"] + fields["Private_Dirty"]
+
+
+def _worker(mode, results):
+    from data_model import build_data_model, data_paths
+
+    before_pss, before_private = _memory_kib()
+    started = time.perf_counter()
+    total = 0
+    if mode in ("model", "app"):
+        model = build_data_model(*data_paths())
+        total += int(model.companies["Amount"].sum()) + int(model.parties["Amount"].sum())
+    if mode in ("store", "app"):
+        store = load_fact_store()
+        total += int(fact_amounts(store, store.purchases).sum())
+        total += int(fact_amounts(store, store.redemptions).sum())
+    seconds = time.perf_counter() - started
+    pss, private = _memory_kib()
+    results.put((mode, seconds, pss - before_pss, private - before_private, total))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    load_fact_store()
+    # Fresh interpreters, so every worker opens the store itself.
+    context = multiprocessing.get_context("spawn")
+    # "app" is what a worker of the app loads: the pandas model and the store.
+    print(f"{'mode':<8}{'open ms':>10}{'Pss KiB':>10}{'private KiB':>13}")
+    for mode in ["model", "app", "store"]:
+        results = context.Queue()
+        workers = [
+            context.Process(target=_worker, args=(mode, results)) for _ in range(args.workers)
+        ]
+        for worker in workers:
+            worker.start()
+        rows = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        for _, seconds, pss, private, _ in rows:
+            print(f"{mode:<8}{seconds * 1000:>10.1f}{pss:>10}{private:>13}")
+
+
+if __name__ == "__main__":
+    main()
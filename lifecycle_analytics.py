@@ -0,0 +1,159 @@
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+import streamlit as st
+from data_model import load_derived
+
+
+# Bonds are valid for 15 days; lags are binned per day with one overflow bin.
+MAX_LAG_DAYS = 15
+NEAR_EXPIRY_DAYS = 2
+QUANTILES = [0.25, 0.5, 0.75, 0.9]
+
+LifecycleStats = namedtuple("LifecycleStats", ["bonds", "histograms", "profiles"])
+
+
+def compute_bond_lifecycle(merged_df):
+    """
+    Computes the purchase-to-redemption lag of every matched bond in one vectorized pass.
+
+    Parameters:
+    - merged_df: DataFrame of bonds joined with their redemptions.
+
+    Returns:
+    - DataFrame with Company, party, Category, denomination, lag and expiry columns. The
+      expiry columns are missing (NaN or NA) for bonds whose expiry date does not parse.
+    """
+    # Expiry dates are not validated, so a malformed one must not fail the whole load.
+    expiry = pd.to_datetime(merged_df["Date of Expiry"], format="%d/%b/%Y", errors="coerce")
+    days_to_redemption = (merged_df["Date_format_y"] - merged_df["Date_format_x"]).dt.days
+    days_left = (expiry - merged_df["Date_format_y"]).dt.days
+    unknown = days_left.isna()
+    return pd.DataFrame(
+        {
+            "Company": merged_df["Company"],
+            "party": merged_df["party"],
+            "Category": merged_df["Category"],
+            "Denomination": merged_df["Denomination"].astype("Int64"),
+            "days_to_redemption": days_to_redemption.to_numpy(),
+            "days_before_expiry": days_left.to_numpy(),
+            "near_expiry": (days_left <= NEAR_EXPIRY_DAYS).astype("boolean").mask(unknown).array,
+            "after_expiry": (days_left < 0).astype("boolean").mask(unknown).array,
+        }
+    )
+
+
+def lag_histograms(bonds, group_column, bins):
+    """
+    Counts bonds per (group, lag day) with a single bincount over combined codes.
+
+    Parameters:
+    - bonds: DataFrame returned by `compute_bond_lifecycle`.
+    - group_column: Column to group by.
+    - bins: Number of lag bins; larger lags fall in the last bin.
+
+    Returns:
+    - DataFrame indexed by group with one column per lag day, labelled "00", "01", ... so
+      that the labels sort in order, and a last "≥ N" column for the longer lags.
+    """
+    codes, groups = pd.factorize(bonds[group_column], sort=True)
+    lag_bins = np.clip(bonds["days_to_redemption"].to_numpy(), 0, bins - 1)
+    # Rows without a group, such as non-standard denominations, have code -1.
+    named = codes >= 0
+    counts = np.bincount(
+        codes[named] * bins + lag_bins[named], minlength=len(groups) * bins
+    )
+    labels = [f"{day:02d}" for day in range(bins - 1)] + [f"≥ {bins - 1}"]
+    return pd.DataFrame(counts.reshape(len(groups), bins), index=groups, columns=labels)
+
+
+def lag_profiles(bonds, group_column):
+    """
+    Summarizes the lag distribution of every group: quantiles, mean and expiry shares.
+
+    Parameters:
+    - bonds: DataFrame returned by `compute_bond_lifecycle`.
+    - group_column: Column to group by.
+
+    Returns:
+    - DataFrame indexed by group.
+    """
+    grouped = bonds.groupby(group_column)
+    quantiles = grouped["days_to_redemption"].quantile(QUANTILES).unstack()
+    quantiles.columns = [f"p{int(q * 100)}_days" for q in QUANTILES]
+    summary = grouped.agg(
+        bonds=("days_to_redemption", "size"),
+        mean_days=("days_to_redemption", "mean"),
+        near_expiry_share=("near_expiry", "mean"),
+        after_expiry=("after_expiry", "sum"),
+    )
+    return summary.join(quantiles)
+
+
+def build_lifecycle_stats(model):
+    """
+    Precomputes lag histograms and profiles per company, party and denomination.
+
+    Parameters:
+    - model: DataModel returned by `load_data_model`.
+
+    Returns:
+    - LifecycleStats with per-bond lags and, per kind of entity, histograms and profiles.
+    """
+    bonds = compute_bond_lifecycle(model.merged_df)
+    histograms, profiles = {}, {}
+    for kind, column in [("company", "Company"), ("party", "party"), ("denomination", "Denomination")]:
+        histograms[kind] = lag_histograms(bonds, column, MAX_LAG_DAYS + 2)
+        profiles[kind] = lag_profiles(bonds, column)
+    return LifecycleStats(bonds, histograms, profiles)
+
+
+def load_lifecycle_stats():
+    """
+    Returns the lifecycle statistics of the current data version.
+    """
+    return load_derived("lifecycle", build_lifecycle_stats)
+
+
+def display_lag_profile(container, kind, name):
+    """
+    Displays the purchase-to-redemption lag profile of a company or party.
+
+    Parameters:
+    - container: Streamlit container for displaying data.
+    - kind: "company" or "party".
+    - name: Name of the company or party.
+    """
+    stats = load_lifecycle_stats()
+    if name not in stats.profiles[kind].index:
+        return
+    profile = stats.profiles[kind].loc[name]
+    container.subheader("Purchase-to-Redemption Lag")
+    container.markdown("---")
+    median_col, p90_col, near_col, bonds_col = container.columns(4)
+    median_col.metric("Median days to redemption", f"{profile['p50_days']:.0f}")
+    p90_col.metric("90th percentile (days)", f"{profile['p90_days']:.0f}")
+    near_col.metric(
+        f"Redeemed ≤{NEAR_EXPIRY_DAYS} days before expiry",
+        "{:.2f}%".format(profile["near_expiry_share"] * 100),
+    )
+    bonds_col.metric("Matched bonds", int(profile["bonds"]))
+    histogram = stats.histograms[kind].loc[name].rename_axis("Days to redemption")
+    container.bar_chart(histogram.rename("Bonds"))
+
+
+def display_denomination_lag(container):
+    """
+    Displays the lag profile of every bond denomination.
+
+    Parameters:
+    - container: Streamlit container for displaying data.
+    """
+    profiles = load_lifecycle_stats().profiles["denomination"]
+    container.subheader("Purchase-to-Redemption Lag by Denomination")
+    container.markdown("---")
+    container.dataframe(
+        profiles.reset_index(),
+        column_config={"near_expiry_share": st.column_config.NumberColumn(format="%.3f")},
+        use_container_width=True,
+    )
@@ -0,0 +1,110 @@
+"""
+Local stand-in for the Google Sheets CSV export, for testing the remote source layer
+without network access. Serves `<directory>/<sheet>.csv` for
+`/spreadsheets/d/<sheet_id>/gviz/tq?tqx=out:csv&sheet=<sheet>` and plain `/<file>` paths
+(with the content type of their extension, e.g. an HTML sign-in page), with ETag /
+Last-Modified validators and optional injected latency and failures. Used by
+`remote_source_check.py`.
+
+    python local_sheet_server.py data --port 8503
+"""
+import argparse
+import email.utils
+import hashlib
+import mimetypes
+import os
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class SheetRequestHandler(BaseHTTPRequestHandler):
+    directory = "."
+    delay = 0.0
+    failure_rate = 0.0
+
+    def _file_path(self):
+        url = urllib.parse.urlsplit(self.path)
+        sheet = urllib.parse.parse_qs(url.query).get("sheet")
+        name = f"{sheet[0]}.csv" if sheet else urllib.parse.unquote(url.path.lstrip("/"))
+        path = os.path.realpath(os.path.join(self.directory, name))
+        if not path.startswith(os.path.realpath(self.directory) + os.sep):
+            return None
+        return path
+
+    def do_GET(self):
+        if self.delay:
+            time.sleep(self.delay)
+        if random.random() < self.failure_rate:
+            return self._send(503, b"Injected failure")
+        path = self._file_path()
+        if path is None or not os.path.isfile(path):
+            return self._send(404, b"Not found")
+
+        with open(path, "rb") as file:
+            body = file.read()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        last_modified = email.utils.formatdate(os.stat(path).st_mtime, usegmt=True)
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, b"", etag, last_modified)
+        since = self.headers.get("If-Modified-Since")
+        if since and not self.headers.get("If-None-Match") and since == last_modified:
+            return self._send(304, b"", etag, last_modified)
+        content_type = mimetypes.guess_type(path)[0] or "text/csv"
+        self._send(200, body, etag, last_modified, content_type)
+
+    def _send(self, status, body, etag=None, last_modified=None, content_type="text/csv"):
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_in_thread(directory, port=0, delay=0.0, failure_rate=0.0):
+    """
+    Starts the stand-in server on a daemon thread.
+
+    Parameters:
+    - directory: Directory holding the `<sheet>.csv` files.
+    - port: Port to listen on; 0 picks a free port.
+    - delay: Seconds to wait before answering each request.
+    - failure_rate: Fraction of requests answered with 503.
+
+    Returns:
+    - Tuple of the server (call `shutdown()` to stop it) and its base URL.
+    """
+    handler = type(
+        "BoundSheetRequestHandler",
+        (SheetRequestHandler,),
+        {"directory": directory, "delay": delay, "failure_rate": failure_rate},
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    return server, f"http://{host}:{port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve CSV files like the Google Sheets export.")
+    parser.add_argument("directory")
+    parser.add_argument("--port", type=int, default=8503)
+    parser.add_argument("--delay", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, url = serve_in_thread(args.directory, args.port, args.delay, args.failure_rate)
+    print(f"Serving {args.directory} on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
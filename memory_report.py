@@ -0,0 +1,89 @@
+"""
+Reports the memory held per concurrent session before and after sharing the data model.
+
+    python memory_report.py --sessions 50
+
+"before" rebuilds the frames and summaries in every session and adds display columns to
+them, as app.main did. "after" takes the process-shared, read-only model and builds only
+view-local frames.
+"""
+import argparse
+import gc
+import tracemalloc
+from data_loader import load_and_prepare_data, load_and_prepare_party_data
+from data_model import COMPANY_CSV, PARTY_CSV, build_data_model, load_data_model
+from data_preprocessing import summarize_data, summarize_party_data
+from company_handler import add_company_links, add_open_corporate_url
+from utils import merge_parties_companies
+
+
+def session_before():
+    companies = load_and_prepare_data(COMPANY_CSV)
+    parties = load_and_prepare_party_data(PARTY_CSV)
+    merged_df = merge_parties_companies(parties, companies)
+    sorted_company, year_company_group, parent_company_group, category_group = (
+        summarize_data(companies)
+    )
+    sorted_party, party_year_group = summarize_party_data(parties)
+    # Previous display_overview: derived columns added to the full frame.
+    sorted_company["company_details"] = sorted_company["company_id"].apply(
+        add_open_corporate_url
+    )
+    overview = sorted_company.reset_index(drop=True)
+    overview["is_ED_raid"] = overview["is_ED_raid"].map({1: "Yes", 0: "No"})
+    return [
+        companies,
+        parties,
+        merged_df,
+        sorted_company,
+        year_company_group,
+        parent_company_group,
+        category_group,
+        sorted_party,
+        party_year_group,
+        overview,
+    ]
+
+
+def session_after():
+    model = load_data_model()
+    # Display columns are derived for the visible page only.
+    overview_page = add_company_links(model.sorted_company.head(50))
+    return [model, overview_page]
+
+
+def measure(session, sessions):
+    """
+    Runs `sessions` sessions that stay alive at the same time and returns the traced bytes.
+    """
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    alive = [session() for _ in range(sessions)]
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del alive
+    return current - baseline, peak - baseline
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-session memory use.")
+    parser.add_argument("--sessions", type=int, default=50)
+    args = parser.parse_args()
+
+    # Warm imports and lazily initialised pandas state outside the measurement.
+    build_data_model()
+
+    rows = []
+    for name, session in [("before", session_before), ("after", session_after)]:
+        held, peak = measure(session, args.sessions)
+        rows.append((name, held, peak))
+
+    print(f"{args.sessions} simulated concurrent sessions")
+    print(f"{'mode':<8}{'held MiB':>12}{'peak MiB':>12}{'per session KiB':>18}")
+    for name, held, peak in rows:
+        print(
+            f"{name:<8}{held / 2**20:>12.1f}{peak / 2**20:>12.1f}"
+            f"{held / args.sessions / 2**10:>18.1f}"
+        )
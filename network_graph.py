@@ -0,0 +1,176 @@
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from data_model import load_derived
+from utils import format_amount
+
+
+# Largest node budget of the view; every node keeps this many neighbours for its ego network.
+MAX_NODES = 150
+EDGES_PER_NODE = 3
+COMPANY_COLOR = "#5470C6"
+PARTY_COLOR = "#EE6666"
+
+DonorGraph = namedtuple("DonorGraph", ["nodes", "edges", "neighbours"])
+
+
+def build_donor_graph(model):
+    """
+    Builds the weighted bipartite donor-party graph from the merged ledger, with degree and
+    weighted-degree centrality and the top neighbours of every node.
+
+    Parameters:
+    - model: DataModel returned by `load_data_model`.
+
+    Returns:
+    - DonorGraph with a node table, an edge table sorted by weight and a dictionary of
+      node id to its heaviest edges.
+    """
+    edges = (
+        model.merged_df.groupby(["Company", "party"])["Amount_y"]
+        .agg(Amount="sum", Bond_count="count")
+        .reset_index()
+    )
+    edges["source"] = "c:" + edges["Company"]
+    edges["target"] = "p:" + edges["party"]
+    edges = edges.sort_values("Amount", ascending=False, ignore_index=True)
+
+    company_nodes = edges.groupby("source").agg(
+        label=("Company", "first"), degree=("target", "size"), weighted_degree=("Amount", "sum")
+    )
+    party_nodes = edges.groupby("target").agg(
+        label=("party", "first"), degree=("source", "size"), weighted_degree=("Amount", "sum")
+    )
+    nodes = pd.concat(
+        [company_nodes.assign(kind="company"), party_nodes.assign(kind="party")]
+    )
+    total = edges["Amount"].sum()
+    nodes["weighted_degree_share"] = nodes["weighted_degree"] / (2 * total)
+    nodes = nodes.sort_values("weighted_degree", ascending=False)
+
+    # Edges are sorted by weight, so the first rows of every group are its heaviest edges.
+    neighbours = {}
+    for side, other in [("source", "target"), ("target", "source")]:
+        top = edges.groupby(side, sort=False).head(MAX_NODES - 1)
+        for node, group in top.groupby(side, sort=False):
+            neighbours[node] = list(zip(group[other], group["Amount"], group["Bond_count"]))
+    return DonorGraph(nodes, edges, neighbours)
+
+
+def load_donor_graph():
+    """
+    Returns the donor-party graph of the current data version.
+    """
+    return load_derived("donor_graph", build_donor_graph)
+
+
+def ego_network(graph, node, max_nodes):
+    """
+    Selects a node and its heaviest neighbours within a node budget.
+
+    Parameters:
+    - graph: DonorGraph returned by `build_donor_graph`.
+    - node: Id of the centre node ("c:<company>" or "p:<party>").
+    - max_nodes: Maximum number of nodes to return, including the centre.
+
+    Returns:
+    - Tuple of the selected node ids and a list of (source, target, amount, bond count) edges.
+    """
+    edges = []
+    for neighbour, amount, bond_count in graph.neighbours.get(node, [])[: max_nodes - 1]:
+        source, target = (node, neighbour) if node.startswith("c:") else (neighbour, node)
+        edges.append((source, target, amount, bond_count))
+    node_ids = [node] + [edge[1] if edge[0] == node else edge[0] for edge in edges]
+    return node_ids, edges
+
+
+def global_network(graph, max_nodes, edges_per_node=EDGES_PER_NODE):
+    """
+    Prunes the graph to its heaviest edges within a node budget, keeping at most
+    `edges_per_node` edges at every node so hub parties do not take every edge.
+
+    Parameters:
+    - graph: DonorGraph returned by `build_donor_graph`.
+    - max_nodes: Maximum number of nodes.
+    - edges_per_node: Maximum number of edges kept at any node.
+
+    Returns:
+    - Tuple of the selected node ids and a list of (source, target, amount, bond count) edges.
+    """
+    degrees, node_ids, kept = {}, {}, []
+    # Edges are sorted by weight, so the greedy pass keeps the heaviest edges of every node.
+    for source, target, amount, bond_count in zip(
+        graph.edges["source"], graph.edges["target"], graph.edges["Amount"], graph.edges["Bond_count"]
+    ):
+        if degrees.get(source, 0) >= edges_per_node or degrees.get(target, 0) >= edges_per_node:
+            continue
+        new_nodes = [node for node in (source, target) if node not in node_ids]
+        if len(node_ids) + len(new_nodes) > max_nodes:
+            continue
+        for node in new_nodes:
+            node_ids[node] = True
+        degrees[source] = degrees.get(source, 0) + 1
+        degrees[target] = degrees.get(target, 0) + 1
+        kept.append((source, target, amount, bond_count))
+    return list(node_ids), kept
+
+
+def display_network(network_i):
+    """
+    Displays the donor-party network, either globally pruned by edge weight or as the
+    ego network of a selected company or party.
+
+    Parameters:
+    - network_i: Streamlit container or page to display the network on.
+    """
+    graph = load_donor_graph()
+    network_i.subheader("Donor and Party Network")
+    network_i.markdown("---")
+    mode_col, budget_col = network_i.columns([3, 3])
+    mode = mode_col.radio("View", ["Heaviest flows", "Company or party"], horizontal=True)
+    max_nodes = budget_col.slider("Maximum number of nodes", 10, MAX_NODES, 60, step=10)
+
+    if mode == "Heaviest flows":
+        node_ids, edges = global_network(graph, max_nodes)
+    else:
+        labels = graph.nodes["label"] + " (" + graph.nodes["kind"] + ")"
+        node_ids_by_label = dict(zip(labels, graph.nodes.index))
+        label = network_i.selectbox("Select a company or party", labels)
+        node_ids, edges = ego_network(graph, node_ids_by_label[label], max_nodes)
+
+    from streamlit_agraph import Config, Edge, Node, agraph
+
+    node_table = graph.nodes.loc[node_ids]
+    largest = node_table["weighted_degree"].max()
+    nodes = [
+        Node(
+            id=row.Index,
+            label=row.label,
+            title=f"{row.label}: ₹{format_amount(row.weighted_degree)} Cr, {row.degree} links",
+            size=10 + 30 * np.sqrt(row.weighted_degree / largest),
+            color=COMPANY_COLOR if row.kind == "company" else PARTY_COLOR,
+        )
+        for row in node_table.itertuples()
+    ]
+    heaviest = max((amount for _, _, amount, _ in edges), default=1)
+    edge_items = [
+        Edge(
+            source=source,
+            target=target,
+            title=f"₹{format_amount(amount)} Cr, {bond_count} bonds",
+            width=1 + 6 * amount / heaviest,
+        )
+        for source, target, amount, bond_count in edges
+    ]
+    with network_i:
+        agraph(nodes=nodes, edges=edge_items, config=Config(height=700, width=1200, physics=True))
+
+    network_i.subheader("Most Central Donors and Parties")
+    central = graph.nodes.head(50).reset_index(drop=True)
+    central = central.assign(
+        **{"weighted_degree (₹ Cr)": central["weighted_degree"].apply(format_amount)}
+    )
+    network_i.dataframe(
+        central[["label", "kind", "degree", "weighted_degree (₹ Cr)", "weighted_degree_share"]],
+        use_container_width=True,
+    )
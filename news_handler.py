@@ -1,35 +1,83 @@
+import html
 import json
+import threading
+from collections import namedtuple
+from data_loader import data_fingerprint
+from data_model import load_data_model
+from single_flight import SingleFlightCache
+from text_matcher import MIN_ALIAS_LENGTH, PhraseMatcher, normalize_tokens
+
+
+NEWS_JSON = "articles.json"
+
+# Trailing words dropped from company names to get the name used in headlines.
+LEGAL_SUFFIXES = {"LIMITED", "LTD", "PRIVATE", "PVT", "P", "CO", "COMPANY", "LLP", "INC"}
+
+# Words that do not identify an entity on their own, so a parenthesised part made of them
+# ("(UNITED)", "(SECULAR)", "(INDIA)", "(P)") is not an alias. Curated short names of
+# parties go in PARTY_ALIASES instead.
+GENERIC_TOKENS = LEGAL_SUFFIXES | {"UNITED", "SECULAR", "INDIA", "INDIAN", "THE"}
+
+# Names used in headlines for parties whose registered name differs. Names shared by
+# several parties, such as "Congress Party", are left out.
+PARTY_ALIASES = {
+    "BHARATIYA JANATA PARTY": ["BJP"],
+    "PRESIDENT, ALL INDIA CONGRESS COMMITTEE": ["INDIAN NATIONAL CONGRESS"],
+    "ALL INDIA TRINAMOOL CONGRESS": ["TMC", "TRINAMOOL CONGRESS"],
+    "ALL INDIA ANNA DRAVIDA MUNNETRA KAZHAGAM": ["AIADMK"],
+    "BHARAT RASHTRA SAMITHI": ["BRS"],
+    "TELUGU DESAM PARTY": ["TDP"],
+    "YSR  CONGRESS PARTY  (YUVAJANA SRAMIKA RYTHU CONGRESS PARTY)": ["YSRCP"],
+    "AAM AADMI PARTY": ["AAP"],
+    "BIJU JANATA DAL": ["BJD"],
+    "JANATA DAL ( SECULAR )": ["JD(S)", "JDS"],
+    "BIHAR PRADESH JANTA DAL(UNITED)": ["JD(U)", "JDU", "JANATA DAL UNITED"],
+    "RASHTRIYA JANTA DAL": ["RJD"],
+    "JHARKHAND MUKTI MORCHA": ["JMM"],
+    "DRAVIDA MUNNETRA KAZHAGAM (DMK)": ["DMK"],
+    "SHIVSENA": ["SHIV SENA"],
+}
+
+NewsStore = namedtuple(
+    "NewsStore", ["articles", "links_html", "company_links", "party_links"]
+)
+
+_news_caches = {}
+_news_caches_lock = threading.Lock()
+
 
 def generate_news_links(articles):
     """
     Generates HTML markup for news article links.
-    
+
     Parameters:
     - articles: A dictionary where keys are article titles and values are article URLs.
-    
+
     Returns:
     - A list of HTML strings for each news link.
     """
-    return [f'<a href="{url}" target="_blank">{title}</a>' for title, url in articles.items()]
+    return [
+        f'<a href="{html.escape(url)}" target="_blank">{html.escape(title)}</a>'
+        for title, url in articles.items()
+    ]
 
 def display_news_links(news_i, news_links):
     """
     Displays news links on the provided Streamlit container.
-    
+
     Parameters:
     - news_i: The Streamlit container or page to display the news links on.
-    - news_links: A list of HTML strings containing news links.
+    - news_links: Pre-rendered HTML block of news links.
     """
-    for link in news_links:
-        news_i.markdown(link, unsafe_allow_html=True)
+    news_i.markdown(news_links, unsafe_allow_html=True)
 
 def load_articles_from_json(json_file_path):
     """
     Loads news articles from a JSON file.
-    
+
     Parameters:
     - json_file_path: Path to the JSON file containing news articles.
-    
+
     Returns:
     - A dictionary where keys are article titles and values are article URLs.
     """
@@ -38,13 +86,120 @@ def load_articles_from_json(json_file_path):
     articles = {article['title']: article['url'] for article in data['articles']}
     return articles
 
+def entity_aliases(name, kind):
+    """
+    Lists the phrases that refer to a company or party in headlines.
+
+    Parameters:
+    - name: Canonical company or party name.
+    - kind: "company" or "party".
+
+    Returns:
+    - List of alias phrases, including the canonical name.
+    """
+    aliases = [name]
+    if "(" in name:
+        outside, _, rest = name.partition("(")
+        aliases.append(outside)
+        # Only the text up to the closing parenthesis, and only when it names the entity.
+        inside = normalize_tokens(rest.partition(")")[0])
+        if (
+            inside
+            and not any(token in GENERIC_TOKENS for token in inside)
+            and len(" ".join(inside)) >= MIN_ALIAS_LENGTH
+        ):
+            aliases.append(" ".join(inside))
+    if kind == "company":
+        tokens = normalize_tokens(name)
+        while tokens and tokens[-1] in LEGAL_SUFFIXES:
+            tokens.pop()
+        if tokens and len(" ".join(tokens)) >= MIN_ALIAS_LENGTH:
+            aliases.append(" ".join(tokens))
+    else:
+        aliases.extend(PARTY_ALIASES.get(name, []))
+    return aliases
+
+def render_related_links(articles, indices):
+    """
+    Pre-renders the link block for a list of article positions.
+    """
+    titles = list(articles)
+    return "<br>".join(generate_news_links({titles[i]: articles[titles[i]] for i in indices}))
+
+def build_news_store(articles, company_names, party_names):
+    """
+    Links every article to the companies and parties its title mentions and pre-renders
+    the link blocks, so pages only need a dictionary lookup.
+
+    Parameters:
+    - articles: Dictionary of article titles to URLs.
+    - company_names: Iterable of canonical company names.
+    - party_names: Iterable of canonical party names.
+
+    Returns:
+    - NewsStore with the rendered link block and per-entity link blocks.
+    """
+    matcher = PhraseMatcher(
+        [(alias, ("company", name)) for name in company_names for alias in entity_aliases(name, "company")]
+        + [(alias, ("party", name)) for name in party_names for alias in entity_aliases(name, "party")]
+    )
+    related = {"company": {}, "party": {}}
+    for index, title in enumerate(articles):
+        for kind, name in matcher.find(title):
+            related[kind].setdefault(name, []).append(index)
+
+    return NewsStore(
+        articles,
+        "<br>".join(generate_news_links(articles)),
+        {name: render_related_links(articles, idx) for name, idx in related["company"].items()},
+        {name: render_related_links(articles, idx) for name, idx in related["party"].items()},
+    )
+
+def load_news_store(json_file_path=NEWS_JSON):
+    """
+    Returns the news store, rebuilt only when the articles file or the data model changes.
+
+    Parameters:
+    - json_file_path: Path to the JSON file containing news articles.
+
+    Returns:
+    - NewsStore shared by every session in the process.
+    """
+    with _news_caches_lock:
+        cache = _news_caches.get(json_file_path)
+        if cache is None:
+            cache = _news_caches[json_file_path] = SingleFlightCache(f"news:{json_file_path}")
+    model = load_data_model()
+    return cache.get(
+        (data_fingerprint(json_file_path), model.version),
+        lambda: build_news_store(
+            load_articles_from_json(json_file_path),
+            model.sorted_company["Company"],
+            model.sorted_party["party"],
+        ),
+    )
+
+def display_related_news(container, kind, name):
+    """
+    Displays the articles that mention a company or party, if there are any.
+
+    Parameters:
+    - container: Streamlit container for displaying the links.
+    - kind: "company" or "party".
+    - name: Canonical company or party name.
+    """
+    store = load_news_store()
+    links = (store.company_links if kind == "company" else store.party_links).get(name)
+    if links:
+        container.subheader("Related News")
+        container.markdown(links, unsafe_allow_html=True)
+
 def display_news(news_i):
     """
     Displays a list of news articles on a Streamlit container or page.
-    
+
     Parameters:
     - news_i: The Streamlit container or page to display the news on.
     """
-    articles = load_articles_from_json('articles.json')
-    news_links = generate_news_links(articles)
-    display_news_links(news_i, news_links)
\ No newline at end of file
+    store = load_news_store()
+    display_news_links(news_i, store.links_html)
@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+from data_model import load_derived
+from date_scope import load_date_scopes, load_drill_scopes, window_children, window_years
+from utils import format_amount
+
+
+# Drill-down paths of the cube: the fact table and amount column they aggregate, the levels
+# from the top down and extra attributes carried along with the last level. Party flows are
+# counted in the year of redemption.
+HIERARCHIES = {
+    "parent_company": ("companies", "Amount", ["Parent Company", "Company", "Year"], []),
+    "category_company": ("companies", "Amount", ["Category", "Company"], ["Parent Company"]),
+    "category_year": ("companies", "Amount", ["Category", "Year"], []),
+    "parent_party": ("merged_df", "Amount_y", ["Parent Company", "party", "Year_y"], []),
+}
+
+
+
+def _format_children(children, total):
+    """
+    Adds the within-parent share and the display columns to a level's children.
+    """
+    children = children.sort_values("Amount", ascending=False)
+    share = children["Amount"] / total * 100 if total else children["Amount"] * 0.0
+    return children.assign(
+        **{
+            "Amount (₹ Cr)": children["Amount"].apply(format_amount),
+            "share": share,
+            "percentage": share.map("{:.2f}%".format),
+        }
+    )
+
+
+def build_hierarchy(fact, amount_column, levels, attributes):
+    """
+    Aggregates a fact table at the finest level of a hierarchy, rolls the subtotals up to
+    every coarser level and splits each level by its parent path.
+
+    Parameters:
+    - fact: DataFrame of transactions.
+    - amount_column: Column with the amounts.
+    - levels: Columns of the hierarchy, from the top down.
+    - attributes: Extra columns carried, by first value, with the finest level.
+
+    Returns:
+    - List with one dictionary per level, mapping a parent path tuple (the values of the
+      levels above) to a DataFrame of its children with subtotals and within-parent shares.
+    """
+    aggregations = {
+        "Amount": (amount_column, "sum"),
+        "Bond_count": (amount_column, "count"),
+        **{attribute: (attribute, "first") for attribute in attributes},
+    }
+    finest = fact.groupby(levels).agg(**aggregations).reset_index()
+    # Year columns of the merged ledger carry a purchase/redemption suffix.
+    levels = [level.removesuffix("_y") for level in levels]
+    finest = finest.rename(columns={"Year_y": "Year"})
+
+    cube = []
+    for depth in range(1, len(levels) + 1):
+        level_columns = levels[:depth]
+        if depth == len(levels):
+            table = finest
+        else:
+            table = (
+                finest.groupby(level_columns)
+                .agg(Amount=("Amount", "sum"), Bond_count=("Bond_count", "sum"))
+                .reset_index()
+            )
+        parents = level_columns[:-1]
+        children = {}
+        if parents:
+            for path, group in table.groupby(parents, sort=False):
+                path = path if isinstance(path, tuple) else (path,)
+                children[path] = _format_children(
+                    group.reset_index(drop=True), group["Amount"].sum()
+                )
+        else:
+            children[()] = _format_children(table, table["Amount"].sum())
+        cube.append(children)
+    return cube
+
+
+def build_cube(model):
+    """
+    Builds every hierarchy of the cube.
+
+    Parameters:
+    - model: DataModel returned by `load_data_model`.
+
+    Returns:
+    - Dictionary of hierarchy name to the levels returned by `build_hierarchy`.
+    """
+    return {
+        name: build_hierarchy(getattr(model, fact), amount_column, levels, attributes)
+        for name, (fact, amount_column, levels, attributes) in HIERARCHIES.items()
+    }
+
+
+def load_cube():
+    """
+    Returns the cube of the current data version.
+    """
+    return load_derived("olap_cube", build_cube)
+
+
+def windowed_children(hierarchy, path, start_date, end_date):
+    """
+    Looks up the children of a path in a hierarchy over the bonds of a date range only,
+    from the prefix sums of the date and drill scopes.
+
+    Parameters:
+    - hierarchy: Name of the hierarchy in HIERARCHIES.
+    - path: Values of one or two levels to drill into, from the top down.
+    - start_date, end_date: datetime.date bounds of the range (inclusive).
+
+    Returns:
+    - DataFrame of the children like `drill_down`, or None if the path has no bonds in
+      the range.
+    """
+    level = HIERARCHIES[hierarchy][2][len(path)].removesuffix("_y")
+    if hierarchy == "category_year":
+        scope = load_date_scopes()["category"]
+        row = np.searchsorted(scope.names, path[0])
+        if row == len(scope.names) or scope.names[row] != path[0]:
+            return None
+        names, amounts, counts = window_years(scope, row, start_date, end_date)
+    else:
+        drill = load_drill_scopes()[hierarchy]
+        totals = window_children(drill, path[0], start_date, end_date)
+        if totals is None:
+            return None
+        names, amounts, counts = totals
+        if len(path) == 2:
+            position = np.searchsorted(names, path[1])
+            if position == len(names) or names[position] != path[1]:
+                return None
+            row = drill.parents[path[0]].start + position
+            names, amounts, counts = window_years(drill.scope, row, start_date, end_date)
+    children = pd.DataFrame({level: names, "Amount": amounts, "Bond_count": counts})
+    children = children[children["Bond_count"] > 0]
+    if children.empty:
+        return None
+    attributes = HIERARCHIES[hierarchy][3]
+    if attributes and len(path) == len(HIERARCHIES[hierarchy][2]) - 1:
+        # Attributes do not depend on the range; take them from the full-period children.
+        full = drill_down(hierarchy, *path).set_index(level)[attributes]
+        children = children.join(full, on=level)
+    return _format_children(children.reset_index(drop=True), children["Amount"].sum())
+
+
+def drill_down(hierarchy, *path, window=None):
+    """
+    Looks up the children of a path in a hierarchy of the cube.
+
+    Parameters:
+    - hierarchy: Name of the hierarchy in HIERARCHIES.
+    - path: Values of the levels to drill into, from the top down. No values returns the
+      top level.
+    - window: Optional (start, end) datetime.date tuple; the children then cover the bonds
+      of that range, from the prefix sums of `date_scope`, instead of the full period.
+
+    Returns:
+    - DataFrame of the children, sorted by amount, with Amount, Bond_count, Amount (₹ Cr),
+      share and percentage columns, or None if the path does not exist.
+    """
+    if window is not None:
+        return windowed_children(hierarchy, path, *window)
+    return load_cube()[hierarchy][len(path)].get(tuple(path))
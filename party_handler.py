@@ -1,67 +1,95 @@
-import matplotlib.pyplot as plt
 import pandas as pd
 from utils import (
     calculate_percentage,
     format_amount,
-    aggregate_transactions,
     format_and_sort_group,
 )
-from streamlit_echarts import st_echarts
-
-
-def display_party_transactions(party_i, merged_df, selected_party):
+from concentration import CONCENTRATION_COLUMN_CONFIG, with_concentration
+from data_access import load_data_access
+from denominations import display_denomination_histogram
+from export_handler import display_export
+from lifecycle_analytics import display_denomination_lag, display_lag_profile
+from news_handler import display_related_news
+from purchase_orders import display_order_lines, load_purchase_orders
+from rankings import load_rankings, top_n, top_n_chart_data
+from similarity import display_similar_parties
+
+
+def display_party_transactions(party_i, merged_df, selected_party, data_version):
     """
-    Displays transactions of the selected party.
+    Displays the purchase orders redeemed by the selected party.
 
     Parameters:
     - party_i: Streamlit container for displaying data.
-    - parties: DataFrame containing party transaction data.
+    - merged_df: DataFrame of bonds joined with their redemptions, used for the export.
     - selected_party: The name of the selected party.
+    - data_version: Fingerprint of the data used to cache the table pages.
     """
-    party_transaction_details = merged_df[
-        merged_df["party"] == selected_party
-    ].reset_index(drop=True)
+    order_lines = load_purchase_orders().order_lines
+    party_order_lines = order_lines[order_lines["party"] == selected_party]
     party_i.subheader("Date-specific Bond Redemption Details")
     party_i.markdown("---")
 
     party_filter_left, party_filter_right = party_i.columns([3, 3])
     c_filter = party_filter_left.multiselect(
     'Filter by Company',
-    sorted(party_transaction_details['Company'].unique()))
+    sorted(party_order_lines['Company'].unique()))
 
     c_date_filter = party_filter_right.multiselect(
     'Filter by transaction date',
-    sorted(party_transaction_details['Date_y'].unique()))
+    sorted(party_order_lines['Date_y'].unique()))
 
     if c_filter:
-       party_transaction_details = party_transaction_details[party_transaction_details['Company'].isin(c_filter)]
+       party_order_lines = party_order_lines[party_order_lines['Company'].isin(c_filter)]
     
     if c_date_filter:
-        party_transaction_details = party_transaction_details[party_transaction_details['Date_y'].isin(c_date_filter)]
-
-    party_i.dataframe(
-        party_transaction_details[
-            [
-                "Date_y",
-                "Reference No  (URN)",
-                "Journal Date",
-                "Company",
-                "Amount_y",
-                "Prefix",
-                "Bond Number",
-            ]
+        party_order_lines = party_order_lines[party_order_lines['Date_y'].isin(c_date_filter)]
+
+    # One row per purchase order and redemption date; the bonds are listed on demand.
+    display_order_lines(
+        party_i,
+        party_order_lines.reset_index(drop=True),
+        "party_transactions",
+        [
+            "Date_y",
+            "Reference No  (URN)",
+            "Journal Date",
+            "Company",
+            "Date_x",
+            "Bond_count",
+            "Amount",
+            "Bond ranges",
         ],
-        column_config={"Date_y": "Date", "Amount_y": "Amount"},
-        use_container_width=True,
+        data_version,
+        view=f"party_transactions:{selected_party}:{c_filter}:{c_date_filter}",
+        column_config={"Date_y": "Date", "Date_x": "Date Purchased"},
+    )
+    display_export(
+        party_i,
+        merged_df,
+        "party_export",
+        f"party_{selected_party}_{c_filter}_{c_date_filter}",
+        data_version,
+        filters={
+            "party": selected_party,
+            **({"Company": c_filter} if c_filter else {}),
+            **({"Date_y": c_date_filter} if c_date_filter else {}),
+        },
     )
 
 
 def display_overall_party_data(sorted_party, party_ov):
+    if sorted_party.empty:
+        party_ov.write("No bonds were redeemed in the selected date range.")
+        return
     col1, col2 = party_ov.columns([3, 3])
     with col1:
         col1.subheader("Total Electoral Bond Redemption Data")
         col1.markdown("---")
-        col1.dataframe(sorted_party.drop(["party"], axis=1))
+        col1.dataframe(
+            with_concentration(sorted_party, "party", "party").drop(["party"], axis=1),
+            column_config=CONCENTRATION_COLUMN_CONFIG,
+        )
     top_10_df = sorted_party.head(10)
     top_5_df = sorted_party.head(6)
     others = pd.DataFrame(
@@ -69,6 +97,8 @@ def display_overall_party_data(sorted_party, party_ov):
     )
     combined_df = pd.concat([top_5_df, others])
     # Plotting
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots()
     wedges, texts, autotexts = ax.pie(
         combined_df["Amount"],
@@ -102,6 +132,8 @@ def display_overall_party_data(sorted_party, party_ov):
         col2.markdown("---")
         col2.bar_chart(bottom_10_df.set_index("party")["Amount"])
 
+    display_denomination_lag(party_ov)
+
 
 def select_party(party_i, sorted_party):
     """
@@ -117,10 +149,9 @@ def select_party(party_i, sorted_party):
     return party_i.selectbox("Select a Party", sorted_party["party"].sort_values())
 
 
-def display_donated_category(selected_party, merged_df, party_left):
-    transactions_grouped_by_category = aggregate_transactions(
-        merged_df[merged_df["party"] == selected_party], 'Category', 
-        {"Category": "first", "Amount_y": ["sum", "count"]},
+def display_donated_category(selected_party, party_left):
+    transactions_grouped_by_category = load_data_access().counterparts(
+        "party", selected_party, "Category"
     )
     formatted_group = format_and_sort_group(
         transactions_grouped_by_category, format_amount, calculate_percentage
@@ -135,11 +166,13 @@ def display_donated_category(selected_party, merged_df, party_left):
     )
 
 
-def display_donated_companies(selected_party, merged_df, party_left):
+def display_donated_companies(selected_party, party_left):
 
-    transactions_grouped_by_category = aggregate_transactions(
-        merged_df[merged_df["party"] == selected_party], "Company",
-        {"Company": "first", "is_ED_raid": "first", "Date of Raid": "first", "Parent Company": "first","Category":"first", "Amount_y": ["sum", "count"]},
+    transactions_grouped_by_category = load_data_access().counterparts(
+        "party",
+        selected_party,
+        "Company",
+        ["is_ED_raid", "Date of Raid", "Parent Company", "Category"],
     )
     formatted_group = format_and_sort_group(
         transactions_grouped_by_category, format_amount, calculate_percentage
@@ -167,15 +200,9 @@ def display_donated_companies(selected_party, merged_df, party_left):
     )
 
 
-def top_contributors_catgory(merged_df, selected_party, party_left):
+def top_contributors_catgory(selected_party, party_left):
 
-    party_transactions = merged_df[merged_df["party"] == selected_party].reset_index(
-        drop=True
-    )
-    group_by_categories = party_transactions.groupby("Category").agg(
-        {"Category": "first", "Amount_y": ["sum", "count"]}
-    )
-    group_by_categories.columns = ["Category", "Amount", "bond_count"]
+    group_by_categories = load_data_access().counterparts("party", selected_party, "Category")
     group_by_categories["Amount (₹ Cr)"] = group_by_categories["Amount"].apply(
         format_amount
     )
@@ -229,52 +256,27 @@ def top_contributors_catgory(merged_df, selected_party, party_left):
             },
         ],
     }
+    from streamlit_echarts import st_echarts
+
     party_left.header(f"Electoral Contributors' by Category")
     with party_left:
         st_echarts(
             options=options,
             height="600px",
+            key="party_category_chart",
         )
 
 
-def top_contributors(merged_df, selected_party, party_right):
+def top_contributors(selected_party, party_right):
 
-    party_n = party_right.selectbox(
-        "Select Number of companies",
-        [5, 10, 15, 20],
-    )
-    party_transactions = merged_df[merged_df["party"] == selected_party].reset_index(
-        drop=True
+    party_n = party_right.number_input(
+        "Select Number of companies", min_value=1, max_value=100, value=5, step=1
     )
-    group_by_companies = party_transactions.groupby("Company").agg(
-        {"Company": "first", "Amount_y": ["sum", "count"]}
-    )
-    group_by_companies.columns = ["Company", "Amount", "bond_count"]
-    group_by_companies["Amount (₹ Cr)"] = group_by_companies["Amount"].apply(
-        format_amount
-    )
-    group_by_companies["percentage"] = group_by_companies["Amount"].apply(
-        lambda x: calculate_percentage(x, group_by_companies["Amount"].sum())
-    )
-    group_by_companies = group_by_companies.sort_values("Amount", ascending=False)
-
-    top_df = group_by_companies.head(party_n)
-    others = pd.DataFrame(
-        data={
-            "Company": ["Other"],
-            "Amount": [group_by_companies["Amount"][party_n:].sum()],
-        }
-    )
-    others["Amount (₹ Cr)"] = (others["Amount"] / 10**7).map("{:,.2f}".format)
-    combined_df = pd.concat([top_df, others])
-    combined_df["Amount (₹ Cr)"] = (
-        combined_df["Amount (₹ Cr)"].str.replace(",", "").astype(float)
-    )
-    data = (
-        combined_df[["Company", "Amount (₹ Cr)"]]
-        .rename(columns={"Company": "name", "Amount (₹ Cr)": "value"})
-        .to_dict("records")
+    # Companies are ranked once per data version; the top-N plus "Other" split is a slice.
+    top_companies = top_n(
+        load_rankings()["party_companies"], selected_party, party_n, "Company"
     )
+    data = top_n_chart_data(top_companies, "Company")
     options = {
         "tooltip": {"trigger": "item"},
         "legend": {"orient": "horizontal ", "bottom": "bottom"},
@@ -309,49 +311,44 @@ def top_contributors(merged_df, selected_party, party_right):
         ],
     }
 
+    from streamlit_echarts import st_echarts
+
     with party_right:
         st_echarts(
             options=options,
             height="600px",
+            key="party_company_chart",
         )
 
 
-def display_overall_transactions(party_i, sorted_party, selected_party):
+def display_overall_transactions(party_i, selected_party):
     """
     Displays overall transaction overview for the selected party.
 
     Parameters:
     - party_i: Streamlit container for displaying data.
-    - sorted_party: DataFrame containing sorted party data.
     - selected_party: The name of the selected party.
     """
-    overall_transaction_details = sorted_party[
-        sorted_party["party"] == selected_party
-    ].reset_index(drop=True)
+    overall_transaction_details = load_data_access().entity_summary("party", selected_party)
     
     party_i.subheader("Comprehensive Transaction Overview")
     party_i.markdown("---")
     party_i.dataframe(overall_transaction_details)
 
 
-def display_annual_party_contributions(party_i, party_year_group, selected_party):
+def display_annual_party_contributions(party_i, selected_party):
     """
     Displays annual contributions of the selected party.
 
     Parameters:
     - party_i: Streamlit container for displaying data.
-    - party_year_group: DataFrame containing annual party group data.
     - selected_party: The name of the selected party.
     """
 
-    selected_party_year_spendings = party_year_group[
-        party_year_group["party"] == selected_party
-    ].reset_index(drop=True)
-    selected_party_year_spendings["Year"] = selected_party_year_spendings[
-        "Year"
-    ].astype(str)
-    selected_party_year_spendings["Amount (₹ Cr)"] = (
-        selected_party_year_spendings["Amount"] / 10**7
+    selected_party_year_spendings = load_data_access().entity_years("party", selected_party)
+    selected_party_year_spendings = selected_party_year_spendings.assign(
+        Year=selected_party_year_spendings["Year"].astype(str),
+        **{"Amount (₹ Cr)": selected_party_year_spendings["Amount"] / 10**7},
     )
 
     col1, col2 = party_i.columns([3, 3])
@@ -364,25 +361,27 @@ def display_annual_party_contributions(party_i, party_year_group, selected_party
         col2.line_chart(selected_party_year_spendings.set_index("Year")["Amount"])
 
 
-def display_individual_party_data(
-    party_year_group, sorted_party, parties, merged_df, party_i
-):
+def display_individual_party_data(sorted_party, merged_df, party_i, data_version):
     """
     Modular function to display data for an individual party, including transaction details,
     aggregate transactions, and annual contributions.
 
     Parameters:
-    - party_year_group: DataFrame containing annual party group data.
     - sorted_party: DataFrame containing sorted party data.
-    - parties: DataFrame containing party transaction data.
+    - merged_df: DataFrame of bonds joined with their redemptions.
     - party_i: Streamlit container or page to display the data on.
+    - data_version: Fingerprint of the data used to cache the table pages.
     """
     selected_party = select_party(party_i, sorted_party)
-    display_overall_transactions(party_i, sorted_party, selected_party)
+    display_overall_transactions(party_i, selected_party)
+    display_related_news(party_i, "party", selected_party)
     party_right, party_left = party_i.columns([3, 3])
-    display_donated_companies(selected_party, merged_df, party_right)
-    display_donated_category(selected_party, merged_df, party_left)
-    top_contributors(merged_df, selected_party, party_right)
-    top_contributors_catgory(merged_df, selected_party, party_left)
-    display_annual_party_contributions(party_i, party_year_group, selected_party)
-    display_party_transactions(party_i, merged_df, selected_party)
+    display_donated_companies(selected_party, party_right)
+    display_donated_category(selected_party, party_left)
+    top_contributors(selected_party, party_right)
+    top_contributors_catgory(selected_party, party_left)
+    display_annual_party_contributions(party_i, selected_party)
+    display_lag_profile(party_i, "party", selected_party)
+    display_denomination_histogram(party_i, "party", selected_party)
+    display_similar_parties(party_i, selected_party)
+    display_party_transactions(party_i, merged_df, selected_party, data_version)
@@ -0,0 +1,251 @@
+from collections import namedtuple
+import re
+import numpy as np
+import pandas as pd
+from data_model import load_data_model, load_derived
+from table_handler import display_paged_table
+
+
+URN = "Reference No  (URN)"
+
+# Bonds are stored as runs of consecutive bond numbers sharing a prefix and an owner (a
+# purchase order, or a party's redemption on one date). `purchase_runs` and
+# `redemption_runs` are sorted by (prefix, first number), so both double as interval
+# indexes; `prefixes` maps a prefix to the code used in their sort keys.
+PurchaseOrders = namedtuple(
+    "PurchaseOrders",
+    [
+        "orders",
+        "order_lines",
+        "line_positions",
+        "purchase_runs",
+        "redemption_runs",
+        "prefixes",
+    ],
+)
+
+
+def compress_runs(df, owner_columns):
+    """
+    Compresses bonds into runs of consecutive bond numbers with the same prefix and owner.
+
+    Parameters:
+    - df: DataFrame of bonds with Prefix and Bond Number columns.
+    - owner_columns: Columns that must be equal across a run.
+
+    Returns:
+    - DataFrame with Prefix, start, end, Bond_count and the owner columns, one row per
+      run, sorted by prefix and first bond number.
+    """
+    df = df.sort_values(["Prefix", "Bond Number"], ignore_index=True)
+    prefix = df["Prefix"].to_numpy()
+    number = df["Bond Number"].to_numpy()
+    breaks = np.ones(len(df), dtype=bool)
+    breaks[1:] = (prefix[1:] != prefix[:-1]) | (number[1:] != number[:-1] + 1)
+    for column in owner_columns:
+        owner = df[column].to_numpy()
+        breaks[1:] |= owner[1:] != owner[:-1]
+    starts = np.flatnonzero(breaks)
+    ends = np.append(starts[1:], len(df)) - 1
+    runs = pd.DataFrame(
+        {
+            "Prefix": prefix[starts],
+            "start": number[starts],
+            "end": number[ends],
+            "Bond_count": ends - starts + 1,
+        }
+    )
+    for column in owner_columns:
+        runs[column] = df[column].to_numpy()[starts]
+    return runs
+
+
+def format_ranges(runs, group_columns):
+    """
+    Joins the runs of every group into one "TL 11447-11448, OC 775" string.
+
+    Returns:
+    - Series of range strings indexed by the group columns.
+    """
+    text = runs["Prefix"] + " " + runs["start"].astype(str)
+    text = text.where(runs["start"] == runs["end"], text + "-" + runs["end"].astype(str))
+    return text.groupby([runs[column] for column in group_columns], sort=False).agg(", ".join)
+
+
+def _run_keys(runs, prefixes):
+    # Sort key of a run: the prefix code in the high bits and the first bond number below.
+    codes = prefixes.get_indexer(runs["Prefix"]).astype(np.int64)
+    return codes << 32 | runs["start"].to_numpy()
+
+
+def build_purchase_orders(model):
+    """
+    Groups bonds into purchase orders, order lines and bond number runs.
+
+    Parameters:
+    - model: DataModel returned by `load_data_model`.
+
+    Returns:
+    - PurchaseOrders with:
+      - orders: one row per URN, indexed by URN, with its company, dates, bond count,
+        amount and ranges.
+      - order_lines: one row per (URN, party, redemption date) of the matched ledger, with
+        the purchase and redemption details shown in the transaction tables.
+      - line_positions: positions in `merged_df` of the bonds of every order line.
+      - purchase_runs / redemption_runs: interval indexes used by `lookup_bond`.
+    """
+    companies, merged_df = model.companies, model.merged_df
+    purchase_runs = compress_runs(companies, [URN, "Amount"])
+    redemption_runs = compress_runs(model.parties, ["party", "Date", "Amount"])
+
+    orders = companies.groupby(URN, sort=False).agg(
+        Company=("Company", "first"),
+        Date=("Date", "first"),
+        Date_format=("Date_format", "first"),
+        **{
+            "Date of Expiry": ("Date of Expiry", "first"),
+            "Journal Date": ("Journal Date", "first"),
+        },
+        Bond_count=("Amount", "size"),
+        Amount=("Amount", "sum"),
+    )
+    orders["Bond ranges"] = format_ranges(purchase_runs, [URN])
+    orders = orders.sort_values("Date_format")
+
+    line_columns = [URN, "party", "Date_y"]
+    grouped = merged_df.groupby(line_columns, sort=False)
+    order_lines = grouped.agg(
+        Company=("Company", "first"),
+        Date_x=("Date_x", "first"),
+        Date_format_x=("Date_format_x", "first"),
+        **{"Journal Date": ("Journal Date", "first")},
+        Bond_count=("Amount_y", "size"),
+        Amount=("Amount_y", "sum"),
+    )
+    line_runs = compress_runs(merged_df, line_columns)
+    order_lines["Bond ranges"] = format_ranges(line_runs, line_columns)
+    line_positions = grouped.indices
+    order_lines = order_lines.sort_values("Date_format_x").reset_index()
+
+    prefixes = pd.Index(
+        sorted(set(purchase_runs["Prefix"]) | set(redemption_runs["Prefix"]))
+    )
+    return PurchaseOrders(
+        orders.drop(columns="Date_format"),
+        order_lines.drop(columns="Date_format_x"),
+        line_positions,
+        purchase_runs.assign(key=_run_keys(purchase_runs, prefixes)),
+        redemption_runs.assign(key=_run_keys(redemption_runs, prefixes)),
+        prefixes,
+    )
+
+
+def load_purchase_orders(model=None):
+    """
+    Returns the purchase orders of the current data version.
+    """
+    return load_derived("purchase_orders", build_purchase_orders, model)
+
+
+def _find_run(runs, prefix_code, number):
+    # Runs never overlap, so the candidate is the last run starting at or before the bond.
+    key = prefix_code << 32 | number
+    position = np.searchsorted(runs["key"].to_numpy(), key, side="right") - 1
+    if position < 0:
+        return None
+    run = runs.iloc[position]
+    if run["key"] >> 32 != prefix_code or number > run["end"]:
+        return None
+    return run
+
+
+def parse_bond_key(key):
+    """
+    Splits a bond key such as "TL11448" or "TL 11448" into its prefix and number.
+
+    Returns:
+    - Tuple of the prefix and number, or None if the key is not a bond key.
+    """
+    match = re.fullmatch(r"\s*([A-Za-z]+)\s*(\d+)\s*", key)
+    if match is None:
+        return None
+    return match.group(1).upper(), int(match.group(2))
+
+
+def lookup_bond(purchase_orders, prefix, number):
+    """
+    Finds who bought and who redeemed a bond with two binary searches.
+
+    Parameters:
+    - purchase_orders: PurchaseOrders returned by `build_purchase_orders`.
+    - prefix: Bond prefix, such as "TL".
+    - number: Bond number.
+
+    Returns:
+    - Dictionary with "purchase" and/or "redemption" records, empty if the bond is unknown.
+    """
+    if prefix not in purchase_orders.prefixes:
+        return {}
+    prefix_code = purchase_orders.prefixes.get_loc(prefix)
+    bond = {}
+    run = _find_run(purchase_orders.purchase_runs, prefix_code, number)
+    if run is not None:
+        order = purchase_orders.orders.loc[run[URN]]
+        bond["purchase"] = {
+            "Company": order["Company"],
+            "Date": order["Date"],
+            "Date of Expiry": order["Date of Expiry"],
+            URN: run[URN],
+            "Amount": int(run["Amount"]),
+        }
+    run = _find_run(purchase_orders.redemption_runs, prefix_code, number)
+    if run is not None:
+        bond["redemption"] = {
+            "party": run["party"],
+            "Date": run["Date"],
+            "Amount": int(run["Amount"]),
+        }
+    return bond
+
+
+def display_order_lines(container, order_lines, key, columns, data_version, view, column_config):
+    """
+    Displays order lines one page at a time and the individual bonds of a selected line on the
+    visible page.
+
+    Parameters:
+    - container: Streamlit container for displaying data.
+    - order_lines: Rows of `PurchaseOrders.order_lines` to display.
+    - key: Unique prefix for the widget keys of this table.
+    - columns: List of columns to display.
+    - data_version: Fingerprint of the data the lines were built from.
+    - view: Identifier of the rows in `order_lines`.
+    - column_config: Optional Streamlit column configuration.
+    """
+    visible = display_paged_table(
+        container,
+        order_lines,
+        key,
+        columns,
+        data_version,
+        view=view,
+        column_config=column_config,
+    )
+    page = order_lines.iloc[visible]
+    lines = {
+        " · ".join(line): line for line in zip(page[URN], page["party"], page["Date_y"])
+    }
+    selected = container.selectbox(
+        "Show the bonds of an order", ["-"] + list(lines), key=f"{key}_expand"
+    )
+    if selected not in lines:
+        return
+    positions = load_purchase_orders().line_positions[lines[selected]]
+    bonds = load_data_model().merged_df.iloc[positions]
+    container.dataframe(
+        bonds[["Prefix", "Bond Number", "Amount_y", "Date of Expiry", "Date_y", "Pay Teller"]]
+        .sort_values(["Prefix", "Bond Number"])
+        .reset_index(drop=True),
+        column_config={"Amount_y": "Amount", "Date_y": "Date Redeemed"},
+        use_container_width=True,
+    )
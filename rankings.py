@@ -0,0 +1,141 @@
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from data_model import load_derived
+
+
+# Counterparts of every entity in descending order of amount, stored as flat arrays:
+# the counterparts of entity `i` are the rows offsets[i]:offsets[i + 1].
+Ranking = namedtuple(
+    "Ranking",
+    [
+        "entity_index",
+        "offsets",
+        "names",
+        "amounts",
+        "counts",
+        "cumulative_amounts",
+        "cumulative_counts",
+    ],
+)
+
+
+def build_ranking(df, entity_column, counterpart_column, amount_column):
+    """
+    Ranks the counterparts of every entity by amount and stores prefix sums, so any
+    top-N plus "Other" split is a slice without sorting.
+
+    Parameters:
+    - df: DataFrame of transactions.
+    - entity_column: Column identifying the entity, or None for a single global ranking.
+    - counterpart_column: Column identifying the ranked counterparts.
+    - amount_column: Column with the amounts.
+
+    Returns:
+    - Ranking of the counterparts of every entity.
+    """
+    keys = [counterpart_column] if entity_column is None else [entity_column, counterpart_column]
+    grouped = (
+        df.groupby(keys)[amount_column].agg(Amount="sum", Bond_count="count").reset_index()
+    )
+    if entity_column is None:
+        grouped.insert(0, "entity", "")
+        entity_column = "entity"
+    grouped = grouped.sort_values(
+        [entity_column, "Amount"], ascending=[True, False], ignore_index=True
+    )
+
+    entities, starts = np.unique(grouped[entity_column].to_numpy(), return_index=True)
+    offsets = np.append(starts, len(grouped))
+    amounts = grouped["Amount"].to_numpy()
+    counts = grouped["Bond_count"].to_numpy()
+    return Ranking(
+        pd.Index(entities),
+        offsets,
+        grouped[counterpart_column].to_numpy(),
+        amounts,
+        counts,
+        np.cumsum(amounts),
+        np.cumsum(counts),
+    )
+
+
+def _range_sum(cumulative, start, end):
+    """
+    Sum of the values at positions `start` (inclusive) to `end` (exclusive) from prefix sums.
+    """
+    if end <= start:
+        return 0
+    return cumulative[end - 1] - (cumulative[start - 1] if start else 0)
+
+
+def top_n(ranking, entity, n, name_column, other_label="Other"):
+    """
+    Returns the top `n` counterparts of an entity plus one row with the rest.
+
+    Parameters:
+    - ranking: Ranking returned by `build_ranking`.
+    - entity: Entity to look up ("" for a global ranking).
+    - n: Number of counterparts to keep.
+    - name_column: Name of the counterpart column in the result.
+    - other_label: Name of the row holding all remaining counterparts.
+
+    Returns:
+    - DataFrame with the counterpart name, Amount and Bond_count, in descending order.
+    """
+    if entity not in ranking.entity_index:
+        return pd.DataFrame(columns=[name_column, "Amount", "Bond_count"])
+    position = ranking.entity_index.get_loc(entity)
+    start, end = ranking.offsets[position], ranking.offsets[position + 1]
+    cut = min(start + n, end)
+    top = pd.DataFrame(
+        {
+            name_column: ranking.names[start:cut],
+            "Amount": ranking.amounts[start:cut],
+            "Bond_count": ranking.counts[start:cut],
+        }
+    )
+    if cut < end:
+        other = pd.DataFrame(
+            {
+                name_column: [other_label],
+                "Amount": [_range_sum(ranking.cumulative_amounts, cut, end)],
+                "Bond_count": [_range_sum(ranking.cumulative_counts, cut, end)],
+            }
+        )
+        top = pd.concat([top, other], ignore_index=True)
+    return top
+
+
+def build_rankings(model):
+    """
+    Builds the rankings used by the "Select Number of ..." widgets.
+
+    Parameters:
+    - model: DataModel returned by `load_data_model`.
+
+    Returns:
+    - Dictionary of ranking name to Ranking.
+    """
+    return {
+        "company_parties": build_ranking(model.merged_df, "Company", "party", "Amount_y"),
+        "party_companies": build_ranking(model.merged_df, "party", "Company", "Amount_y"),
+        "companies": build_ranking(model.companies, None, "Company", "Amount"),
+    }
+
+
+def load_rankings():
+    """
+    Returns the rankings of the current data version.
+    """
+    return load_derived("rankings", build_rankings)
+
+
+def top_n_chart_data(top, name_column):
+    """
+    Converts a top-N frame to the name/value records used by the ECharts pie charts.
+    """
+    return [
+        {"name": name, "value": round(amount / 10**7, 2)}
+        for name, amount in zip(top[name_column], top["Amount"])
+    ]
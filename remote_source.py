@@ -0,0 +1,244 @@
+import csv
+import io
+import json
+import logging
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+SOURCE_CACHE_DIR = os.path.join(".cache", "sources")
+DEFAULT_TTL_SECONDS = 300
+# After a failed fetch, retries wait RETRY_BASE_SECONDS, doubling per consecutive failure.
+RETRY_BASE_SECONDS = 30
+MAX_RETRY_SECONDS = 3600
+# A sign-in or error page from Google Sheets also comes with status 200, so a response
+# only replaces the last-good copy if it is CSV with the expected header.
+CSV_CONTENT_TYPES = ("text/csv", "application/csv", "text/plain")
+
+logger = logging.getLogger(__name__)
+
+_sources = {}
+_sources_lock = threading.Lock()
+
+
+class RemoteSource:
+    """
+    A URL-backed input file that is mirrored to a local last-good copy. Readers always get
+    the local copy immediately; when it is older than the TTL a background thread refreshes
+    it with a conditional request (ETag / Last-Modified). Failed fetches keep the last-good
+    copy, so a page render never waits on, or fails because of, the network, and back off
+    exponentially so a remote that is down is not hit on every render. A response that is
+    not CSV with the expected columns counts as a failed fetch.
+    """
+
+    def __init__(
+        self,
+        name,
+        url,
+        fallback_path=None,
+        columns=None,
+        ttl=DEFAULT_TTL_SECONDS,
+        timeout=10,
+        cache_dir=SOURCE_CACHE_DIR,
+    ):
+        """
+        Parameters:
+        - name: File name of the local copy.
+        - url: URL to fetch.
+        - fallback_path: Optional bundled file used until the first fetch succeeds.
+        - columns: Columns the header of a fetched copy must include. Defaults to the
+          header of the fallback file, if any.
+        - ttl: Seconds after which the local copy is refreshed in the background.
+        - timeout: Network timeout of a fetch, in seconds.
+        - cache_dir: Directory holding the local copies.
+        """
+        self.name = name
+        self.url = url
+        self.fallback_path = fallback_path
+        if columns is None and fallback_path and os.path.exists(fallback_path):
+            with open(fallback_path, "rb") as file:
+                columns = csv_header(file.readline())
+        self.columns = list(columns or [])
+        self.ttl = ttl
+        self.timeout = timeout
+        self.local_path = os.path.join(cache_dir, name)
+        self.meta_path = f"{self.local_path}.meta.json"
+        self.lock = threading.Lock()
+        self.refreshing = False
+        self.last_error = None
+        self.failures = 0
+        self.retry_at = 0
+        self.stats = {"fetches": 0, "not_modified": 0, "updated": 0, "failures": 0}
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self, meta):
+        partial_path = f"{self.meta_path}.partial"
+        with open(partial_path, "w") as file:
+            json.dump(meta, file)
+        os.replace(partial_path, self.meta_path)
+
+    def path(self):
+        """
+        Returns the path of the freshest local copy without waiting on the network, and
+        starts a background refresh if the copy is missing or older than the TTL.
+
+        Returns:
+        - Path of the local copy, the fallback path, or None if neither exists yet.
+        """
+        has_copy = os.path.exists(self.local_path)
+        fetched_at = self._read_meta().get("fetched_at", 0) if has_copy else 0
+        now = time.time()
+        if now - fetched_at > self.ttl and now >= self.retry_at:
+            self.refresh_in_background()
+        if has_copy:
+            return self.local_path
+        if self.fallback_path and os.path.exists(self.fallback_path):
+            return self.fallback_path
+        return None
+
+    def refresh_in_background(self):
+        """
+        Starts a refresh on a daemon thread unless one is already running.
+        """
+        with self.lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+        threading.Thread(
+            target=self._refresh_and_release, name=f"refresh-{self.name}", daemon=True
+        ).start()
+
+    def _refresh_and_release(self):
+        try:
+            self.refresh()
+        finally:
+            with self.lock:
+                self.refreshing = False
+
+    def refresh(self):
+        """
+        Fetches the URL with a conditional request and replaces the local copy if it changed.
+
+        Returns:
+        - True if the local copy was updated, False if it was unchanged or the fetch failed.
+        """
+        meta = self._read_meta() if os.path.exists(self.local_path) else {}
+        request = urllib.request.Request(self.url)
+        if meta.get("etag"):
+            request.add_header("If-None-Match", meta["etag"])
+        if meta.get("last_modified"):
+            request.add_header("If-Modified-Since", meta["last_modified"])
+
+        self.stats["fetches"] += 1
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = response.read()
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+                content_type = response.headers.get_content_type()
+            self._check_response(content_type, body)
+        except urllib.error.HTTPError as error:
+            if error.code == 304:
+                self.stats["not_modified"] += 1
+                self._succeeded()
+                self._write_meta({**meta, "fetched_at": time.time()})
+                return False
+            return self._failed(error)
+        except (OSError, ValueError) as error:
+            return self._failed(error)
+
+        os.makedirs(os.path.dirname(self.local_path) or ".", exist_ok=True)
+        partial_path = f"{self.local_path}.partial"
+        with open(partial_path, "wb") as file:
+            file.write(body)
+        os.replace(partial_path, self.local_path)
+        self._write_meta(
+            {"etag": etag, "last_modified": last_modified, "fetched_at": time.time()}
+        )
+        self.stats["updated"] += 1
+        self._succeeded()
+        return True
+
+    def _check_response(self, content_type, body):
+        """
+        Raises ValueError unless a response is CSV whose header has the expected columns.
+        """
+        if content_type not in CSV_CONTENT_TYPES:
+            raise ValueError(f"Expected CSV, got {content_type}")
+        missing = [column for column in self.columns if column not in csv_header(body)]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    def _succeeded(self):
+        self.last_error = None
+        self.failures = 0
+        self.retry_at = 0
+
+    def _failed(self, error):
+        self.stats["failures"] += 1
+        self.last_error = str(error)
+        self.failures += 1
+        delay = min(RETRY_BASE_SECONDS * 2 ** (self.failures - 1), MAX_RETRY_SECONDS)
+        self.retry_at = time.time() + delay
+        logger.warning(
+            "Refreshing %s from %s failed: %s; retrying in %d s", self.name, self.url, error, delay
+        )
+        return False
+
+    def status(self):
+        """
+        Returns the fetch counters, the age of the local copy, the last error and the
+        seconds until the next retry after failures.
+        """
+        meta = self._read_meta()
+        return {
+            "name": self.name,
+            "url": self.url,
+            "age_seconds": time.time() - meta["fetched_at"] if "fetched_at" in meta else None,
+            "refreshing": self.refreshing,
+            "last_error": self.last_error,
+            "retry_in_seconds": max(0, self.retry_at - time.time()),
+            **self.stats,
+        }
+
+
+def csv_header(data):
+    """
+    Parses the header row of CSV data.
+
+    Parameters:
+    - data: Bytes starting with the header row.
+
+    Returns:
+    - List of column names; empty if the data has no header.
+    """
+    first_line = data.split(b"\n", 1)[0].decode("utf-8-sig", errors="replace")
+    return next(csv.reader(io.StringIO(first_line)), [])
+
+
+def get_source(name, url, **options):
+    """
+    Returns the process-wide RemoteSource for a name, creating it on first use.
+
+    Parameters:
+    - name: File name of the local copy.
+    - url: URL to fetch.
+    - options: Keyword arguments passed to RemoteSource.
+
+    Returns:
+    - RemoteSource shared by every caller in the process.
+    """
+    with _sources_lock:
+        source = _sources.get(name)
+        if source is None or source.url != url:
+            source = _sources[name] = RemoteSource(name, url, **options)
+        return source
@@ -0,0 +1,120 @@
+"""
+Checks the remote source layer against `local_sheet_server.py`: conditional refreshes,
+rejection of responses that are not the expected CSV, exponential backoff after failures
+and serving the last-good copy (or the bundled fallback) throughout.
+
+    python remote_source_check.py
+"""
+import os
+import sys
+import tempfile
+import time
+from local_sheet_server import serve_in_thread
+from remote_source import RETRY_BASE_SECONDS, RemoteSource
+
+
+def read(path):
+    with open(path) as file:
+        return file.read()
+
+
+def write(path, text):
+    with open(path, "w") as file:
+        file.write(text)
+    # Give every version a distinct Last-Modified, which has a one second resolution.
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, time.time() + len(text)))
+
+
+if __name__ == "__main__":
+    failures = []
+
+    def check(condition, message):
+        print(f"{'ok' if condition else 'FAIL'}: {message}")
+        if not condition:
+            failures.append(message)
+
+    with tempfile.TemporaryDirectory() as directory:
+        served = os.path.join(directory, "served")
+        cache_dir = os.path.join(directory, "cache")
+        os.makedirs(served)
+        fallback = os.path.join(directory, "bundled.csv")
+        write(fallback, "party,Amount\nBUNDLED,1\n")
+        write(os.path.join(served, "donors.csv"), "party,Amount\nFIRST,1\n")
+        write(os.path.join(served, "login.html"), "<html><body>Sign in</body></html>\n")
+        write(os.path.join(served, "other.csv"), "title,url\nNews,https://example.com\n")
+
+        healthy, healthy_url = serve_in_thread(served)
+        failing, failing_url = serve_in_thread(served, failure_rate=1.0)
+
+        def donors(base_url, file_name="donors.csv", **options):
+            # Every source mirrors to the same local copy, as successive fetches of one sheet.
+            return RemoteSource(
+                "donors.csv", f"{base_url}/{file_name}", fallback, cache_dir=cache_dir, **options
+            )
+
+        try:
+            # Until a fetch succeeds, readers get the bundled file.
+            down = donors(failing_url)
+            check(down.refresh() is False, "a failed first fetch reports no update")
+            check(down.path() == fallback, "the fallback is served until a fetch succeeds")
+
+            source = donors(healthy_url)
+            check(source.columns == ["party", "Amount"], "columns default to the fallback header")
+            check(source.refresh() is True, "the first fetch writes the local copy")
+            check(source.path() == source.local_path, "readers get the local copy once fetched")
+            check(
+                source.refresh() is False and source.stats["not_modified"] == 1,
+                "an unchanged sheet answers 304",
+            )
+            write(os.path.join(served, "donors.csv"), "party,Amount\nSECOND,2\n")
+            check(source.refresh() is True, "a changed sheet replaces the local copy")
+            last_good = read(source.local_path)
+
+            # Status 200 responses that are not the expected CSV keep the last-good copy.
+            for name, reason in [
+                ("login.html", "an HTML page"),
+                ("other.csv", "a CSV with other columns"),
+            ]:
+                wrong = donors(healthy_url, name)
+                check(wrong.refresh() is False and wrong.last_error, f"{reason} is rejected")
+                check(read(wrong.local_path) == last_good, f"{reason} keeps the last-good copy")
+
+            # Failures back off exponentially and keep serving the last-good copy.
+            broken = donors(failing_url, ttl=0)
+            broken.refresh()
+            first_delay = broken.status()["retry_in_seconds"]
+            broken.refresh()
+            second_delay = broken.status()["retry_in_seconds"]
+            check(
+                abs(first_delay - RETRY_BASE_SECONDS) < 5
+                and abs(second_delay - 2 * RETRY_BASE_SECONDS) < 5,
+                f"retries wait {first_delay:.0f} s, then {second_delay:.0f} s",
+            )
+            fetches = broken.stats["fetches"]
+            for _ in range(10):
+                path = broken.path()
+            time.sleep(0.2)
+            check(broken.stats["fetches"] == fetches, "stale reads in the backoff do not fetch")
+            check(
+                path == broken.local_path and read(path) == last_good,
+                "the last-good copy is served while the remote fails",
+            )
+
+            # Once the backoff has passed, the next stale read refreshes again.
+            broken.url = f"{healthy_url}/donors.csv"
+            broken.retry_at = 0
+            broken.path()
+            deadline = time.time() + 5
+            while broken.failures and time.time() < deadline:
+                time.sleep(0.05)
+            check(
+                broken.failures == 0 and broken.last_error is None,
+                "a successful fetch resets the backoff",
+            )
+        finally:
+            healthy.shutdown()
+            failing.shutdown()
+
+    print("OK" if not failures else "FAILED")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,225 @@
+"""
+"Donates like this one" neighbours of companies and parties.
+
+Every entity is a vector of the amounts it gave to (or received from) its counterparts,
+normalized to unit length, and its neighbours are the entities with the highest cosine
+similarity. All neighbours are computed in one batch of blocked matrix products whose
+block size follows a memory budget. Time the batch on the companies repeated `--scale`
+times with:
+
+    python similarity.py --scale 100 --budget-mib 64
+"""
+import argparse
+import time
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+import streamlit as st
+from data_model import load_derived
+
+
+TOP_K = 10
+MEMORY_BUDGET_BYTES = 64 * 2**20
+
+Neighbours = namedtuple("Neighbours", ["names", "index", "neighbours", "scores"])
+
+
+def entity_vectors(df, entity_column, feature_column, amount_column):
+    """
+    Builds the unit-length amount vectors of every entity over a feature column.
+
+    Parameters:
+    - df: DataFrame of transactions.
+    - entity_column: Column identifying the entities.
+    - feature_column: Column identifying the vector dimensions.
+    - amount_column: Column with the amounts.
+
+    Returns:
+    - Tuple of the entity names and a float32 matrix with one row per entity.
+    """
+    entities, names = pd.factorize(df[entity_column], sort=True)
+    features, feature_names = pd.factorize(df[feature_column], sort=True)
+    cells = entities.astype(np.int64) * len(feature_names) + features
+    matrix = np.bincount(
+        cells, weights=df[amount_column].to_numpy(), minlength=len(names) * len(feature_names)
+    ).reshape(len(names), len(feature_names))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.asarray(names), (matrix / np.where(norms > 0, norms, 1)).astype(np.float32)
+
+
+def top_k_neighbours(matrix, k=TOP_K, memory_budget=MEMORY_BUDGET_BYTES):
+    """
+    Finds the k most similar rows of every row of a unit-length matrix, in blocks of rows
+    sized so that one block of similarities fits the memory budget.
+
+    Parameters:
+    - matrix: float32 matrix with unit-length rows.
+    - k: Number of neighbours per row.
+    - memory_budget: Bytes available for one block of similarities.
+
+    Returns:
+    - Tuple of the neighbour positions (int32) and cosine similarities (float32), both of
+      shape (rows, k) and in descending order of similarity. k is capped at rows - 1, so
+      a matrix with at most one row gives empty neighbour lists.
+    """
+    rows = len(matrix)
+    k = max(0, min(k, rows - 1))
+    if k == 0:
+        # A single entity, or none, has no neighbours.
+        return np.empty((rows, 0), dtype=np.int32), np.empty((rows, 0), dtype=np.float32)
+    block_rows = max(1, memory_budget // (rows * matrix.itemsize))
+    neighbours = np.empty((rows, k), dtype=np.int32)
+    scores = np.empty((rows, k), dtype=np.float32)
+    for start in range(0, rows, block_rows):
+        end = min(start + block_rows, rows)
+        similarity = matrix[start:end] @ matrix.T
+        # An entity is not its own neighbour.
+        similarity[np.arange(end - start), np.arange(start, end)] = -np.inf
+        top = np.argpartition(similarity, -k, axis=1)[:, -k:]
+        top_scores = np.take_along_axis(similarity, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        neighbours[start:end] = np.take_along_axis(top, order, axis=1)
+        scores[start:end] = np.take_along_axis(top_scores, order, axis=1)
+    return neighbours, scores
+
+
+def build_neighbours(df, entity_column, feature_column, amount_column, k=TOP_K):
+    """
+    Computes the neighbour lists of every entity of a transaction table.
+
+    Returns:
+    - Neighbours with the entity names, a name index and the neighbour positions and scores.
+    """
+    names, matrix = entity_vectors(df, entity_column, feature_column, amount_column)
+    neighbours, scores = top_k_neighbours(matrix, k)
+    return Neighbours(names, pd.Index(names), neighbours, scores)
+
+
+def build_similarity(model):
+    """
+    Builds the neighbour lists of companies by the parties they funded and of parties by
+    the companies and by the categories that funded them.
+
+    Parameters:
+    - model: DataModel returned by `load_data_model`.
+
+    Returns:
+    - Dictionary of "company", "party_company" and "party_category" to Neighbours.
+    """
+    merged_df = model.merged_df
+    return {
+        "company": build_neighbours(merged_df, "Company", "party", "Amount_y"),
+        "party_company": build_neighbours(merged_df, "party", "Company", "Amount_y"),
+        "party_category": build_neighbours(merged_df, "party", "Category", "Amount_y"),
+    }
+
+
+def load_similarity():
+    """
+    Returns the neighbour lists of the current data version.
+    """
+    return load_derived("similarity", build_similarity)
+
+
+def similar_entities(kind, name, name_column, k=TOP_K):
+    """
+    Looks up the most similar entities of a company or party.
+
+    Parameters:
+    - kind: "company", "party_company" or "party_category".
+    - name: Name of the company or party.
+    - name_column: Name of the entity column in the result.
+    - k: Number of neighbours to return.
+
+    Returns:
+    - DataFrame with the neighbour names and their cosine similarity, or None if the
+      entity has no matched bonds.
+    """
+    neighbours = load_similarity()[kind]
+    if name not in neighbours.index:
+        return None
+    position = neighbours.index.get_loc(name)
+    keep = neighbours.scores[position, :k] > 0
+    return pd.DataFrame(
+        {
+            name_column: neighbours.names[neighbours.neighbours[position, :k][keep]],
+            "similarity": neighbours.scores[position, :k][keep],
+        }
+    )
+
+
+def _display_similar(container, title, similar):
+    if similar is None or similar.empty:
+        return
+    container.subheader(title)
+    container.dataframe(
+        similar,
+        column_config={
+            "similarity": st.column_config.ProgressColumn(
+                "similarity", min_value=0.0, max_value=1.0, format="%.2f"
+            )
+        },
+        use_container_width=True,
+    )
+
+
+def display_similar_companies(container, company):
+    """
+    Displays the companies whose donations are spread over parties most like a company's.
+
+    Parameters:
+    - container: Streamlit container for displaying data.
+    - company: Name of the company.
+    """
+    _display_similar(
+        container,
+        "Companies That Donate Like This One",
+        similar_entities("company", company, "Company"),
+    )
+
+
+def display_similar_parties(container, party):
+    """
+    Displays the parties whose donor bases are most like a party's, by donor company and
+    by donor category.
+
+    Parameters:
+    - container: Streamlit container for displaying data.
+    - party: Name of the party.
+    """
+    by_company, by_category = container.columns([3, 3])
+    _display_similar(
+        by_company,
+        "Parties with Similar Donors",
+        similar_entities("party_company", party, "party"),
+    )
+    _display_similar(
+        by_category,
+        "Parties with Similar Donor Categories",
+        similar_entities("party_category", party, "party"),
+    )
+
+
+def main():
+    from data_model import build_data_model, data_paths
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1, help="repeat the companies N times")
+    parser.add_argument("--budget-mib", type=int, default=MEMORY_BUDGET_BYTES // 2**20)
+    args = parser.parse_args()
+
+    model = build_data_model(*data_paths())
+    _, matrix = entity_vectors(model.merged_df, "Company", "party", "Amount_y")
+    matrix = np.tile(matrix, (args.scale, 1))
+    started = time.perf_counter()
+    top_k_neighbours(matrix, TOP_K, args.budget_mib * 2**20)
+    seconds = time.perf_counter() - started
+    block_rows = max(1, args.budget_mib * 2**20 // (len(matrix) * matrix.itemsize))
+    print(
+        f"{len(matrix)} companies x {matrix.shape[1]} parties: {seconds:.2f} s, "
+        f"{block_rows} rows per block within {args.budget_mib} MiB"
+    )
+
+
+if __name__ == "__main__":
+    main()
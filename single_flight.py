@@ -0,0 +1,112 @@
+import threading
+import time
+
+
+class _Flight:
+    """
+    A running build that concurrent callers for the same key can wait on.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlightCache:
+    """
+    Caches the latest value of a build stage and coordinates refills, so that exactly one
+    caller rebuilds a stage for a new key. While the build runs, other callers get the
+    previous value (stale-while-revalidate) or, if there is none, wait for the build.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.key = None
+        self.value = None
+        self.has_value = False
+        self.installed_sequence = 0
+        self.next_sequence = 0
+        # Key -> build currently running for that key.
+        self.in_flight = {}
+        self.stats = {
+            "fills": 0,
+            "failures": 0,
+            "hits": 0,
+            "waiters": 0,
+            "stale_serves": 0,
+            "last_fill_seconds": 0.0,
+            "total_fill_seconds": 0.0,
+        }
+
+    def get(self, key, build, serve_stale=True):
+        """
+        Returns the value for `key`, building it at most once across concurrent callers.
+
+        Parameters:
+        - key: Version of the inputs of the stage, e.g. a data file fingerprint.
+        - build: Function without arguments that builds the value.
+        - serve_stale: Whether callers may get the previous value while a build runs.
+
+        Returns:
+        - The cached, freshly built or (while a build runs) previous value.
+        """
+        with self.lock:
+            if self.has_value and self.key == key:
+                self.stats["hits"] += 1
+                return self.value
+            flight = self.in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.in_flight[key] = _Flight()
+                self.next_sequence += 1
+                sequence = self.next_sequence
+            elif serve_stale and self.has_value:
+                self.stats["stale_serves"] += 1
+                return self.value
+            else:
+                self.stats["waiters"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        start = time.perf_counter()
+        try:
+            flight.value = build()
+        except BaseException as error:
+            flight.error = error
+            with self.lock:
+                self.stats["failures"] += 1
+                del self.in_flight[key]
+            flight.done.set()
+            raise
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            # A build for a newer key may have finished first; never replace it.
+            if sequence > self.installed_sequence:
+                self.key = key
+                self.value = flight.value
+                self.has_value = True
+                self.installed_sequence = sequence
+            self.stats["fills"] += 1
+            self.stats["last_fill_seconds"] = elapsed
+            self.stats["total_fill_seconds"] += elapsed
+            del self.in_flight[key]
+        flight.done.set()
+        return flight.value
+
+    def metrics(self):
+        """
+        Returns a snapshot of the fill, wait and stale-serve counters of this stage.
+        """
+        with self.lock:
+            return {
+                "stage": self.name,
+                "key": self.key,
+                "in_flight": len(self.in_flight),
+                **self.stats,
+            }
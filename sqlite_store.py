@@ -0,0 +1,257 @@
+"""
+Optional SQLite storage of the prepared data.
+
+The prepared donor, party and merged frames and their summary tables are ingested into a
+local SQLite database once per data version, indexed on company, party, date and bond
+key, and the per-entity views of the handlers run as indexed queries on it through
+`data_access`. Enable it in `.streamlit/secrets.toml` with:
+
+    [storage]
+    backend = "sqlite"
+    path = ".cache/electoral_bonds.sqlite"
+
+Build the database of the current files with:
+
+    python sqlite_store.py
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import closing
+import pandas as pd
+import streamlit as st
+from data_model import load_derived
+
+
+DATABASE_PATH = os.path.join(".cache", "electoral_bonds.sqlite")
+
+# Model frames stored as tables, in DataModel order.
+MODEL_TABLES = [
+    "companies",
+    "parties",
+    "merged_df",
+    "sorted_company",
+    "year_company_group",
+    "parent_company_group",
+    "category_group",
+    "sorted_party",
+    "party_year_group",
+]
+
+INDEXES = {
+    "companies": [["Company"], ["Date_format"], ["Prefix", "Bond Number"]],
+    "parties": [["party"], ["Date_format"], ["Prefix", "Bond Number"]],
+    # The group-bys of the per-entity views filter on one entity and group on another.
+    "merged_df": [
+        ["Company", "party"],
+        ["party", "Company"],
+        ["party", "Category"],
+        ["Date_format_x"],
+        ["Date_format_y"],
+        ["Prefix", "Bond Number"],
+    ],
+    "sorted_company": [["Company"]],
+    "year_company_group": [["Company"]],
+    "parent_company_group": [["Parent Company"]],
+    "category_group": [["Category"]],
+    "sorted_party": [["party"]],
+    "party_year_group": [["party"]],
+}
+
+
+def storage_settings():
+    """
+    Reads the storage backend from the `storage` section of the Streamlit secrets.
+
+    Returns:
+    - Tuple of the backend name ("pandas" or "sqlite") and the database path.
+    """
+    settings = {}
+    if st.secrets.load_if_toml_exists():
+        settings = st.secrets.get("storage", {})
+    return settings.get("backend", "pandas"), settings.get("path", DATABASE_PATH)
+
+
+def quote(name):
+    """
+    Quotes a column or table name for SQL.
+    """
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _column_spec(values):
+    spec = {"dtype": str(values.dtype)}
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        spec["categories"] = values.cat.categories.tolist()
+        spec["ordered"] = bool(values.cat.ordered)
+    elif values.dtype == object:
+        # Missing values are NaN when read from CSV but None after some aggregations.
+        spec["missing"] = "none" if any(value is None for value in values) else "nan"
+    return spec
+
+
+def _restore(values, spec):
+    dtype = spec["dtype"]
+    if dtype == "category":
+        return pd.Series(
+            pd.Categorical(values, categories=spec["categories"], ordered=spec["ordered"]),
+            name=values.name,
+        )
+    if dtype.startswith("datetime64"):
+        return pd.to_datetime(values).astype(dtype)
+    if dtype == "object":
+        restored = values.to_numpy(dtype=object, copy=True)
+        restored[pd.isna(restored)] = None if spec.get("missing") == "none" else float("nan")
+        return pd.Series(restored, name=values.name)
+    return values.astype(dtype)
+
+
+def write_frame(connection, table, frame):
+    """
+    Writes a frame, including its index, to a table.
+
+    Returns:
+    - The schema needed by `read_frame` to restore the frame with its dtypes and index.
+    """
+    index_columns = [f"__index_{level}" for level in range(frame.index.nlevels)]
+    stored = frame.reset_index(drop=False, names=index_columns)
+    stored.to_sql(table, connection, index=False, chunksize=5_000)
+    for columns in INDEXES.get(table, []):
+        name = f"{table}_{'_'.join(columns)}".replace(" ", "_")
+        connection.execute(
+            f"CREATE INDEX {quote(name)} ON {quote(table)} ({', '.join(map(quote, columns))})"
+        )
+    return {
+        "index_columns": index_columns,
+        "index_names": list(frame.index.names),
+        "columns": {column: _column_spec(stored[column]) for column in stored.columns},
+    }
+
+
+def read_frame(connection, table, schema, where="", params=()):
+    """
+    Reads rows of a table written by `write_frame`, in their original order.
+
+    Parameters:
+    - connection: Open SQLite connection.
+    - table: Name of the table.
+    - schema: Schema returned by `write_frame`.
+    - where: Optional SQL condition on the rows to read.
+    - params: Parameters of the condition.
+
+    Returns:
+    - DataFrame with the dtypes and index of the stored frame.
+    """
+    sql = f"SELECT * FROM {quote(table)}"
+    if where:
+        sql += f" WHERE {where}"
+    frame = pd.read_sql_query(f"{sql} ORDER BY rowid", connection, params=params)
+    frame = pd.DataFrame(
+        {column: _restore(frame[column], spec) for column, spec in schema["columns"].items()}
+    )
+    frame = frame.set_index(schema["index_columns"])
+    frame.index.names = schema["index_names"]
+    return frame
+
+
+def write_database(model, path=DATABASE_PATH):
+    """
+    Writes the frames of a data model to a database. The database is written to a
+    temporary file that replaces the previous one, so readers never see a partial database.
+
+    Parameters:
+    - model: DataModel to store.
+    - path: Path of the database.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    handle, partial = tempfile.mkstemp(prefix=".electoral_bonds.", dir=directory)
+    os.close(handle)
+    try:
+        with closing(sqlite3.connect(partial)) as connection:
+            schemas = {
+                table: write_frame(connection, table, getattr(model, table))
+                for table in MODEL_TABLES
+            }
+            connection.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            connection.executemany(
+                "INSERT INTO meta VALUES (?, ?)",
+                [("version", model.version), ("schemas", json.dumps(schemas))],
+            )
+            connection.commit()
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+def connect(path=DATABASE_PATH):
+    """
+    Opens a read-only connection to a database.
+    """
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+
+def read_meta(connection):
+    """
+    Returns the version and table schemas stored in a database.
+    """
+    meta = dict(connection.execute("SELECT key, value FROM meta"))
+    return meta["version"], json.loads(meta["schemas"])
+
+
+def database_version(path=DATABASE_PATH):
+    """
+    Returns the data version stored in a database, or None if there is no usable database.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with closing(connect(path)) as connection:
+            return read_meta(connection)[0]
+    except (sqlite3.Error, KeyError):
+        return None
+
+
+def load_database(model=None):
+    """
+    Returns the path of the database of the current data version, ingesting the model
+    into it first when it is missing or stale.
+
+    Parameters:
+    - model: Optional DataModel; defaults to the current one.
+
+    Returns:
+    - Path of the database.
+    """
+    def build(model):
+        _, path = storage_settings()
+        if database_version(path) != model.version:
+            write_database(model, path)
+        return path
+
+    return load_derived("sqlite_database", build, model)
+
+
+def main():
+    from data_model import build_data_model, data_paths
+
+    parser = argparse.ArgumentParser(description="Build the SQLite database of the data files.")
+    parser.add_argument("--path", default=DATABASE_PATH)
+    args = parser.parse_args()
+
+    model = build_data_model(*data_paths())
+    started = time.perf_counter()
+    write_database(model, args.path)
+    seconds = time.perf_counter() - started
+    print(
+        f"{args.path}: version {model.version}, {os.path.getsize(args.path) / 2**20:.1f} MiB "
+        f"written in {seconds:.2f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,544 @@
+"""
+Static export of the report as plain HTML pages.
+
+Renders the company and party overviews and a page for every company and every party,
+with their tables and ECharts charts embedded, from the same data access layer and
+derived analytics as the Streamlit handlers. The output directory can be served by any
+static file host. Pages are rendered in parallel by a process pool, and a rebuild only
+renders the pages whose data changed: every page has a digest of the rows it is built
+from, recorded in `manifest.json` next to the pages.
+
+    python static_site.py --output site --workers 8
+"""
+import argparse
+import hashlib
+import html
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from data_access import load_data_access
+from data_model import load_data_model
+from rankings import load_rankings, top_n, top_n_chart_data
+from similarity import similar_entities
+from utils import calculate_percentage, format_amount, format_and_sort_group
+
+
+SITE_DIR = "site"
+MANIFEST = "manifest.json"
+ECHARTS_URL = "https://cdn.jsdelivr.net/npm/echarts@5/dist/echarts.min.js"
+TOP_COUNTERPARTS = 5
+
+Page = namedtuple("Page", ["path", "kind", "name", "digest"])
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title} - Decoding Indian Electoral Bonds</title>
+<script src="{echarts}"></script>
+<style>
+body {{ font-family: sans-serif; margin: 2rem auto; max-width: 1200px; padding: 0 1rem; color: #262730; }}
+nav a {{ margin-right: 1rem; }}
+table {{ border-collapse: collapse; width: 100%; font-size: 0.9rem; margin-bottom: 1.5rem; }}
+th, td {{ border-bottom: 1px solid #e6e9ef; padding: 0.3rem 0.6rem; text-align: left; }}
+th {{ background: #f0f2f6; }}
+.chart {{ height: 500px; margin-bottom: 1.5rem; }}
+</style>
+</head>
+<body>
+<nav><a href="{root}index.html">Index</a><a href="{root}companies.html">Companies</a><a href="{root}parties.html">Parties</a></nav>
+<h1>{title}</h1>
+{body}
+</body>
+</html>
+"""
+
+
+def page_path(kind, name):
+    """
+    Returns the path of the page of a company or party, relative to the site root.
+    """
+    slug = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")[:60] or kind
+    return f"{kind}/{slug}-{hashlib.sha1(name.encode()).hexdigest()[:8]}.html"
+
+
+def group_digests(frame, column):
+    """
+    Digests the rows of every entity of a frame.
+
+    Parameters:
+    - frame: DataFrame of rows.
+    - column: Column identifying the entity of a row.
+
+    Returns:
+    - Dictionary of entity name to the hex digest of its rows, in row order.
+    """
+    rows = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    codes, names = pd.factorize(frame[column])
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(names) + 1))
+    return {
+        name: hashlib.sha1(rows[order[bounds[i] : bounds[i + 1]]].tobytes()).hexdigest()
+        for i, name in enumerate(names)
+    }
+
+
+def _digest(*parts):
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(str(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _similar_json(kind, name, name_column):
+    similar = similar_entities(kind, name, name_column)
+    return "" if similar is None else similar.to_json(orient="values")
+
+
+def site_pages(model):
+    """
+    Lists the pages of the site with the digest of the data each is rendered from.
+
+    An entity page depends on the entity's own purchases or redemptions, its matched bonds,
+    its similar entities and, through the share of total in its summary row, the total of
+    all companies or parties. A correction that only moves bonds between entities
+    re-renders those entities and the overviews; one that changes the total re-renders
+    every page of that kind.
+
+    Parameters:
+    - model: DataModel returned by `load_data_model`.
+
+    Returns:
+    - List of Page tuples.
+    """
+    with open(__file__, "rb") as file:
+        template = hashlib.sha1(file.read()).hexdigest()
+    pages = [
+        Page(f"{kind}.html", kind, "", _digest(template, model.version))
+        for kind in ["index", "companies", "parties"]
+    ]
+
+    company_total = model.sorted_company["Amount"].sum()
+    company_rows = group_digests(model.companies, "Company")
+    company_bonds = group_digests(model.merged_df, "Company")
+    for name in model.sorted_company["Company"]:
+        pages.append(
+            Page(
+                page_path("company", name),
+                "company",
+                name,
+                _digest(
+                    template,
+                    company_total,
+                    company_rows.get(name),
+                    company_bonds.get(name),
+                    _similar_json("company", name, "Company"),
+                ),
+            )
+        )
+
+    party_total = model.sorted_party["Amount"].sum()
+    party_rows = group_digests(model.parties, "party")
+    party_bonds = group_digests(model.merged_df, "party")
+    for name in model.sorted_party["party"]:
+        pages.append(
+            Page(
+                page_path("party", name),
+                "party",
+                name,
+                _digest(
+                    template,
+                    party_total,
+                    party_rows.get(name),
+                    party_bonds.get(name),
+                    _similar_json("party_company", name, "party"),
+                    _similar_json("party_category", name, "party"),
+                ),
+            )
+        )
+    return pages
+
+
+def _cell(value):
+    if isinstance(value, float) and np.isnan(value):
+        return ""
+    if value is None or value is pd.NaT:
+        return ""
+    return html.escape(str(value))
+
+
+def table(frame, links=None, root=""):
+    """
+    Renders a frame as an HTML table.
+
+    Parameters:
+    - frame: DataFrame to render.
+    - links: Optional dictionary of column name to the kind of page its values link to.
+    - root: Relative path from the page to the site root.
+
+    Returns:
+    - HTML string.
+    """
+    links = links or {}
+    head = "".join(f"<th>{html.escape(str(column))}</th>" for column in frame.columns)
+    rows = []
+    for values in frame.itertuples(index=False):
+        cells = []
+        for column, value in zip(frame.columns, values):
+            text = _cell(value)
+            if column in links and text and value != "Other":
+                text = f'<a href="{root}{page_path(links[column], value)}">{text}</a>'
+            cells.append(f"<td>{text}</td>")
+        rows.append(f"<tr>{''.join(cells)}</tr>")
+    return f"<table><thead><tr>{head}</tr></thead><tbody>{''.join(rows)}</tbody></table>"
+
+
+def chart(chart_id, options):
+    """
+    Renders an ECharts chart with its options embedded in the page.
+    """
+    spec = json.dumps(options, ensure_ascii=False).replace("</", "<\\/")
+    return (
+        f'<div class="chart" id="{chart_id}"></div>'
+        f'<script>echarts.init(document.getElementById("{chart_id}")).setOption({spec});</script>'
+    )
+
+
+def pie_options(data):
+    """
+    Returns the options of the pie charts of the handlers for name/value records.
+    """
+    return {
+        "tooltip": {"trigger": "item"},
+        "legend": {"orient": "horizontal", "bottom": "bottom"},
+        "dataset": [{"source": data}],
+        "series": [
+            {"type": "pie", "radius": "50%"},
+            {
+                "type": "pie",
+                "radius": "50%",
+                "label": {"position": "inside", "formatter": "{d}%", "color": "black", "fontSize": 18},
+            },
+        ],
+    }
+
+
+def series_options(kind, labels, values, name="Amount (₹ Cr)"):
+    """
+    Returns the options of a bar or line chart of values by label.
+    """
+    return {
+        "tooltip": {"trigger": "axis"},
+        "xAxis": {"type": "category", "data": [str(label) for label in labels]},
+        "yAxis": {"type": "value", "name": name},
+        "series": [{"type": kind, "name": name, "data": [round(float(v), 2) for v in values]}],
+    }
+
+
+def _crores(frame):
+    return frame["Amount"] / 10**7
+
+
+def _counterparts(kind, name, by, attributes=()):
+    group = load_data_access().counterparts(kind, name, by, attributes)
+    return format_and_sort_group(group, format_amount, calculate_percentage)
+
+
+def _years(kind, name):
+    years = load_data_access().entity_years(kind, name)
+    return years.assign(Year=years["Year"].astype(str), **{"Amount (₹ Cr)": _crores(years).round(2)})
+
+
+def _similar(kind, name, name_column):
+    similar = similar_entities(kind, name, name_column)
+    if similar is None or similar.empty:
+        return None
+    return similar.assign(similarity=similar["similarity"].round(2))
+
+
+def render_companies(model):
+    sorted_company = model.sorted_company
+    totals = pd.DataFrame(
+        {
+            "Total Companies": [len(sorted_company)],
+            "Total Amount (₹ Cr)": [round(sorted_company["Amount"].sum() / 10**7, 2)],
+            "Total Bonds": [sorted_company["Bond_count"].sum()],
+            "Total ED Raid Companies": [(sorted_company["is_ED_raid"] == 1).sum()],
+        }
+    )
+    overview = sorted_company.assign(is_ED_raid=sorted_company["is_ED_raid"].map({1: "Yes", 0: "No"}))
+    top, bottom = sorted_company.head(10), sorted_company.tail(10)
+    return "Companies", "\n".join(
+        [
+            table(totals),
+            "<h2>Comprehensive Overview of Electoral Bond Contributions</h2>",
+            table(
+                overview[
+                    ["Company", "Category", "Bond_count", "Amount", "Amount (₹ Cr)", "percentage", "is_ED_raid", "Date of Raid"]
+                ],
+                {"Company": "company"},
+            ),
+            "<h2>Top Donor Categories by Electoral Bond Contributions</h2>",
+            table(model.category_group[["Category", "Bond_count", "Amount (₹ Cr)", "percentage"]]),
+            "<h2>Major Contributing Entities to Electoral Bonds</h2>",
+            table(model.parent_company_group),
+            "<h2>Leading Donor Companies by Electoral Bond Contributions</h2>",
+            chart("top-companies", series_options("bar", top["Company"], _crores(top))),
+            "<h2>Smallest Donor Companies by Electoral Bond Contributions</h2>",
+            chart("bottom-companies", series_options("bar", bottom["Company"], _crores(bottom))),
+        ]
+    )
+
+
+def render_parties(model):
+    sorted_party = model.sorted_party
+    top = pd.concat(
+        [
+            sorted_party.head(6)[["party", "Amount"]],
+            pd.DataFrame({"party": ["Other"], "Amount": [sorted_party["Amount"][6:].sum()]}),
+        ],
+        ignore_index=True,
+    )
+    highest, lowest = sorted_party.head(10), sorted_party.tail(10)
+    return "Parties", "\n".join(
+        [
+            "<h2>Total Electoral Bond Redemption Data</h2>",
+            table(sorted_party.reset_index(drop=True), {"party": "party"}),
+            "<h2>Distribution of Top Electoral Bond Redemption party</h2>",
+            chart("top-parties", pie_options(top_n_chart_data(top, "party"))),
+            "<h2>Top 10 Highest Electoral Bond Redemptions</h2>",
+            chart("highest-parties", series_options("bar", highest["party"], _crores(highest))),
+            "<h2>Top 10 Lowest Electoral Bond Redemptions</h2>",
+            chart("lowest-parties", series_options("bar", lowest["party"], _crores(lowest))),
+        ]
+    )
+
+
+def render_index(model):
+    companies = model.sorted_company[["Company", "Amount (₹ Cr)"]]
+    parties = model.sorted_party[["party", "Amount (₹ Cr)"]].reset_index(drop=True)
+    return "Decoding Indian Electoral Bonds", "\n".join(
+        [
+            f"<p>Data version {html.escape(model.version)}.</p>",
+            "<h2>Parties</h2>",
+            table(parties, {"party": "party"}),
+            "<h2>Companies</h2>",
+            table(companies, {"Company": "company"}),
+        ]
+    )
+
+
+def render_company(model, name):
+    root = "../"
+    parties = _counterparts("company", name, "party")
+    top = top_n(load_rankings()["company_parties"], name, TOP_COUNTERPARTS, "party")
+    years = _years("company", name)
+    blocks = [
+        "<h2>Aggregate Donor Transaction Overview</h2>",
+        table(load_data_access().entity_summary("company", name)),
+        "<h2>Parties That Have Redeemed Bonds</h2>",
+        table(parties[["party", "Amount", "bond_count", "Amount (₹ Cr)", "percentage"]], {"party": "party"}, root),
+    ]
+    if not top.empty:
+        blocks += [
+            "<h2>Top Parties Receiving Bonds</h2>",
+            chart("top-parties", pie_options(top_n_chart_data(top, "party"))),
+        ]
+    blocks += [
+        "<h2>Annual Electoral Bond Purchase Summary</h2>",
+        table(years[["Year", "Bond_count", "Amount", "Amount (₹ Cr)"]]),
+        chart("years", series_options("line", years["Year"], years["Amount (₹ Cr)"])),
+    ]
+    similar = _similar("company", name, "Company")
+    if similar is not None:
+        blocks += ["<h2>Companies That Donate Like This One</h2>", table(similar, {"Company": "company"}, root)]
+    return name, "\n".join(blocks)
+
+
+def render_party(model, name):
+    root = "../"
+    companies = _counterparts(
+        "party", name, "Company", ["is_ED_raid", "Date of Raid", "Parent Company", "Category"]
+    )
+    companies = companies.assign(is_ED_raid=companies["is_ED_raid"].map({1: "Yes", 0: "No"}))
+    categories = _counterparts("party", name, "Category")
+    top = top_n(load_rankings()["party_companies"], name, TOP_COUNTERPARTS, "Company")
+    years = _years("party", name)
+    blocks = [
+        "<h2>Comprehensive Transaction Overview</h2>",
+        table(load_data_access().entity_summary("party", name)),
+        "<h2>List of Company Contributions to This Party</h2>",
+        table(
+            companies[
+                ["Company", "is_ED_raid", "Date of Raid", "Parent Company", "Category", "Amount", "bond_count", "Amount (₹ Cr)", "percentage"]
+            ],
+            {"Company": "company"},
+            root,
+        ),
+        "<h2>Bonds Details by Category</h2>",
+        table(categories[["Category", "Amount", "bond_count", "Amount (₹ Cr)", "percentage"]]),
+    ]
+    if not top.empty:
+        blocks += [
+            "<h2>Top Contributing Companies</h2>",
+            chart("top-companies", pie_options(top_n_chart_data(top, "Company"))),
+            "<h2>Electoral Contributors' by Category</h2>",
+            chart("categories", pie_options(top_n_chart_data(categories, "Category"))),
+        ]
+    blocks += [
+        "<h2>Annual Electoral Bond Redemption Summary</h2>",
+        table(years[["Year", "Bond_count", "Amount", "Amount (₹ Cr)"]]),
+        chart("years", series_options("line", years["Year"], years["Amount (₹ Cr)"])),
+    ]
+    for kind, title in [
+        ("party_company", "Parties with Similar Donors"),
+        ("party_category", "Parties with Similar Donor Categories"),
+    ]:
+        similar = _similar(kind, name, "party")
+        if similar is not None:
+            blocks += [f"<h2>{title}</h2>", table(similar, {"party": "party"}, root)]
+    return name, "\n".join(blocks)
+
+
+RENDERERS = {
+    "index": render_index,
+    "companies": render_companies,
+    "parties": render_parties,
+    "company": render_company,
+    "party": render_party,
+}
+
+
+def render_page(page, model=None):
+    """
+    Renders a page of the site.
+
+    Parameters:
+    - page: Page returned by `site_pages`.
+    - model: Optional DataModel; defaults to the current one.
+
+    Returns:
+    - HTML string.
+    """
+    model = model or load_data_model()
+    if page.kind in ("company", "party"):
+        title, body = RENDERERS[page.kind](model, page.name)
+    else:
+        title, body = RENDERERS[page.kind](model)
+    return PAGE_TEMPLATE.format(
+        title=html.escape(title),
+        echarts=ECHARTS_URL,
+        root="../" if "/" in page.path else "",
+        body=body,
+    )
+
+
+def _write_atomic(path, text):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    handle, partial = tempfile.mkstemp(prefix=".page.", dir=directory)
+    try:
+        with os.fdopen(handle, "w", encoding="utf-8") as file:
+            file.write(text)
+        os.chmod(partial, 0o644)
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+def _write_page(task):
+    output, page = task
+    _write_atomic(os.path.join(output, page.path), render_page(page))
+    return page.path
+
+
+def read_manifest(output):
+    """
+    Returns the page digests recorded by the previous build of a site, by page path.
+    """
+    try:
+        with open(os.path.join(output, MANIFEST), encoding="utf-8") as file:
+            return json.load(file)["pages"]
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def build_site(output=SITE_DIR, workers=None, force=False):
+    """
+    Renders the pages of the site whose data changed since the previous build.
+
+    Parameters:
+    - output: Directory of the site.
+    - workers: Number of rendering processes; defaults to the number of CPUs. With 1, pages
+      are rendered in the current process.
+    - force: Whether to render every page, even unchanged ones.
+
+    Returns:
+    - Dictionary with the number of rendered, skipped and removed pages and the seconds
+      taken.
+    """
+    started = time.perf_counter()
+    model = load_data_model()
+    pages = site_pages(model)
+    previous = {} if force else read_manifest(output)
+    stale = [
+        page
+        for page in pages
+        if previous.get(page.path) != page.digest or not os.path.exists(os.path.join(output, page.path))
+    ]
+
+    tasks = [(output, page) for page in stale]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            _write_page(task)
+    else:
+        # Fresh interpreters: every worker loads the model and derived analytics once.
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(workers) as pool:
+            chunk = max(1, len(tasks) // (workers * 4))
+            for _ in pool.imap_unordered(_write_page, tasks, chunksize=chunk):
+                pass
+
+    current = {page.path: page.digest for page in pages}
+    removed = [path for path in previous if path not in current]
+    for path in removed:
+        if os.path.exists(os.path.join(output, path)):
+            os.remove(os.path.join(output, path))
+    _write_atomic(
+        os.path.join(output, MANIFEST),
+        json.dumps({"version": model.version, "pages": current}, indent=1),
+    )
+    return {
+        "rendered": len(stale),
+        "skipped": len(pages) - len(stale),
+        "removed": len(removed),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", default=SITE_DIR)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="render unchanged pages too")
+    args = parser.parse_args()
+
+    result = build_site(args.output, args.workers, args.force)
+    print(
+        f"{args.output}: {result['rendered']} pages rendered, {result['skipped']} unchanged, "
+        f"{result['removed']} removed in {result['seconds']:.2f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import math
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+
+
+PAGE_SIZE_OPTIONS = [25, 50, 100, 250]
+
+# Formats of the date columns shown as text, so that they sort by date rather than by
+# their day number or month name.
+DATE_COLUMN_FORMATS = {
+    "Date": "%d/%b/%Y",
+    "Date_x": "%d/%b/%Y",
+    "Date_y": "%d/%b/%Y",
+    "Journal Date": "%d/%b/%Y",
+    "Date of Expiry": "%d/%b/%Y",
+    "Date of Raid": "%B-%Y",
+}
+
+
+@st.cache_resource(max_entries=256, show_spinner=False)
+def _sorted_positions(_df, view, sort_column, ascending, search, data_version):
+    """
+    Filters and sorts a frame once per view and returns the row positions in display order.
+
+    Parameters:
+    - _df: DataFrame backing the view (not hashed, identified by `view` and `data_version`).
+    - view: Identifier of the view, including any filters already applied to `_df`.
+    - sort_column: Column to sort by, or None to keep the frame order.
+    - ascending: Sort direction.
+    - search: Case-insensitive text that at least one text column has to contain.
+    - data_version: Fingerprint of the data files the frame was built from.
+
+    Returns:
+    - Numpy array of integer row positions.
+    """
+    mask = np.ones(len(_df), dtype=bool)
+    if search:
+        mask[:] = False
+        for column in _df.columns:
+            if _df[column].dtype == object:
+                mask |= (
+                    _df[column]
+                    .astype(str)
+                    .str.contains(search, case=False, regex=False)
+                    .to_numpy()
+                )
+    positions = np.flatnonzero(mask)
+    if sort_column:
+        values = _df[sort_column].iloc[positions]
+        if sort_column in DATE_COLUMN_FORMATS:
+            values = pd.to_datetime(
+                values, format=DATE_COLUMN_FORMATS[sort_column], errors="coerce"
+            )
+        elif values.dtype == object:
+            values = values.astype(str)
+        order = np.argsort(values.to_numpy(), kind="stable")
+        if not ascending:
+            order = order[::-1]
+        positions = positions[order]
+    return positions
+
+
+@st.cache_resource(max_entries=512, show_spinner=False)
+def _page_table(
+    _df, _transform, view, columns, sort_column, ascending, search, page, page_size, data_version
+):
+    """
+    Builds the Arrow table for a single page of a view.
+
+    Parameters:
+    - _df: DataFrame backing the view.
+    - _transform: Optional function adding view-local columns to the page frame.
+    - view, sort_column, ascending, search, data_version: See `_sorted_positions`.
+    - columns: Tuple of columns to show.
+    - page: Zero-based page number.
+    - page_size: Number of rows per page.
+
+    Returns:
+    - pyarrow.Table holding only the rows of the requested page.
+    """
+    positions = _sorted_positions(_df, view, sort_column, ascending, search, data_version)
+    page_df = _df.iloc[positions[page * page_size : (page + 1) * page_size]]
+    if _transform is not None:
+        page_df = _transform(page_df)
+    return pa.Table.from_pandas(page_df[list(columns)], preserve_index=False)
+
+
+def display_paged_table(
+    container,
+    df,
+    key,
+    columns,
+    data_version,
+    view=None,
+    column_config=None,
+    transform=None,
+    page_size=50,
+):
+    """
+    Displays a large DataFrame one page at a time. Sorting and searching run on the server and
+    only the visible page is serialized, cached per (view, sort, page, data version).
+
+    Parameters:
+    - container: Streamlit container for displaying data.
+    - df: DataFrame to display.
+    - key: Unique prefix for the widget keys of this table.
+    - columns: List of columns to display.
+    - data_version: Fingerprint of the data the frame was built from.
+    - view: Identifier of the rows in `df` (e.g. including selected filters). Defaults to `key`.
+    - column_config: Optional Streamlit column configuration.
+    - transform: Optional function adding display-only columns to a page frame.
+    - page_size: Default number of rows per page.
+
+    Returns:
+    - Array of the positions in `df` of the rows on the visible page.
+    """
+    view = view or key
+    sortable = [column for column in columns if column in df.columns]
+    search_col, sort_col, order_col, size_col = container.columns([3, 2, 1, 1])
+    search = search_col.text_input("Search", key=f"{key}_search").strip()
+    sort_column = sort_col.selectbox(
+        "Sort by", [None] + sortable, key=f"{key}_sort", format_func=lambda c: c or "-"
+    )
+    ascending = order_col.selectbox("Order", ["Desc", "Asc"], key=f"{key}_order") == "Asc"
+    page_size = size_col.selectbox(
+        "Rows",
+        PAGE_SIZE_OPTIONS,
+        index=PAGE_SIZE_OPTIONS.index(page_size) if page_size in PAGE_SIZE_OPTIONS else 1,
+        key=f"{key}_size",
+    )
+
+    positions = _sorted_positions(df, view, sort_column, ascending, search, data_version)
+    total_rows = len(positions)
+    page_count = max(1, math.ceil(total_rows / page_size))
+    # Keep the current page in range when a new search or filter shrinks the view.
+    if st.session_state.get(f"{key}_page", 1) > page_count:
+        st.session_state[f"{key}_page"] = page_count
+    page = container.number_input(
+        f"Page (of {page_count}, {total_rows} rows)",
+        min_value=1,
+        max_value=page_count,
+        step=1,
+        key=f"{key}_page",
+    )
+    table = _page_table(
+        df,
+        transform,
+        view,
+        tuple(columns),
+        sort_column,
+        ascending,
+        search,
+        int(page) - 1,
+        page_size,
+        data_version,
+    )
+    container.dataframe(table, use_container_width=True, column_config=column_config)
+    return positions[(int(page) - 1) * page_size : int(page) * page_size]
@@ -0,0 +1,96 @@
+import re
+from collections import deque
+
+
+# Shortest alias, in characters, derived from a name; shorter ones match too many words.
+MIN_ALIAS_LENGTH = 4
+
+
+def normalize_tokens(text):
+    """
+    Splits text into upper-case alphanumeric tokens, so matching ignores case and punctuation.
+
+    Parameters:
+    - text: Text to tokenize.
+
+    Returns:
+    - List of tokens.
+    """
+    return re.findall(r"[A-Z0-9]+", text.upper().replace("'", ""))
+
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over word tokens. Finds every known phrase in a text in a single
+    pass, in time linear in the text length regardless of the number of phrases, and only
+    matches whole words. Where matches overlap, the longest one wins.
+    """
+
+    def __init__(self, phrases):
+        """
+        Parameters:
+        - phrases: Iterable of (phrase text, value) pairs; a match reports the value.
+        """
+        self.transitions = [{}]
+        self.fail = [0]
+        self.outputs = [set()]
+        for phrase, value in phrases:
+            tokens = normalize_tokens(phrase)
+            if not tokens:
+                continue
+            node = 0
+            for token in tokens:
+                next_node = self.transitions[node].get(token)
+                if next_node is None:
+                    next_node = len(self.transitions)
+                    self.transitions[node][token] = next_node
+                    self.transitions.append({})
+                    self.fail.append(0)
+                    self.outputs.append(set())
+                node = next_node
+            self.outputs[node].add((len(tokens), value))
+        self._build_failure_links()
+
+    def _build_failure_links(self):
+        queue = deque(self.transitions[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self.transitions[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and token not in self.transitions[fallback]:
+                    fallback = self.fail[fallback]
+                candidate = self.transitions[fallback].get(token, 0)
+                self.fail[child] = candidate if candidate != child else 0
+                self.outputs[child] |= self.outputs[self.fail[child]]
+
+    def find(self, text):
+        """
+        Returns the values of the phrases occurring in the text. A phrase inside a longer
+        matched phrase does not count, so "YSR Congress Party" does not also match a
+        "Congress Party" phrase; phrases matching the same words all count.
+
+        Parameters:
+        - text: Text to search.
+
+        Returns:
+        - Set of matched values.
+        """
+        spans = []
+        node = 0
+        for end, token in enumerate(normalize_tokens(text), start=1):
+            while node and token not in self.transitions[node]:
+                node = self.fail[node]
+            node = self.transitions[node].get(token, 0)
+            spans.extend((end - length, end, value) for length, value in self.outputs[node])
+
+        matches = set()
+        accepted = set()
+        taken = set()
+        for start, end, value in sorted(spans, key=lambda span: (span[0] - span[1], span[0])):
+            words = set(range(start, end))
+            if (start, end) in accepted or not words & taken:
+                accepted.add((start, end))
+                taken |= words
+                matches.add(value)
+        return matches
@@ -15,7 +15,15 @@ def format_amount(amount):
     return "{:,.2f}".format(amount / 10**7)
 
 def merge_parties_companies(parties, companies):
-    merged_df = pd.merge(companies, parties, on=['Bond Number', 'Prefix'])
+    # A matched bond has one amount and one denomination code, so keep the redeemed amount
+    # (as Amount_y, which the aggregates sum) and the donor code only.
+    # Copy-on-write makes the dropped and renamed frames views instead of full copies.
+    with pd.option_context("mode.copy_on_write", True):
+        parties = parties.drop(columns=["Denomination"], errors="ignore").rename(
+            columns={"Amount": "Amount_y"}
+        )
+        companies = companies.drop(columns=["Amount"])
+        merged_df = pd.merge(companies, parties, on=['Bond Number', 'Prefix'])
     return merged_df
 
 
@@ -71,17 +79,6 @@ def create_google_search_url(company, date):
     url = f"https://www.google.com/search?q={encoded_query}&tbs=cdr:1,cd_min:{cd_min},cd_max:{cd_max}"
     return url
 
-def aggregate_transactions(merged_df, group_by_column, agg_columns):
-    """Aggregate transactions by a specified column."""
-    transactions = merged_df.groupby(group_by_column).agg(agg_columns)
-    column_names = list(agg_columns.keys())
-    del column_names[-1]
-    column_names.append("Amount")
-    column_names.append("bond_count")
-    print(column_names  )
-    transactions.columns = column_names
-    return transactions.reset_index(drop=True)
-
 def format_and_sort_group(group, amount_format_function, percentage_calc_function):
     """Format amounts and calculate percentages, then sort."""
     group["Amount (₹ Cr)"] = group["Amount"].apply(amount_format_function)
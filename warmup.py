@@ -0,0 +1,181 @@
+"""
+Warm-up entry point for the app.
+
+Loads the data model, builds the derived analytics and indexes, writes or opens the fact
+store and imports the chart libraries, so that the first session does not pay for them.
+
+The handlers import matplotlib, streamlit_echarts and streamlit_agraph inside the
+functions that draw with them. That keeps importing a handler module cheap for tools
+that only need its data functions, but the first render of the app still imports them,
+so it does not make a cold app faster; importing them here, before serving, does.
+
+Every cache is per process, so to take traffic warm, run the app from the warmed process:
+
+    python warmup.py --serve --port 8501
+
+Compare the import time and time to first render of a cold and a warmed process with:
+
+    python warmup.py --report
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+APP_SCRIPT = "app.py"
+HANDLER_MODULES = ["company_handler", "party_handler", "company_visualization_hadler", "network_graph"]
+CHART_MODULES = ["matplotlib.pyplot", "streamlit_echarts", "streamlit_agraph"]
+
+
+def _warmup_steps():
+    from concentration import load_concentration
+    from cross_filter import load_cross_filter
+    from data_model import load_data_model
+    from date_scope import load_date_scopes, load_drill_scopes
+    from denominations import load_denomination_histograms
+    from event_windows import WINDOW_OPTIONS, load_event_windows
+    from fact_store import load_fact_store
+    from lifecycle_analytics import load_lifecycle_stats
+    from network_graph import load_donor_graph
+    from news_handler import load_news_store
+    from olap_cube import load_cube
+    from purchase_orders import load_purchase_orders
+    from rankings import load_rankings
+    from similarity import load_similarity
+
+    return [
+        ("data model", load_data_model),
+        ("fact store", load_fact_store),
+        ("rankings", load_rankings),
+        ("olap cube", load_cube),
+        ("purchase orders", load_purchase_orders),
+        ("denomination histograms", load_denomination_histograms),
+        ("date scopes", load_date_scopes),
+        ("drill scopes", load_drill_scopes),
+        ("lifecycle", load_lifecycle_stats),
+        ("concentration", load_concentration),
+        ("similarity", load_similarity),
+        ("donor graph", load_donor_graph),
+        ("event windows", lambda: [load_event_windows(window) for window in WINDOW_OPTIONS]),
+        ("cross filter", load_cross_filter),
+        ("news", load_news_store),
+        ("chart libraries", lambda: [__import__(module) for module in CHART_MODULES]),
+    ]
+
+
+def warm():
+    """
+    Builds everything the first render needs, in the current process.
+
+    Returns:
+    - List of (step, seconds) tuples.
+    """
+    timings = []
+    for step, load in _warmup_steps():
+        started = time.perf_counter()
+        load()
+        timings.append((step, time.perf_counter() - started))
+    return timings
+
+
+def measure(warmed):
+    """
+    Measures the import time of the handler modules and the time to first render of the
+    app in the current process, which should be a fresh interpreter.
+
+    Parameters:
+    - warmed: Whether to run `warm` between the imports and the first render.
+
+    Returns:
+    - Dictionary with the import seconds, the chart libraries loaded by the imports, the
+      warm-up seconds and the first render seconds.
+    """
+    started = time.perf_counter()
+    for module in HANDLER_MODULES:
+        __import__(module)
+    imports = time.perf_counter() - started
+    loaded = [module for module in CHART_MODULES if module in sys.modules]
+
+    warmup = sum(seconds for _, seconds in warm()) if warmed else 0.0
+
+    from streamlit.testing.v1 import AppTest
+
+    started = time.perf_counter()
+    app = AppTest.from_file(APP_SCRIPT, default_timeout=300).run()
+    first_render = time.perf_counter() - started
+    if app.exception:
+        raise RuntimeError(f"The app failed to render: {app.exception}")
+    return {
+        "imports": imports,
+        "chart_libraries_imported": loaded,
+        "warmup": warmup,
+        "first_render": first_render,
+    }
+
+
+def report():
+    """
+    Prints the import time and time to first render of a cold and a warmed process, each
+    measured in a fresh interpreter.
+    """
+    results = {}
+    for mode in ["cold", "warm"]:
+        output = subprocess.run(
+            [sys.executable, __file__, "--measure", mode],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        # The app prints while rendering; the measurement is the last line.
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{'':<8}{'imports':>10}{'warm-up':>10}{'first render':>14}  chart libraries at import")
+    for mode, result in results.items():
+        print(
+            f"{mode:<8}{result['imports']:>9.2f}s{result['warmup']:>9.2f}s"
+            f"{result['first_render']:>13.2f}s  {', '.join(result['chart_libraries_imported']) or 'none'}"
+        )
+
+
+def serve(port):
+    """
+    Warms the current process, then runs the app in it.
+
+    Parameters:
+    - port: Port the Streamlit server listens on.
+    """
+    from streamlit.web import bootstrap
+
+    for step, seconds in warm():
+        print(f"warmed {step} in {seconds:.2f} s")
+    flag_options = {"server_port": port}
+    bootstrap.load_config_options(flag_options=flag_options)
+    bootstrap.run(APP_SCRIPT, False, [], flag_options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--serve", action="store_true", help="run the app after warming up")
+    group.add_argument("--report", action="store_true", help="compare cold and warmed start-up")
+    group.add_argument("--measure", choices=["cold", "warm"], help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=8501)
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    if args.serve:
+        serve(args.port)
+    elif args.report:
+        report()
+    elif args.measure:
+        print(json.dumps(measure(args.measure == "warm")))
+    else:
+        for step, seconds in warm():
+            print(f"{step:<25}{seconds:>8.2f} s")
+
+
+if __name__ == "__main__":
+    main()